@@ -0,0 +1,218 @@
+"""
+可插拔的语音识别后端 (在 AsrWorker 的推理线程里同步调用)
+
+旧实现在 main.py 导入时就 `from funasr import AutoModel` 并把 SenseVoiceSmall 加载到 CUDA 上，
+没有显卡、没装 funasr 的机器连进程都起不来，更没法离线压测。这里与 llm_backends.py 同样的做法：
+
+- SenseVoiceBackend：funasr 的 SenseVoiceSmall，load() 时才导入 funasr 并加载权重 (由 FastAPI lifespan 调用)
+- FakeAsrBackend：确定性的离线后端，按 "固定开销 + 每秒音频耗时" 阻塞推理线程后返回固定文本，
+  用于整条 WebSocket 链路的离线压测
+- RemoteAsrBackend：把识别请求按负载分给多个远程 ASR 节点 (asr_server.py)，节点故障自动换一个
+
+recognize_batch(items) 的 items 为 [(16kHz float32 采样, cache, is_final), ...]，返回按输入顺序的文本。
+"""
+import asyncio
+import base64
+import logging
+import re
+import time
+from typing import List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+import config
+from workers import NODE_DOWN_STATUSES, NoHealthyWorker, WorkerNode, WorkerPool
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+SAMPLE_RATE = 16000
+
+RecognitionItem = Tuple[np.ndarray, dict, bool]
+
+
+def clean_asr_text(text: str) -> str:
+    return re.sub(r'<\|.*?\|>', '', text).strip()
+
+
+class AsrBackend:
+    name = "base"
+    concurrency = 1   # AsrWorker 开几个推理线程：本地模型独占 GPU 只开一个
+
+    def load(self):
+        """加载模型 (可能很慢，在线程里调用)"""
+
+    async def close(self):
+        pass
+
+    def recognize_batch(self, items: List[RecognitionItem]) -> List[str]:
+        raise NotImplementedError
+
+    def warmup(self):
+        """单条与批量各跑一次真实推理：CUDA 内核、显存分配的开销留在启动阶段，不落在第一个用户身上"""
+        samples = np.random.default_rng(0).normal(0, 0.05, SAMPLE_RATE).astype(np.float32)
+        self.recognize_batch([(samples, {}, True)])
+        self.recognize_batch([(samples, {}, True), (samples[:SAMPLE_RATE // 2], {}, True)])
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+# ==========================================
+# SenseVoiceSmall (funasr)
+# ==========================================
+class SenseVoiceBackend(AsrBackend):
+    name = "sensevoice"
+
+    def __init__(self, device: str = config.ASR_DEVICE, model: str = "iic/SenseVoiceSmall"):
+        self.device = device
+        self.model_name = model
+        self.model = None
+
+    def load(self):
+        if self.model is not None:
+            return
+        from funasr import AutoModel
+        logger.info(f"🧠 正在加载 SenseVoiceSmall ({self.device})...")
+        self.model = AutoModel(model=self.model_name, trust_remote_code=True, device=self.device)
+
+    def recognize(self, samples: np.ndarray, cache: dict, is_final: bool) -> str:
+        """16kHz float32 数组直接喂给模型 (不再经过 WAV 中转)；cache 由流式识别器按语音输入持有"""
+        res = self.model.generate(input=samples, cache=cache, is_final=is_final, language="zh", use_itn=True)
+        if not res:
+            return ""
+        return clean_asr_text(res[0]['text'])
+
+    def recognize_batch(self, items: List[RecognitionItem]) -> List[str]:
+        """推理线程里调用：多条语音一次 generate，结果按输入顺序返回"""
+        if self.model is None:
+            raise RuntimeError("SenseVoiceBackend 尚未加载 (应在 FastAPI lifespan 中调用 load)")
+        if len(items) == 1:
+            return [self.recognize(*items[0])]
+        res = self.model.generate(input=[samples for samples, _, _ in items], cache={}, batch_size=len(items),
+                                  language="zh", use_itn=True)
+        if len(res) != len(items):
+            # 个别输入被模型丢弃 (例如过短)，无法按序对齐，退回逐条识别
+            logger.warning(f"⚠️ 批量识别结果数 {len(res)} != {len(items)}，回退为逐条识别")
+            return [self.recognize(*item) for item in items]
+        return [clean_asr_text(r['text']) for r in res]
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "device": self.device, "loaded": self.model is not None}
+
+
+# ==========================================
+# 离线假后端 (压测 / 演示)
+# ==========================================
+class FakeAsrBackend(AsrBackend):
+    """一次调用耗时 = base_ms + per_sec_ms × 本批音频总秒数 (模拟独占 GPU 的推理线程)，返回固定文本"""
+    name = "fake"
+
+    def __init__(self, base_ms: float = config.ASR_FAKE_BASE_MS,
+                 per_sec_ms: float = config.ASR_FAKE_PER_SEC_MS,
+                 text: str = config.ASR_FAKE_TEXT):
+        self.base_ms = base_ms
+        self.per_sec_ms = per_sec_ms
+        self.text = text
+
+    def recognize_batch(self, items: List[RecognitionItem]) -> List[str]:
+        seconds = sum(len(samples) for samples, _, _ in items) / SAMPLE_RATE
+        time.sleep((self.base_ms + self.per_sec_ms * seconds) / 1000)
+        return [self.text if len(samples) else "" for samples, _, _ in items]
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "base_ms": self.base_ms, "per_sec_ms": self.per_sec_ms}
+
+
+# ==========================================
+# 远程 ASR 节点池 (asr_server.py)
+# ==========================================
+def encode_pcm16(samples: np.ndarray) -> str:
+    return base64.b64encode((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()).decode()
+
+
+def decode_pcm16(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype="<i2").astype(np.float32) / 32768.0
+
+
+class RemoteAsrBackend(AsrBackend):
+    """每批挑在途请求最少的健康节点；连不上 / 502、503、504 / 繁忙就换一个节点重试。
+    远程识别不保留流式 cache (SenseVoice 本身也不用)，所有请求都能合批；按节点数开推理线程，各批并行"""
+    name = "remote"
+
+    def __init__(self, urls: Optional[List[str]] = None, timeout: float = config.ASR_REMOTE_TIMEOUT,
+                 ready_timeout_s: float = 60.0):
+        self.pool = WorkerPool("asr", urls or config.ASR_URLS)
+        self.timeout = timeout
+        self.ready_timeout_s = ready_timeout_s
+        self._client: Optional[httpx.Client] = None
+
+    @property
+    def concurrency(self) -> int:
+        return len(self.pool.nodes)
+
+    async def load(self):
+        """协程：节点池的健康检查跑在事件循环里；识别请求则在 AsrWorker 的线程里用同步客户端发"""
+        self._client = httpx.Client(timeout=self.timeout)
+        await self.pool.start()
+
+    async def warmup(self):
+        """各节点在自己启动时预热；这里等到至少一个节点就绪"""
+        deadline = time.monotonic() + self.ready_timeout_s
+        while not self.pool.healthy_count:
+            if time.monotonic() > deadline:
+                raise NoHealthyWorker(f"{self.ready_timeout_s:.0f}s 内没有 ASR 节点就绪")
+            await asyncio.sleep(self.pool.health_interval_s)
+            await self.pool.check_all()
+
+    async def close(self):
+        await self.pool.close()
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def recognize_batch(self, items: List[RecognitionItem]) -> list:
+        if self._client is None:
+            raise RuntimeError("RemoteAsrBackend 尚未启动 (应在 FastAPI lifespan 中调用 load)")
+        body = {"items": [{"pcm16_b64": encode_pcm16(samples), "is_final": is_final}
+                          for samples, _, is_final in items]}
+        tried: List[WorkerNode] = []
+        while True:
+            node = self.pool.pick(exclude=tried)
+            tried.append(node)
+            try:
+                res = self._client.post(f"{node.url}/asr", json=body)
+            except httpx.TransportError as e:
+                self.pool.mark_down(node, e)
+                if len(tried) < len(self.pool.nodes):
+                    continue
+                raise
+            finally:
+                self.pool.release(node)
+            if res.status_code in NODE_DOWN_STATUSES:
+                self.pool.mark_down(node, f"HTTP {res.status_code}")
+            if (res.status_code in NODE_DOWN_STATUSES or res.status_code == 429) and len(tried) < len(self.pool.nodes):
+                continue
+            res.raise_for_status()
+            return [RuntimeError(r["error"]) if "error" in r else r["text"] for r in res.json()["results"]]
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "nodes": self.pool.stats()}
+
+
+BACKENDS = {
+    SenseVoiceBackend.name: SenseVoiceBackend,
+    FakeAsrBackend.name: FakeAsrBackend,
+    RemoteAsrBackend.name: RemoteAsrBackend,
+}
+
+
+def create_backend(name: str = config.ASR_BACKEND) -> AsrBackend:
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"未知的 ASR 后端: {name} (可选: {', '.join(BACKENDS)})") from None
+
+
+# 全局单例：由 FastAPI lifespan 加载
+asr_backend = create_backend()
@@ -0,0 +1,282 @@
+"""
+大脑节点的 ASR 推理服务 (与具体模型解耦，不依赖 funasr / GPU)
+
+旧做法是每次识别都 asyncio.to_thread 扔进默认线程池：多个会话同时说话时，
+若干线程无上限地争抢同一个全局 asr_model，既不合批，也看不到排队情况。这里改为：
+
+- 有界请求队列 + 单个推理线程独占模型，事件循环永不阻塞
+- 动态微批：推理线程空闲时，在 batch_window_ms 内到达的识别请求 (最多 max_batch_size 个，可以来自不同会话)
+  合并成一次 recognize_batch 调用，结果按顺序路由回各自的 future
+- 带状态的 cache (流式模型写入过内容) 属于单条语音，不能与别人合批，单独执行
+- 尽力而为的请求 (流式中间结果) 在队列满时直接放弃，定稿/最终识别则挂起等待，推理线程每取走一个请求就唤醒它们
+- 本地模型只开一个推理线程；远程 ASR 节点池 (asr_backends.RemoteAsrBackend) 按节点数开多个线程，各批并行在不同节点上跑
+
+main.py 负责注入真正的模型调用；基准测试可以注入 CPU 桩函数。
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from metrics import LatencyRecorder
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+# [(采样, cache, is_final), ...] -> 每个请求对应的文本 (或该请求单独的异常)
+BatchRecognizeFn = Callable[[List[Tuple[np.ndarray, dict, bool]]], List[Union[str, Exception]]]
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AsrBusy(RuntimeError):
+    """队列已满，尽力而为的请求被放弃"""
+
+
+class RecognitionJob:
+    """一次识别请求。结果通过 call_soon_threadsafe 从推理线程送回事件循环"""
+
+    def __init__(self, samples: np.ndarray, cache: Optional[dict], is_final: bool):
+        self.samples = samples
+        self.cache = cache if cache is not None else {}
+        self.is_final = is_final
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        self.cancelled = threading.Event()
+        self.enqueued_at = time.perf_counter()
+
+    @property
+    def batchable(self) -> bool:
+        return not self.cache
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def abandon(self):
+        """调用方已离开：丢弃结果"""
+        self.loop.call_soon_threadsafe(self.future.cancel)
+
+    def resolve(self, result=None, error: Exception = None):
+        def _set():
+            if self.future.done():
+                return
+            if error is not None:
+                self.future.set_exception(error)
+            else:
+                self.future.set_result(result)
+        self.loop.call_soon_threadsafe(_set)
+
+
+class AsrWorker:
+    """有界队列 + 推理线程 (默认一个) + 跨会话动态微批"""
+
+    def __init__(self, recognize_batch: BatchRecognizeFn, max_queue: int = 32,
+                 max_batch_size: int = 8, batch_window_ms: float = 10.0, threads: int = 1):
+        self._recognize_batch = recognize_batch
+        self.max_queue = max_queue
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = max(0.0, batch_window_ms) / 1000.0
+        self.threads = max(1, threads)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._held = 0             # 各线程凑批时取出、但不能并入本批的请求数
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._space_waiters: List[asyncio.Future] = []   # 队列满时等位置的协程
+
+        self.queue_wait = LatencyRecorder("asr_queue_wait")
+        self.inference = LatencyRecorder("asr_inference")
+        self._batch_sizes = deque(maxlen=512)
+        self.in_progress = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.batches = 0
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    def start(self):
+        if not self._threads:
+            self._stopping = False
+            self._threads = [threading.Thread(target=self._loop, name=f"asr-inference-{i}", daemon=True)
+                             for i in range(self.threads)]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        if not self._threads:
+            return
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.resolve(error=RuntimeError("识别引擎正在关闭"))
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+
+    def submit(self, job: RecognitionJob) -> bool:
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except queue.Full:
+            return False
+
+    async def recognize(self, samples: np.ndarray, cache: Optional[dict] = None, is_final: bool = False,
+                        best_effort: bool = False) -> str:
+        """提交一次识别并等待结果；best_effort 的请求在队列满时抛 AsrBusy，而不是排队"""
+        job = RecognitionJob(samples, cache, is_final)
+        while True:
+            with self._lock:
+                # 提交与登记等待在同一把锁里：推理线程腾出位置后的唤醒不会在两者之间丢失
+                if self.submit(job):
+                    break
+                if best_effort:
+                    self.dropped += 1
+                    raise AsrBusy("ASR 队列已满")
+                waiter = job.loop.create_future()
+                self._space_waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                with self._lock:
+                    if waiter in self._space_waiters:
+                        self._space_waiters.remove(waiter)
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            # 调用方已离开：还在排队的话推理线程会直接跳过它
+            job.cancel()
+            raise
+
+    # ------------------------------------------------------------------
+    # 推理线程
+    # ------------------------------------------------------------------
+    def _loop(self):
+        pending: Optional[RecognitionJob] = None   # 凑批时取出、但不能并入本批的请求
+        while not self._stopping:
+            if pending is not None:
+                job, pending = pending, None
+                self._count("_held", -1)
+            else:
+                job = self._queue.get()
+                self._notify_space()
+            if job is None:
+                break
+            if self._skip_if_cancelled(job):
+                continue
+            if job.batchable:
+                batch, pending = self._collect_batch(job)
+                if pending is not None:
+                    self._count("_held", 1)
+            else:
+                batch = [job]
+            self._run_batch(batch)
+
+        if pending is not None:
+            self._count("_held", -1)
+            pending.resolve(error=RuntimeError("识别引擎正在关闭"))
+
+    def _collect_batch(self, first: RecognitionJob) -> Tuple[List[RecognitionJob], Optional[RecognitionJob]]:
+        """以 first 为首凑一批：最多等 batch_window，最多 max_batch_size 个；带状态的请求原样退回"""
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._notify_space()
+            if job is None:
+                self._stopping = True
+                break
+            if self._skip_if_cancelled(job):
+                continue
+            if not job.batchable:
+                return batch, job  # 带状态的请求留到下一轮单独执行
+            batch.append(job)
+        return batch, None
+
+    def _notify_space(self):
+        """推理线程取走了一个请求：唤醒所有等位置的协程，让它们重新尝试提交"""
+        with self._lock:
+            waiters, self._space_waiters = self._space_waiters, []
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    def _count(self, name: str, amount: int):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _skip_if_cancelled(self, job: RecognitionJob) -> bool:
+        if not job.cancelled.is_set():
+            return False
+        self._count("cancelled", 1)
+        job.abandon()
+        return True
+
+    def _run_batch(self, batch: List[RecognitionJob]):
+        started = time.perf_counter()
+        for job in batch:
+            self.queue_wait.observe((started - job.enqueued_at) * 1000)
+        with self._lock:
+            self.in_progress += len(batch)
+            self.batches += 1
+            self._batch_sizes.append(len(batch))
+        try:
+            results = self._recognize_batch([(job.samples, job.cache, job.is_final) for job in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"批量识别结果数 {len(results)} 与请求数 {len(batch)} 不一致")
+        except Exception as e:
+            traceback.print_exc()
+            logger.error(f"❌ ASR 推理崩溃: {e}")
+            results = [e] * len(batch)
+        finally:
+            self._count("in_progress", -len(batch))
+            self.inference.observe((time.perf_counter() - started) * 1000)
+
+        for job, result in zip(batch, results):
+            if isinstance(result, Exception):
+                self._count("failed", 1)
+                job.resolve(error=result)
+            else:
+                self._count("completed", 1)
+                job.resolve(result)
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    def metrics(self) -> dict:
+        sizes = list(self._batch_sizes)
+        return {
+            "queue_depth": self._queue.qsize() + self._held,
+            "max_queue": self.max_queue,
+            "threads": self.threads,
+            "in_progress": self.in_progress,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "cancelled": self.cancelled,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+            "batch_window_ms": round(self.batch_window * 1000, 2),
+            "batch_size_avg": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "batch_size_max": max(sizes, default=0),
+            "inference_ms": self.inference.snapshot(),
+            "queue_wait_ms": self.queue_wait.snapshot(),
+        }
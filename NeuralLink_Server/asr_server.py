@@ -0,0 +1,107 @@
+"""
+远程 ASR 工作节点：把 asr_backends 的本地识别后端 (SenseVoice，或离线压测用的 fake) 包成 HTTP 服务
+
+    NEURALLINK_ASR_DEVICE=cuda:0 python asr_server.py --port 9890
+
+大脑侧配置 NEURALLINK_ASR_BACKEND=remote 与 NEURALLINK_ASR_URLS=http://gpu1:9890,http://gpu2:9890 后，
+识别请求按在途数分到各节点 (workers.WorkerPool)。节点内部沿用 AsrWorker：同时到达的请求在这里再跨会话合批；
+启动时分阶段加载 + 预热 (startup.py)，/health/ready 就绪之后大脑才会把请求路由过来。
+"""
+import argparse
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+
+import config
+import metrics
+from asr_backends import AsrBackend, create_backend, decode_pcm16
+from asr_inference import AsrWorker
+from startup import Readiness, add_health_routes
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+
+class AsrItem(BaseModel):
+    pcm16_b64: str     # 16kHz 单声道 PCM16 (小端)
+    is_final: bool = True
+
+
+class AsrRequest(BaseModel):
+    items: List[AsrItem]
+
+
+def create_app(backend: AsrBackend) -> FastAPI:
+    if backend.name == "remote":
+        raise ValueError("ASR 节点必须使用本地识别后端 (sensevoice / fake)，不能再转发给 remote")
+
+    worker = AsrWorker(backend.recognize_batch, max_queue=config.ASR_MAX_QUEUE,
+                       max_batch_size=config.ASR_MAX_BATCH_SIZE, batch_window_ms=config.ASR_BATCH_WINDOW_MS)
+    readiness = Readiness(logger.info)
+    readiness.declare("asr_load", "asr_warmup")
+
+    async def startup_plan():
+        if await readiness.run("asr_load", backend.load):
+            await readiness.run("asr_warmup", backend.warmup)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        worker.start()
+        readiness.start(startup_plan)
+        yield
+        await readiness.stop()
+        worker.stop()
+        await backend.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.worker = worker
+    app.state.readiness = readiness
+    add_health_routes(app, readiness)
+
+    @app.post("/asr")
+    async def recognize(body: AsrRequest):
+        """一批语音，结果按输入顺序返回；单条失败只影响它自己 ({"error": ...})"""
+        if not readiness.ready:
+            return JSONResponse({"error": "识别引擎尚未就绪"}, status_code=503)
+
+        async def one(item: AsrItem) -> dict:
+            try:
+                return {"text": await worker.recognize(decode_pcm16(item.pcm16_b64), None, item.is_final)}
+            except Exception as e:
+                return {"error": f"{type(e).__name__}: {e}"}
+
+        return {"results": await asyncio.gather(*(one(item) for item in body.items))}
+
+    @app.get("/stats")
+    async def stats():
+        return {"backend": backend.stats(), "worker": worker.metrics()}
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        m = worker.metrics()
+        text = metrics.render_prometheus(
+            "neurallink_asr",
+            recorders=[worker.inference, worker.queue_wait],
+            counters={"completed": m["completed"], "failed": m["failed"], "cancelled": m["cancelled"],
+                      "batches": m["batches"]},
+            gauges={"queue_depth": m["queue_depth"], "in_progress": m["in_progress"], "ready": readiness.ready})
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="NeuralLink 远程 ASR 节点")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9890)
+    parser.add_argument("--backend", default=config.ASR_BACKEND, help="sensevoice | fake")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    uvicorn.run(create_app(create_backend(args.backend)), host=args.host, port=args.port)
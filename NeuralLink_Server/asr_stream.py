@@ -0,0 +1,270 @@
+"""
+流式语音识别 (边收音频块边识别，不依赖 GPU / funasr，模型调用由 main.py 注入)
+
+旧流程是等 is_last 到了才把整段录音解码、识别，ASR 耗时随话长线性增长，而且全部压在关键路径上。
+这里改为滚动分段：
+
+- 每攒够 step_ms 的新音频，就对 "尚未定稿" 的尾巴做一次识别，作为中间结果 (partial) 推给前端
+- 尾巴超过 segment_ms 时，在其后半段能量最低处切一刀 (大概率是停顿)，前半段定稿，不再重复识别
+- is_last 到达后只需识别最后一截不超过 segment_ms 的尾巴，最终结果的延迟基本固定，与话长无关
+
+cache：定稿段按顺序、不重叠地送进同一个 cache，这正是 funasr 流式模型跨段延续上下文的用法；
+SenseVoiceSmall 本身是非流式模型，会忽略 cache，但换成流式模型时无需改动调度逻辑。
+中间结果是对尾巴的反复试识别，用一次性的空 cache，避免污染定稿上下文。
+
+挂上 VAD (vad.py) 后：开口前的静音不识别、首尾静音裁掉、整段无语音直接跳过 ASR；
+检测到端点 (说完了) 时立刻把这句话定稿，is_last 到达时往往已无需再识别任何东西。
+
+解码：WebM 之类的容器只有第一个块带头信息，每一步只能对累计的全部字节重新解码；
+裸 PCM 设置 align_bytes 后每个字节只解码一次，新块按对齐单位解码后追加到已有采样之后。
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+
+import metrics
+from vad import VoiceActivityDetector
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+SAMPLE_RATE = 16000
+
+# 音频字节 (容器：截至目前的全部字节；裸 PCM：新到的一段) -> 16kHz 单声道 float32 采样
+DecodeFn = Callable[[bytes], np.ndarray]
+# (采样, cache, is_final, best_effort=...) -> 清洗后的文本 (通常是 AsrWorker.recognize)
+RecognizeFn = Callable[..., Awaitable[str]]
+# 中间结果回调
+PartialFn = Callable[[str], Awaitable[None]]
+# 端点回调 (VAD 判定说完了)
+EndpointFn = Callable[[], Awaitable[None]]
+
+
+def quietest_cut(samples: np.ndarray, start: int, end: int, frame: int = SAMPLE_RATE // 50) -> int:
+    """在 [start, end) 内找能量最低的 20ms 帧，返回它的中点作为切分位置"""
+    start = max(0, start)
+    end = min(len(samples), end)
+    count = (end - start) // frame
+    if count <= 0:
+        return end
+    frames = samples[start:start + count * frame].reshape(count, frame)
+    energy = np.square(frames).mean(axis=1)
+    return start + int(np.argmin(energy)) * frame + frame // 2
+
+
+class StreamingRecognizer:
+    """一次语音输入 (第一个音频块到 is_last) 的识别状态；streaming=False 时退化为 is_last 后整段识别"""
+
+    def __init__(self, decode: DecodeFn, recognize: RecognizeFn,
+                 on_partial: Optional[PartialFn] = None,
+                 streaming: bool = True, step_ms: int = 500, segment_ms: int = 3000,
+                 sample_rate: int = SAMPLE_RATE,
+                 vad: Optional[VoiceActivityDetector] = None, on_endpoint: Optional[EndpointFn] = None,
+                 align_bytes: int = 0):
+        self._decode = decode
+        self._recognize = recognize
+        self._on_partial = on_partial
+        self._on_endpoint = on_endpoint
+        self.vad = vad
+        self.streaming = streaming
+        self.sample_rate = sample_rate
+        self.step = sample_rate * step_ms // 1000
+        self.align_bytes = align_bytes    # > 0：增量解码 (按该字节数对齐，结果与整段解码一致)
+        self.segment = max(self.step, sample_rate * segment_ms // 1000)
+
+        self._chunks: List[bytes] = []   # 整段重解码：全部字节；增量解码：还没解码的字节
+        self.buffered_bytes = 0           # 已缓冲的音频字节数 (调用方据此做单句上限)
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._cache: dict = {}            # 定稿段共享的模型 cache
+        self._committed_text: List[str] = []
+        self._committed = 0               # 已定稿的采样数
+        self._recognized = 0              # 上一次中间识别覆盖到的采样数
+        self._last_partial = ""
+        self._endpoint_pending = False
+        self.endpoint_at: Optional[float] = None   # 最近一次检测到端点的时刻 (perf_counter)
+
+        self._dirty = asyncio.Event()
+        self._finished = False
+        self._pump: Optional[asyncio.Task] = None
+
+        self.partials = 0
+        self.segments = 0
+        self.decode_ms = 0.0              # 累计解码耗时
+        self.trace = None                 # 这句话所属回合的追踪 (由调用方在说完时挂上)
+
+    @property
+    def empty(self) -> bool:
+        return not self.buffered_bytes
+
+    @property
+    def has_speech(self) -> bool:
+        """没挂 VAD 时一律视为有语音"""
+        return self.vad is None or self.vad.has_speech
+
+    @property
+    def committed_text(self) -> str:
+        """已定稿部分的文本 (端点之后即整句话)，不会再变"""
+        return "".join(self._committed_text).strip()
+
+    @property
+    def audio_ms(self) -> float:
+        return len(self._samples) * 1000 / self.sample_rate
+
+    def feed(self, audio: bytes):
+        """收到一个音频块：只入缓冲区，识别在后台泵里进行，接收循环不等待"""
+        if not audio or self._finished:
+            return
+        self._chunks.append(audio)
+        self.buffered_bytes += len(audio)
+        if not self.streaming:
+            return
+        self._dirty.set()
+        if self._pump is None:
+            self._pump = asyncio.create_task(self._run_pump())
+
+    async def finish(self) -> str:
+        """is_last：等在途的那一次识别结束，只补识别剩下的尾巴，返回最终文本"""
+        self._finished = True
+        if self._pump is not None:
+            self._dirty.set()
+            await self._pump
+        if not self.buffered_bytes:
+            return ""
+
+        await self._refresh_samples()
+        end = len(self._samples)
+        if self.vad is not None:
+            if not self.vad.has_speech:
+                return ""  # 整段都是静音/底噪，不浪费一次 ASR
+            self._trim_leading()
+            end = self.vad.trim_end(end)
+        if self.streaming:
+            while end - self._committed > self.segment:
+                await self._commit_segment(end)
+        tail = self._samples[self._committed:end]
+        if len(tail):
+            text = await self._recognize(tail, self._cache, True)
+            self._committed_text.append(text)
+        return "".join(self._committed_text).strip()
+
+    async def probe_speech(self) -> bool:
+        """is_last 时在开新回合之前先确认有没有人声，纯静音的按键不该打断正在进行的回复"""
+        if self.vad is None:
+            return True
+        await self._refresh_samples()
+        return self.vad.has_speech
+
+    def cancel(self):
+        self._finished = True
+        if self._pump is not None and not self._pump.done():
+            self._pump.cancel()
+
+    # ------------------------------------------------------------------
+    # 后台识别泵：同一时刻最多一次识别在途，新到的音频块会被合并进下一轮
+    # ------------------------------------------------------------------
+    async def _run_pump(self):
+        while not self._finished:
+            await self._dirty.wait()
+            self._dirty.clear()
+            if self._finished:
+                return
+            try:
+                await self._step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 截断的容器偶尔解不开，等下一个音频块再试；最终结果在 finish() 里兜底
+                logger.debug(f"流式识别跳过一步: {e}")
+
+    async def _step(self):
+        await self._refresh_samples()
+        if self.vad is not None:
+            if not self.vad.has_speech:
+                return  # 还没开口
+            if self._endpoint_pending:
+                await self._commit_endpoint()
+                return
+            self._trim_leading()
+            if self.vad.endpoint:
+                return  # 说完之后的静音不再识别，等再次开口
+        if len(self._samples) - self._recognized < self.step:
+            return
+        while len(self._samples) - self._committed > self.segment and not self._finished:
+            await self._commit_segment(len(self._samples))
+        if self._finished:
+            return
+
+        end = len(self._samples)
+        # 中间结果尽力而为：识别服务排满时直接放弃这一步，不和定稿/最终识别抢位置
+        tail_text = await self._recognize(self._samples[self._committed:end], {}, False, best_effort=True)
+        self._recognized = end
+        text = ("".join(self._committed_text) + tail_text).strip()
+        if text and text != self._last_partial and not self._finished:
+            self._last_partial = text
+            self.partials += 1
+            if self._on_partial is not None:
+                await self._on_partial(text)
+
+    async def _commit_segment(self, limit: int):
+        """尾巴过长：在后半段最安静处切开，前半段定稿"""
+        start = self._committed
+        cut = quietest_cut(self._samples, start + self.segment // 2, min(limit, start + self.segment),
+                           self.sample_rate // 50)
+        await self._commit_to(cut)
+
+    async def _commit_to(self, end: int):
+        start = self._committed
+        text = await self._recognize(self._samples[start:end], self._cache, False)
+        self._committed_text.append(text)
+        self._committed = end
+        self.segments += 1
+
+    async def _commit_endpoint(self):
+        """VAD 判定说完了：不等 is_last，立刻把到语音结尾为止的部分定稿"""
+        end = self.vad.trim_end(len(self._samples))
+        while end - self._committed > self.segment and not self._finished:
+            await self._commit_segment(end)
+        if end > self._committed and not self._finished:
+            await self._commit_to(end)
+        self._endpoint_pending = False
+        self._recognized = len(self._samples)
+        self.endpoint_at = time.perf_counter()
+
+        text = self.committed_text
+        if text and text != self._last_partial and not self._finished:
+            self._last_partial = text
+            self.partials += 1
+            if self._on_partial is not None:
+                await self._on_partial(text)
+        if self._on_endpoint is not None and not self._finished:
+            await self._on_endpoint()
+
+    def _trim_leading(self):
+        # 开口之前的静音直接跳过，不送进识别；端点定稿还没做完时不能跳，否则会漏掉上一句
+        if self._endpoint_pending:
+            return
+        start = self.vad.trim_start()
+        if start > self._committed:
+            self._committed = start
+            self._recognized = max(self._recognized, start)
+
+    async def _refresh_samples(self):
+        started = time.perf_counter()
+        if self.align_bytes:
+            data = b"".join(self._chunks)
+            usable = len(data) - len(data) % self.align_bytes
+            self._chunks = [data[usable:]] if usable < len(data) else []
+            if usable:
+                fresh = self._decode(data[:usable])   # 只有新增的这一小段，不值得进线程
+                self._samples = np.concatenate((self._samples, fresh))
+        else:
+            # WebM 之类的容器只有第一个块带头信息，只能对累计的全部字节重新解码
+            data = b"".join(self._chunks)
+            self._samples = await asyncio.to_thread(self._decode, data)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.decode_ms += elapsed_ms
+        metrics.latency("asr_decode").observe(elapsed_ms)
+        if self.vad is not None and self.vad.update(self._samples):
+            self._endpoint_pending = True
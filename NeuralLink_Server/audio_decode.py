@@ -0,0 +1,109 @@
+"""
+进程内音频解码：WebM/Opus 或裸 PCM -> 16kHz 单声道 float32 NumPy 数组，直接喂给 ASR 模型
+
+旧链路：pydub.AudioSegment.from_file 起一个 ffmpeg 子进程解码 -> 重采样 -> 再编码成 WAV 字节 ->
+asr_model.generate 再把 WAV 解析一遍。这里改为：
+
+- 容器格式 (WebM/Opus 等) 用 PyAV 在进程内解码 + 重采样，没有子进程，也没有 WAV 中转
+  (未安装 av 时回退到 pydub/ffmpeg，行为与旧版一致)
+- 裸 PCM (s16le) 直接 np.frombuffer；已经是 16kHz 单声道时零解码、零重采样 (快速路径)
+"""
+import importlib.util
+import io
+import logging
+from math import gcd
+
+import numpy as np
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+TARGET_RATE = 16000
+
+# 客户端在握手中声明的上行音频格式
+FORMAT_WEBM = "webm"          # 浏览器 MediaRecorder 默认产出 (任何 ffmpeg 认识的容器都走这条路)
+FORMAT_PCM16 = "pcm_s16le"    # 裸 PCM，小端 16bit，单声道，采样率由 sample_rate 指定
+SUPPORTED_FORMATS = (FORMAT_WEBM, FORMAT_PCM16)
+# 握手声明的 PCM 采样率的合理范围 (电话音质到高采样率声卡)
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+
+
+def _av_available() -> bool:
+    return importlib.util.find_spec("av") is not None
+
+
+HAS_AV = _av_available()
+if not HAS_AV:
+    logger.warning("⚠️ 未安装 av (PyAV)，容器音频回退为 pydub/ffmpeg 子进程解码")
+
+
+def pcm16_to_float32(data: bytes) -> np.ndarray:
+    """s16le 字节 -> [-1, 1) float32；结尾不成对的半个采样直接丢弃"""
+    usable = len(data) - (len(data) & 1)
+    out = np.frombuffer(data, dtype=np.int16, count=usable // 2).astype(np.float32)
+    out *= 1.0 / 32768.0  # 原地缩放，只分配一次
+    return out
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = TARGET_RATE) -> np.ndarray:
+    """整数倍降采样用盒式滤波 + 抽取 (兼顾抗混叠)，其他比例用线性插值"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    if src_rate % dst_rate == 0:
+        factor = src_rate // dst_rate
+        usable = len(samples) - len(samples) % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1, dtype=np.float32)
+    g = gcd(src_rate, dst_rate)
+    out_len = int(len(samples) * (dst_rate // g) / (src_rate // g))
+    positions = np.arange(out_len, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def decode_pcm16(data: bytes, sample_rate: int = TARGET_RATE) -> np.ndarray:
+    samples = pcm16_to_float32(data)
+    return resample(samples, sample_rate) if sample_rate != TARGET_RATE else samples
+
+
+def _decode_container_av(data: bytes) -> np.ndarray:
+    import av
+    parts = []
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=TARGET_RATE)
+    with av.open(io.BytesIO(data), mode="r") as container:
+        try:
+            for frame in container.decode(audio=0):
+                for out in resampler.resample(frame):
+                    parts.append(out.to_ndarray().reshape(-1))
+        except Exception:
+            # 流式识别时拿到的是截断的容器，最后一个簇解不完整是正常的，已解出的部分照用
+            if not parts:
+                raise
+    for out in resampler.resample(None):
+        parts.append(out.to_ndarray().reshape(-1))
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(parts).astype(np.float32, copy=False)
+
+
+def _decode_container_pydub(data: bytes) -> np.ndarray:
+    from pydub import AudioSegment
+    audio_segment = AudioSegment.from_file(io.BytesIO(data))
+    # 强制重采样为 ASR 黄金标准
+    audio_segment = audio_segment.set_frame_rate(TARGET_RATE).set_channels(1).set_sample_width(2)
+    return pcm16_to_float32(audio_segment.raw_data)
+
+
+def pcm16_align_bytes(sample_rate: int) -> int:
+    """裸 PCM 可以分块独立解码 (拼起来与整段解码逐采样一致) 的字节对齐单位；
+    采样率不是 16kHz 的整数倍时要走插值，分块会在边界上产生偏差，返回 0 表示只能整段解码"""
+    if sample_rate % TARGET_RATE:
+        return 0
+    return 2 * (sample_rate // TARGET_RATE)
+
+
+def decode_audio(data: bytes, fmt: str = FORMAT_WEBM, sample_rate: int = TARGET_RATE) -> np.ndarray:
+    """任意上行音频 -> 16kHz 单声道 float32"""
+    if fmt == FORMAT_PCM16:
+        return decode_pcm16(data, sample_rate)
+    if HAS_AV:
+        return _decode_container_av(data)
+    return _decode_container_pydub(data)
@@ -0,0 +1,149 @@
+"""
+基准 + 一致性校验：ASR 跨会话动态合批 vs 逐条识别
+
+    python benchmarks/bench_asr_batching.py [--sessions 1 4 8 16] [--utterances 4]
+    python benchmarks/bench_asr_batching.py --sensevoice --device cpu [--wav a.wav b.wav]
+
+1. 一致性：同一批语音分别 "逐条识别" 与 "经 AsrWorker 合批识别"，逐条比对文本，
+   任何一条不一致都以非零退出码结束 (可直接挂进 CI)
+2. 吞吐：N 个会话并发、各自串行提交 utterances 条语音，对比 max_batch_size=1 与合批时的总耗时和延迟
+
+默认使用 CPU 桩模型 (一次调用 = base_ms + per_item_ms × 批大小，输出由音频内容决定)，校验的是调度与结果路由；
+加 --sensevoice 时加载 funasr 的 SenseVoiceSmall，校验真实模型的批量输出与逐条输出一致，无显卡机器用 --device cpu。
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asr_inference import AsrWorker  # noqa: E402
+from metrics import percentiles  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+
+def make_stub_model(base_ms: float, per_item_ms: float):
+    def recognize_batch(items):
+        time.sleep((base_ms + per_item_ms * len(items)) / 1000)
+        return [hashlib.sha1(samples.tobytes()).hexdigest()[:12] for samples, _, _ in items]
+    return recognize_batch
+
+
+def make_sensevoice_model(device: str):
+    """与 main.py 的 recognize_batch 同一套调用方式"""
+    from funasr import AutoModel
+    model = AutoModel(model="iic/SenseVoiceSmall", trust_remote_code=True, device=device)
+
+    def clean(text):
+        return re.sub(r'<\|.*?\|>', '', text).strip()
+
+    def recognize_one(samples, cache, is_final):
+        res = model.generate(input=samples, cache=cache, is_final=is_final, language="zh", use_itn=True)
+        return clean(res[0]['text']) if res else ""
+
+    def recognize_batch(items):
+        if len(items) == 1:
+            return [recognize_one(*items[0])]
+        res = model.generate(input=[samples for samples, _, _ in items], cache={}, batch_size=len(items),
+                             language="zh", use_itn=True)
+        if len(res) != len(items):
+            return [recognize_one(*item) for item in items]
+        return [clean(r['text']) for r in res]
+
+    return recognize_batch
+
+
+def load_utterances(paths, count: int):
+    if paths:
+        out = []
+        for path in paths:
+            with wave.open(path, "rb") as w:
+                if w.getframerate() != SAMPLE_RATE or w.getnchannels() != 1 or w.getsampwidth() != 2:
+                    raise SystemExit(f"{path}: 只支持 16kHz/16bit 单声道 WAV")
+                pcm = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+            out.append(pcm.astype(np.float32) / 32768.0)
+        return out
+    rng = np.random.default_rng(0)
+    return [rng.normal(0, 0.1, int(rng.uniform(1.0, 4.0) * SAMPLE_RATE)).astype(np.float32) for _ in range(count)]
+
+
+async def check_consistency(recognize_batch, utterances, max_batch: int) -> bool:
+    expected = [recognize_batch([(samples, {}, True)])[0] for samples in utterances]
+
+    worker = AsrWorker(recognize_batch, max_queue=len(utterances) + 1, max_batch_size=max_batch, batch_window_ms=50)
+    worker.start()
+    try:
+        batched = await asyncio.gather(*(worker.recognize(samples, None, True) for samples in utterances))
+        batches = worker.batches
+    finally:
+        worker.stop()
+
+    mismatches = [(i, e, b) for i, (e, b) in enumerate(zip(expected, batched)) if e != b]
+    print(f"一致性：{len(utterances)} 条语音，合批 {batches} 次，不一致 {len(mismatches)} 条")
+    for i, e, b in mismatches:
+        print(f"  #{i}: 逐条={e!r} 合批={b!r}")
+    return not mismatches
+
+
+async def run_sessions(worker: AsrWorker, utterances, sessions: int, per_session: int):
+    latencies = []
+
+    async def session(sid: int):
+        for i in range(per_session):
+            samples = utterances[(sid * per_session + i) % len(utterances)]
+            started = time.perf_counter()
+            await worker.recognize(samples, None, True)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(s) for s in range(sessions)))
+    return time.perf_counter() - started, latencies
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8, 16])
+    ap.add_argument("--utterances", type=int, default=4, help="每个会话串行提交的语音条数")
+    ap.add_argument("--max-batch", type=int, default=8)
+    ap.add_argument("--window-ms", type=float, default=10.0)
+    ap.add_argument("--base-ms", type=float, default=60.0)
+    ap.add_argument("--per-item-ms", type=float, default=8.0)
+    ap.add_argument("--sensevoice", action="store_true", help="使用真实的 SenseVoiceSmall 模型")
+    ap.add_argument("--device", default="cuda:0", help="--sensevoice 时的推理设备，如 cpu")
+    ap.add_argument("--wav", nargs="*", default=[], help="用于识别的 16kHz/16bit 单声道录音")
+    args = ap.parse_args()
+
+    recognize_batch = make_sensevoice_model(args.device) if args.sensevoice \
+        else make_stub_model(args.base_ms, args.per_item_ms)
+    utterances = load_utterances(args.wav, 16)
+
+    consistent = await check_consistency(recognize_batch, utterances, args.max_batch)
+
+    print(f"{'会话数':>6} | {'逐条 总耗时':>10} | {'合批 总耗时':>10} | {'加速':>6} | {'合批 p50':>9} | {'合批 p95':>9} | {'平均批大小':>8}")
+    for sessions in args.sessions:
+        results = []
+        for max_batch in (1, args.max_batch):
+            worker = AsrWorker(recognize_batch, max_queue=sessions * 2 + 1, max_batch_size=max_batch,
+                               batch_window_ms=args.window_ms)
+            worker.start()
+            elapsed, latencies = await run_sessions(worker, utterances, sessions, args.utterances)
+            results.append((elapsed, percentiles(latencies), worker.metrics()["batch_size_avg"]))
+            worker.stop()
+        (seq_s, _, _), (bat_s, bat, avg) = results
+        print(f"{sessions:>6} | {seq_s * 1000:>8.0f}ms | {bat_s * 1000:>8.0f}ms | {seq_s / bat_s:>5.2f}x | "
+              f"{bat['p50']:>7.1f}ms | {bat['p95']:>7.1f}ms | {avg:>8.2f}")
+
+    if not consistent:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
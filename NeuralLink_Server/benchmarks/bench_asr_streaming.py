@@ -0,0 +1,139 @@
+"""
+基准：流式 ASR vs 录音结束后整段识别 —— 按真实节奏回放音频块流，测 is_last 之后多久拿到最终文本
+
+    python benchmarks/bench_asr_streaming.py [--durations 2 5 10 20] [--chunk-ms 250]
+    python benchmarks/bench_asr_streaming.py --wav a.wav b.wav --sensevoice   # 回放录音，用真实模型
+
+默认用 CPU 桩模型：一次识别耗时 = base_ms + per_sec_ms × 音频秒数 (模拟非流式模型随输入长度线性增长)，
+音频是合成的 "说话片段 + 短停顿"。传 --wav 时回放 16kHz/16bit 单声道录音 (按 chunk_ms 切块)；
+再加 --sensevoice 则加载 funasr 的 SenseVoiceSmall 真实识别。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asr_inference import AsrWorker  # noqa: E402
+from asr_stream import SAMPLE_RATE, StreamingRecognizer  # noqa: E402
+from metrics import percentiles  # noqa: E402
+
+
+def synthetic_utterance(seconds: float, seed: int) -> bytes:
+    """1.2s 的 "说话" (调幅噪声) 与 0.25s 静音交替，产出 16kHz PCM16 字节"""
+    rng = np.random.default_rng(seed)
+    out, t = [], 0.0
+    while t < seconds:
+        burst = min(1.2, seconds - t)
+        n = int(burst * SAMPLE_RATE)
+        envelope = 0.5 + 0.5 * np.sin(np.linspace(0, 6 * np.pi, n))
+        out.append(rng.normal(0, 0.2, n) * envelope)
+        t += burst
+        gap = min(0.25, max(0.0, seconds - t))
+        out.append(np.zeros(int(gap * SAMPLE_RATE)))
+        t += gap
+    pcm = np.clip(np.concatenate(out), -1, 1)
+    return (pcm * 32767).astype(np.int16).tobytes()
+
+
+def read_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as w:
+        if w.getframerate() != SAMPLE_RATE or w.getnchannels() != 1 or w.getsampwidth() != 2:
+            raise SystemExit(f"{path}: 只支持 16kHz/16bit 单声道 WAV")
+        return w.readframes(w.getnframes())
+
+
+def decode_pcm16(data: bytes) -> np.ndarray:
+    usable = len(data) - len(data) % 2
+    return np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def make_stub_recognizer(base_ms: float, per_sec_ms: float):
+    def recognize(samples, cache, is_final):
+        seconds = len(samples) / SAMPLE_RATE
+        time.sleep((base_ms + per_sec_ms * seconds) / 1000)
+        return "字" * int(seconds * 4)
+    return recognize
+
+
+def make_sensevoice_recognizer(device: str):
+    import re
+    from funasr import AutoModel
+    model = AutoModel(model="iic/SenseVoiceSmall", trust_remote_code=True, device=device)
+
+    def recognize(samples, cache, is_final):
+        res = model.generate(input=samples, cache=cache, is_final=is_final, language="zh", use_itn=True)
+        return re.sub(r'<\|.*?\|>', '', res[0]['text']).strip() if res else ""
+    return recognize
+
+
+async def replay(pcm: bytes, chunk_ms: int, recognize, streaming: bool, step_ms: int, segment_ms: int):
+    """按真实节奏把音频块喂给识别器，返回 (is_last 后的最终延迟 ms, 中间结果次数, 首个中间结果时刻 ms, 文本)"""
+    chunk_bytes = SAMPLE_RATE * 2 * chunk_ms // 1000
+    began = time.perf_counter()
+    first_partial = []
+
+    async def on_partial(text):
+        if not first_partial:
+            first_partial.append((time.perf_counter() - began) * 1000)
+
+    stream = StreamingRecognizer(decode_pcm16, recognize, on_partial, streaming=streaming,
+                                 step_ms=step_ms, segment_ms=segment_ms, align_bytes=2)
+    for offset in range(0, len(pcm), chunk_bytes):
+        stream.feed(pcm[offset:offset + chunk_bytes])
+        await asyncio.sleep(chunk_ms / 1000)
+
+    last = time.perf_counter()
+    text = await stream.finish()
+    return (time.perf_counter() - last) * 1000, stream.partials, (first_partial or [0.0])[0], text
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--durations", type=float, nargs="+", default=[2, 5, 10, 20], help="合成语音时长 (秒)")
+    ap.add_argument("--wav", nargs="*", default=[], help="回放的录音文件 (16kHz/16bit 单声道)")
+    ap.add_argument("--sensevoice", action="store_true", help="使用真实的 SenseVoiceSmall 模型")
+    ap.add_argument("--device", default="cuda:0", help="--sensevoice 时的推理设备，如 cpu")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--chunk-ms", type=int, default=250)
+    ap.add_argument("--step-ms", type=int, default=500)
+    ap.add_argument("--segment-ms", type=int, default=3000)
+    ap.add_argument("--base-ms", type=float, default=40.0)
+    ap.add_argument("--per-sec-ms", type=float, default=25.0)
+    args = ap.parse_args()
+
+    recognize_one = make_sensevoice_recognizer(args.device) if args.sensevoice \
+        else make_stub_recognizer(args.base_ms, args.per_sec_ms)
+    # 与 main.py 相同：识别请求经由单线程 AsrWorker 执行 (这里只有一路语音，不会真正合批)
+    worker = AsrWorker(lambda items: [recognize_one(*item) for item in items])
+    worker.start()
+    recognize = worker.recognize
+    if args.wav:
+        streams = [(os.path.basename(path), read_wav(path)) for path in args.wav]
+    else:
+        streams = [(f"{d:g}s", synthetic_utterance(d, seed=i)) for i, d in enumerate(args.durations)]
+
+    print(f"块大小 {args.chunk_ms}ms，中间识别步长 {args.step_ms}ms，定稿段上限 {args.segment_ms}ms")
+    print(f"{'音频':>12} | {'整段识别 p50':>12} | {'流式 p50':>10} | {'流式 p95':>10} | {'中间结果':>8} | {'首个中间结果':>12}")
+    for name, pcm in streams:
+        batch, stream, partials, firsts = [], [], [], []
+        for _ in range(args.repeat):
+            ms, _, _, _ = await replay(pcm, args.chunk_ms, recognize, False, args.step_ms, args.segment_ms)
+            batch.append(ms)
+            ms, count, first, _ = await replay(pcm, args.chunk_ms, recognize, True, args.step_ms, args.segment_ms)
+            stream.append(ms)
+            partials.append(count)
+            firsts.append(first)
+        b, s = percentiles(batch), percentiles(stream)
+        print(f"{name:>12} | {b['p50']:>10.1f}ms | {s['p50']:>8.1f}ms | {s['p95']:>8.1f}ms | "
+              f"{sum(partials) / len(partials):>8.1f} | {percentiles(firsts)['p50']:>10.1f}ms")
+    worker.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+基准：单条语音的 ASR 预处理耗时与内存分配 —— 旧链路 (pydub/ffmpeg + WAV 中转) vs 进程内解码 vs PCM 快速路径
+
+    python benchmarks/bench_audio_decode.py [--seconds 3 10] [--repeat 20] [--webm a.webm]
+
+对比的路径：
+- legacy   : AudioSegment.from_file (ffmpeg 子进程) -> 重采样 -> 导出 WAV 字节 -> 再解析 WAV (模型侧的开销)
+- pydub    : audio_decode 的回退路径 (仍是 ffmpeg 子进程，但直接出 float32 数组，没有 WAV 中转)
+- av       : audio_decode 的默认路径 (PyAV 进程内解码 + 重采样)
+- pcm16@16k: 客户端直接发 16kHz PCM，零解码
+- pcm16@48k: 裸 PCM 但需要降采样
+
+WebM 输入优先用 PyAV 在内存里现场编码 (Opus)，其次调用 ffmpeg 命令行，也可以用 --webm 传入真实录音。
+缺少 pydub / av / ffmpeg 的路径会被跳过。内存为 tracemalloc 统计的 Python 侧分配峰值，不含 ffmpeg 子进程。
+"""
+import argparse
+import importlib.util
+import io
+import os
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio_decode  # noqa: E402
+from metrics import percentiles  # noqa: E402
+
+
+def synthetic_pcm(seconds: float, rate: int) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    return (signal * 32767).astype(np.int16).tobytes()
+
+
+def encode_webm(pcm16_48k: bytes) -> bytes:
+    """把 48kHz PCM 编成 WebM/Opus (与浏览器 MediaRecorder 的产物同类)"""
+    if audio_decode.HAS_AV:
+        import av
+        out = io.BytesIO()
+        with av.open(out, mode="w", format="webm") as container:
+            stream = container.add_stream("libopus", rate=48000, layout="mono")
+            samples = np.frombuffer(pcm16_48k, dtype=np.int16).reshape(1, -1)
+            frame = av.AudioFrame.from_ndarray(samples, format="s16", layout="mono")
+            frame.sample_rate = 48000
+            for packet in stream.encode(frame):
+                container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        return out.getvalue()
+    if shutil.which("ffmpeg"):
+        proc = subprocess.run(["ffmpeg", "-loglevel", "error", "-f", "s16le", "-ar", "48000", "-ac", "1",
+                               "-i", "pipe:0", "-c:a", "libopus", "-f", "webm", "pipe:1"],
+                              input=pcm16_48k, capture_output=True, check=True)
+        return proc.stdout
+    return b""
+
+
+def legacy_path(data: bytes) -> np.ndarray:
+    from pydub import AudioSegment
+    segment = AudioSegment.from_file(io.BytesIO(data))
+    segment = segment.set_frame_rate(16000).set_channels(1).set_sample_width(2)
+    wav_io = io.BytesIO()
+    segment.export(wav_io, format="wav")
+    wav_bytes = wav_io.getvalue()
+    # 模型拿到 WAV 字节后还要再解析一遍
+    with wave.open(io.BytesIO(wav_bytes), "rb") as w:
+        frames = w.readframes(w.getnframes())
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def measure(fn, data: bytes, repeat: int):
+    fn(data)  # 预热 (首次导入、动态库加载)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn(data)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return percentiles(samples), peak, len(out)
+
+
+def have_pydub() -> bool:
+    return importlib.util.find_spec("pydub") is not None and shutil.which("ffmpeg") is not None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, nargs="+", default=[3, 10])
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--webm", help="用真实的 WebM 录音代替合成音频 (仅影响容器路径)")
+    args = ap.parse_args()
+
+    print(f"PyAV: {'可用' if audio_decode.HAS_AV else '缺失'}，pydub+ffmpeg: {'可用' if have_pydub() else '缺失'}")
+    print(f"{'音频':>6} | {'路径':>10} | {'p50':>9} | {'p95':>9} | {'Python 分配峰值':>14} | {'输出采样':>9}")
+    for seconds in args.seconds:
+        pcm16k = synthetic_pcm(seconds, 16000)
+        pcm48k = synthetic_pcm(seconds, 48000)
+        webm = open(args.webm, "rb").read() if args.webm else encode_webm(pcm48k)
+
+        cases = [
+            ("pcm16@16k", lambda d: audio_decode.decode_audio(d, audio_decode.FORMAT_PCM16, 16000), pcm16k),
+            ("pcm16@48k", lambda d: audio_decode.decode_audio(d, audio_decode.FORMAT_PCM16, 48000), pcm48k),
+        ]
+        if webm and audio_decode.HAS_AV:
+            cases.append(("av", audio_decode._decode_container_av, webm))
+        if webm and have_pydub():
+            cases.append(("pydub", audio_decode._decode_container_pydub, webm))
+            cases.append(("legacy", legacy_path, webm))
+        if not webm:
+            print(f"{seconds:>5g}s | {'(容器路径)':>10} | 跳过：没有 PyAV / ffmpeg 可用来生成 WebM，可用 --webm 指定录音")
+
+        for name, fn, data in cases:
+            stats, peak, produced = measure(fn, data, args.repeat)
+            print(f"{seconds:>5g}s | {name:>10} | {stats['p50']:>7.2f}ms | {stats['p95']:>7.2f}ms | "
+                  f"{peak / 1024:>12.1f}KB | {produced:>9}")
+
+
+if __name__ == "__main__":
+    main()
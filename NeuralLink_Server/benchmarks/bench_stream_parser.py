@@ -0,0 +1,90 @@
+"""
+微基准：流式回复解析 —— 旧的 "每个 chunk 全量正则" vs 增量状态机
+
+    python benchmarks/bench_stream_parser.py [--sizes 500 2000 8000] [--chunk 8]
+
+模拟大模型以 chunk 为单位吐出 {"thought": ..., "speak": ...}，统计处理完整条回复的耗时。
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_parser import StreamingReplyParser  # noqa: E402
+
+
+def legacy_parse(chunks):
+    """原 run_llm_inference 里的正则实现 (原样搬运，仅去掉网络发送)"""
+    full_text = ""
+    emitted_thought_len = 0
+    emitted_speak_len = 0
+    sentence_buffer = ""
+    sentences = []
+    for chunk_text in chunks:
+        full_text += chunk_text
+        thought_match = re.search(r'"thought"\s*:\s*"((?:[^"\\]|\\.)*)', full_text)
+        speak_match = re.search(r'"speak"\s*:\s*"((?:[^"\\]|\\.)*)', full_text)
+        if thought_match:
+            current_thought = thought_match.group(1).replace('\\n', '\n')
+            if current_thought[emitted_thought_len:]:
+                emitted_thought_len = len(current_thought)
+        if speak_match:
+            current_speak = speak_match.group(1).replace('\\n', '\n')
+            new_speak = current_speak[emitted_speak_len:]
+            if new_speak:
+                sentence_buffer += new_speak
+                emitted_speak_len = len(current_speak)
+                match = re.search(r'(.*[。！？，,\.\!\?])(.*)', sentence_buffer, re.DOTALL)
+                if match:
+                    sentences.append(match.group(1).strip())
+                    sentence_buffer = match.group(2)
+    return sentences
+
+
+def incremental_parse(chunks):
+    parser = StreamingReplyParser()
+    sentences = []
+    for chunk_text in chunks:
+        _, ready = parser.feed(chunk_text)
+        sentences.extend(ready)
+    sentences.extend(parser.finish())
+    return sentences
+
+
+def make_reply(speak_len: int) -> str:
+    unit = "今天天气不错，我们一起去公园散步吧。要记得带上水！"
+    speak = (unit * (speak_len // len(unit) + 1))[:speak_len]
+    return json.dumps({"thought": "主人想出门，我应该积极回应。", "speak": speak}, ensure_ascii=False)
+
+
+def bench(fn, chunks, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 8000, 32000])
+    ap.add_argument("--chunk", type=int, default=8, help="每个流式 chunk 的字符数")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'speak 字数':>10} {'chunks':>8} {'legacy(ms)':>12} {'incremental(ms)':>16} {'加速比':>8}")
+    for size in args.sizes:
+        reply = make_reply(size)
+        chunks = [reply[i:i + args.chunk] for i in range(0, len(reply), args.chunk)]
+        legacy_ms = bench(legacy_parse, chunks, args.repeat)
+        incr_ms = bench(incremental_parse, chunks, args.repeat)
+        print(f"{size:>10} {len(chunks):>8} {legacy_ms:>12.2f} {incr_ms:>16.2f} {legacy_ms / incr_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+基准：TTS 动态微批 vs 逐句推理的吞吐对比 (CPU 桩模型，无需 GPU)
+
+    python benchmarks/bench_tts_batching.py [--clients 1 4 8 16] [--requests 8] [--base-ms 120] [--per-item-ms 25]
+
+桩模型的耗时模型：一次 pipeline 调用 = base_ms + per_item_ms × 批大小，
+模拟 GPU 上 "固定开销大、多塞几句边际成本小" 的特点。
+N 个并发客户端各自串行发送 requests 句话，直接走 InferenceWorker (与 tts_server.py 同一套调度)。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import percentiles  # noqa: E402
+from tts_inference import InferenceWorker, SynthesisJob  # noqa: E402
+
+
+def make_stub_pipeline(base_ms: float, per_item_ms: float):
+    def synthesize_batch(texts):
+        time.sleep((base_ms + per_item_ms * len(texts)) / 1000)
+        return [f"wav:{text}".encode() for text in texts]
+
+    def iter_fragments(text):
+        time.sleep((base_ms + per_item_ms) / 1000)
+        yield 32000, b"\x00\x00" * 320
+
+    return synthesize_batch, iter_fragments
+
+
+async def run_clients(worker: InferenceWorker, clients: int, requests: int):
+    latencies = []
+
+    async def client(cid: int):
+        for i in range(requests):
+            text = f"客户端{cid}的第{i}句话"
+            job = SynthesisJob(text, streaming=False)
+            started = time.perf_counter()
+            while not worker.submit(job):
+                await asyncio.sleep(0.01)
+            result = await job.future
+            assert result == f"wav:{text}".encode(), "结果路由错位"
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    return time.perf_counter() - started, latencies
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8, 16])
+    ap.add_argument("--requests", type=int, default=8, help="每个客户端串行发送的句子数")
+    ap.add_argument("--base-ms", type=float, default=120.0)
+    ap.add_argument("--per-item-ms", type=float, default=25.0)
+    ap.add_argument("--max-batch", type=int, default=8)
+    ap.add_argument("--window-ms", type=float, default=10.0)
+    args = ap.parse_args()
+
+    synthesize_batch, iter_fragments = make_stub_pipeline(args.base_ms, args.per_item_ms)
+    print(f"{'clients':>8} {'模式':>10} {'吞吐(句/s)':>12} {'p50(ms)':>10} {'p95(ms)':>10} {'平均批大小':>10}")
+    for clients in args.clients:
+        for label, max_batch in (("unbatched", 1), ("batched", args.max_batch)):
+            worker = InferenceWorker(synthesize_batch, iter_fragments, max_queue=clients * 2,
+                                     max_batch_size=max_batch, batch_window_ms=args.window_ms)
+            worker.start()
+            try:
+                elapsed, latencies = await run_clients(worker, clients, args.requests)
+            finally:
+                worker.stop()
+            stats = percentiles(latencies)
+            avg_batch = worker.completed / max(1, worker.batches)
+            print(f"{clients:>8} {label:>10} {len(latencies) / elapsed:>12.1f} "
+                  f"{stats['p50']:>10.1f} {stats['p95']:>10.1f} {avg_batch:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
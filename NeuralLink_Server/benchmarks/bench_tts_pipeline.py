@@ -0,0 +1,74 @@
+"""
+基准：TTS 流水线并发度 vs 一条回复的 "最后一句音频到达时间"
+
+    python benchmarks/bench_tts_pipeline.py [--sentences 8] [--delay 0.3] [--gpu-slots 4] [--in-flight 1 2 4]
+
+启动一个本地桩 TTS 服务 (延迟可配)，用 TtsDispatcher 合成 N 句话，
+统计首句音频时间 (TTFA) 与最后一句音频时间，并校验交付顺序。
+in-flight=1 等价于旧的单消费者 tts_worker；stream 模式走 /tts/stream 片段下发。
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_servers import make_tts_app, serve  # noqa: E402
+from tts_client import TtsClient  # noqa: E402
+from tts_dispatcher import TtsDispatcher  # noqa: E402
+
+
+async def run_once(base_url: str, sentences, max_in_flight: int, send_delay: float, streaming: bool):
+    client = TtsClient(base_url=base_url, http2=False, streaming=streaming, min_fragment_ms=0)
+    await client.start()
+    delivered = []
+    started = time.perf_counter()
+    first_audio = None
+
+    async def deliver(sentence_id, text, audio, fragment_id):
+        nonlocal first_audio
+        if first_audio is None:
+            first_audio = time.perf_counter() - started
+        await asyncio.sleep(send_delay)  # 模拟 WebSocket 下发耗时
+        if fragment_id == 0:
+            delivered.append(sentence_id)
+
+    try:
+        dispatcher = TtsDispatcher(client.fragments, deliver, max_in_flight=max_in_flight)
+        for i, text in enumerate(sentences, start=1):
+            dispatcher.submit(i, text)
+        await dispatcher.close()
+    finally:
+        await client.close()
+
+    assert delivered == list(range(1, len(sentences) + 1)), f"交付乱序: {delivered}"
+    return first_audio, time.perf_counter() - started
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sentences", type=int, default=8)
+    ap.add_argument("--delay", type=float, default=0.3, help="桩 TTS 每句合成耗时 (秒)")
+    ap.add_argument("--per-char-delay", type=float, default=0.0)
+    ap.add_argument("--gpu-slots", type=int, default=4, help="桩 TTS 可同时合成的句子数")
+    ap.add_argument("--send-delay", type=float, default=0.005)
+    ap.add_argument("--in-flight", type=int, nargs="+", default=[1, 2, 3, 4])
+    ap.add_argument("--fragments", type=int, default=4, help="桩 TTS 流式接口每句拆成的片段数")
+    ap.add_argument("--port", type=int, default=19880)
+    args = ap.parse_args()
+
+    sentences = [f"这是第{i}句测试语音，" for i in range(1, args.sentences + 1)]
+    app = make_tts_app(args.delay, args.per_char_delay, args.gpu_slots, args.fragments)
+    async with serve(app, args.port) as base_url:
+        print(f"{'模式':>6} {'in-flight':>10} {'首句音频(s)':>12} {'末句音频(s)':>12}")
+        for streaming in (False, True):
+            mode = "stream" if streaming else "whole"
+            for n in args.in_flight:
+                ttfa, ttla = await run_once(base_url, sentences, n, args.send_delay, streaming)
+                print(f"{mode:>6} {n:>10} {ttfa:>12.3f} {ttla:>12.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
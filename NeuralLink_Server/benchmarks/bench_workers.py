@@ -0,0 +1,165 @@
+"""
+基准：多 TTS / ASR 节点的负载感知路由、会话粘滞与故障转移
+
+    python benchmarks/bench_workers.py [--nodes 1 2 3] [--sessions 12] [--sentences 6] [--kill-after 1.0]
+
+在本机不同端口上启动若干桩节点 (TTS：stub_servers.make_tts_app；ASR：asr_server.create_app + FakeAsrBackend)，
+大脑侧用与生产一致的 TtsClient / RemoteAsrBackend + AsrWorker 访问：
+
+1. TTS 扩展：S 个会话各自串行合成若干句，节点数 1 → N 的吞吐、单句延迟、各节点请求分布与粘滞命中率
+2. TTS 故障转移：运行中关掉一个节点，统计失败句数 (应为 0) 与转移次数
+3. ASR 扩展：并发识别请求在 1 → N 个远程 ASR 节点上的吞吐；同样在运行中关掉一个节点验证转移
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from contextlib import AsyncExitStack
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_servers import make_tts_app, serve  # noqa: E402
+import workers  # noqa: E402
+from asr_backends import FakeAsrBackend, RemoteAsrBackend  # noqa: E402
+from asr_inference import AsrWorker  # noqa: E402
+from asr_server import create_app as create_asr_app  # noqa: E402
+from tts_client import TtsClient  # noqa: E402
+from metrics import percentiles  # noqa: E402
+
+
+async def start_nodes(make_app, ports):
+    """每个节点一个 ExitStack，可以单独关掉某一个"""
+    stacks, urls = [], []
+    for port in ports:
+        stack = AsyncExitStack()
+        urls.append(await stack.enter_async_context(serve(make_app(), port)))
+        stacks.append(stack)
+    return stacks, urls
+
+
+async def kill_later(stack: AsyncExitStack, delay: float, url: str):
+    await asyncio.sleep(delay)
+    print(f"    ✂️ {delay:.1f}s 时关闭节点 {url}")
+    await stack.aclose()
+
+
+async def run_tts(args, nodes: int, kill: bool):
+    stacks, urls = await start_nodes(
+        lambda: make_tts_app(args.tts_delay, gpu_slots=args.gpu_slots), range(args.port, args.port + nodes))
+    client = TtsClient(urls=urls, http2=False, streaming=args.stream, min_fragment_ms=0)
+    await client.start()
+    latencies, failures = [], 0
+
+    async def session(sid: int):
+        nonlocal failures
+        workers.set_affinity(f"session-{sid}")
+        for i in range(args.sentences):
+            started = time.perf_counter()
+            try:
+                async for _ in client.fragments(f"会话{sid}的第{i}句测试语音。"):
+                    pass
+                latencies.append((time.perf_counter() - started) * 1000)
+            except Exception:
+                failures += 1
+
+    killer = asyncio.create_task(kill_later(stacks[-1], args.kill_after, urls[-1])) if kill else None
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(session(s) for s in range(args.sessions)))
+        elapsed = time.perf_counter() - started
+        stats = client.pool.stats()
+    finally:
+        if killer is not None:
+            await killer
+        await client.close()
+        for stack in stacks:
+            await stack.aclose()
+    return elapsed, percentiles(latencies), failures, stats
+
+
+async def run_asr(args, nodes: int, kill: bool):
+    port = args.port + 100
+    stacks, urls = await start_nodes(
+        lambda: create_asr_app(FakeAsrBackend(args.asr_base_ms, args.asr_per_sec_ms, "测试")),
+        range(port, port + nodes))
+    backend = RemoteAsrBackend(urls)
+    await backend.load()
+    await backend.warmup()
+    worker = AsrWorker(backend.recognize_batch, max_queue=args.requests + 1, max_batch_size=args.max_batch,
+                       threads=backend.concurrency)
+    worker.start()
+    samples = np.random.default_rng(0).normal(0, 0.1, 16000 * 2).astype(np.float32)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        started = time.perf_counter()
+        try:
+            await worker.recognize(samples, None, True)
+            latencies.append((time.perf_counter() - started) * 1000)
+        except Exception:
+            failures += 1
+
+    killer = asyncio.create_task(kill_later(stacks[-1], args.kill_after / 4, urls[-1])) if kill else None
+    started = time.perf_counter()
+    try:
+        # 分几波提交，关节点的时候还有请求在路上
+        for _ in range(4):
+            await asyncio.gather(*(one() for _ in range(args.requests // 4)))
+        elapsed = time.perf_counter() - started
+        stats = backend.pool.stats()
+    finally:
+        if killer is not None:
+            await killer
+        worker.stop()
+        await backend.close()
+        for stack in stacks:
+            await stack.aclose()
+    return elapsed, percentiles(latencies), failures, stats
+
+
+def distribution(stats: dict) -> str:
+    return " / ".join(str(n["requests_total"]) for n in stats["nodes"])
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes", type=int, nargs="+", default=[1, 2, 3])
+    ap.add_argument("--sessions", type=int, default=12)
+    ap.add_argument("--sentences", type=int, default=6, help="每个会话串行合成的句数")
+    ap.add_argument("--tts-delay", type=float, default=0.2, help="桩 TTS 每句合成耗时 (秒)")
+    ap.add_argument("--gpu-slots", type=int, default=2, help="每个桩 TTS 节点可同时合成的句子数")
+    ap.add_argument("--stream", action="store_true", help="走 /tts/stream")
+    ap.add_argument("--requests", type=int, default=64, help="ASR 并发识别请求数")
+    ap.add_argument("--max-batch", type=int, default=4)
+    ap.add_argument("--asr-base-ms", type=float, default=60.0)
+    ap.add_argument("--asr-per-sec-ms", type=float, default=20.0)
+    ap.add_argument("--kill-after", type=float, default=1.0, help="故障转移测试中关闭节点的时间 (秒)")
+    ap.add_argument("--port", type=int, default=19900)
+    args = ap.parse_args()
+
+    print(f"TTS：{args.sessions} 个会话 × {args.sentences} 句，每节点 {args.gpu_slots} 路 × {args.tts_delay}s/句")
+    print(f"{'节点':>4} | {'故障':>4} | {'总耗时':>8} | {'句 p50':>8} | {'句 p95':>8} | {'失败':>4} | "
+          f"{'转移':>4} | {'粘滞命中':>8} | 各节点请求数")
+    for nodes in args.nodes:
+        for kill in ((False, True) if nodes > 1 else (False,)):
+            elapsed, lat, failures, stats = await run_tts(args, nodes, kill)
+            hits = stats["sticky_hits"] / max(1, stats["sticky_hits"] + stats["sticky_moves"])
+            print(f"{nodes:>4} | {'是' if kill else '否':>4} | {elapsed * 1000:>6.0f}ms | {lat['p50']:>6.0f}ms | "
+                  f"{lat['p95']:>6.0f}ms | {failures:>4} | {stats['failovers']:>4} | {hits:>7.0%} | {distribution(stats)}")
+
+    print(f"\nASR：{args.requests} 个 2s 语音，每节点 {args.asr_base_ms}ms + {args.asr_per_sec_ms}ms/s，"
+          f"节点内合批上限 {args.max_batch}")
+    print(f"{'节点':>4} | {'故障':>4} | {'总耗时':>8} | {'条 p50':>8} | {'条 p95':>8} | {'失败':>4} | {'转移':>4} | 各节点请求数")
+    for nodes in args.nodes:
+        for kill in ((False, True) if nodes > 1 else (False,)):
+            elapsed, lat, failures, stats = await run_asr(args, nodes, kill)
+            print(f"{nodes:>4} | {'是' if kill else '否':>4} | {elapsed * 1000:>6.0f}ms | {lat['p50']:>6.0f}ms | "
+                  f"{lat['p95']:>6.0f}ms | {failures:>4} | {stats['failovers']:>4} | {distribution(stats)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
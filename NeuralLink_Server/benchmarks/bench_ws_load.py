@@ -0,0 +1,476 @@
+"""
+压测：整条 WebSocket 回合链路 (握手 → 上行音频 → ASR → 文本请求 → 大模型 → TTS 下发 → 打断) 的并发表现
+
+    python benchmarks/bench_ws_load.py [--clients 1 8 32] [--turns 3] [--interrupt-rate 0.3] [--binary]
+                                       [--asr-base-ms 30] [--llm-ttft-ms 300] [--tts-delay 0.2] [--speculative]
+
+不需要 GPU、模型权重和外网：ASR 换成 asr_backends.FakeAsrBackend，大模型换成 llm_backends.FakeBackend，
+TTS 指向本地桩服务 (stub_servers.make_tts_app)，三者的延迟都可配。导入 main 之前先写好 NEURALLINK_* 环境变量，
+再在进程内跑 FastAPI 的 lifespan，用一个极简的 ASGI WebSocket 驱动 (不依赖 websockets 库) 模拟 N 个并发客户端。
+每个客户端都走真实协议：握手 (pcm_s16le，可选 V2 二进制帧)、按实时节奏上传音频块、is_last、等最终识别结果、
+像前端 MemoryManager 一样带 history_delta 发文本请求、收音频直到 is_reply_end；
+按 --interrupt-rate 的概率在收到第一段回复音频后发打断。
+
+统计：
+- 吞吐：每秒完成的回合数
+- TTFA：is_last 到第一段回复音频 (sentence_id > 0，不含填充音) 的 p50/p95/p99，以及从文本请求算起的 TTFA
+- 打断：发出打断到最后一条残留下行消息的时间 (客户端视角)、残留消息数，以及服务端的 interrupt_to_silence
+- 每会话内存：tracemalloc 统计 M 个在线连接 (各完成一轮) 的内存增量，以及断开后仍保留的部分 (会话记忆)
+
+--url ws://host:port/ws 改为压测一个已经启动的大脑进程 (需要安装 websockets；用哪些后端由对方进程的
+环境变量决定，例如 NEURALLINK_ASR_BACKEND=fake NEURALLINK_LLM_BACKEND=fake)，此时不统计内存与服务端指标。
+"""
+import argparse
+import asyncio
+import base64
+import gc
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import unicodedata
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import binary_protocol  # noqa: E402
+from stub_servers import make_tts_app, serve  # noqa: E402
+
+# 注意：config / main 及依赖它们的模块要等 configure_env 写好环境变量之后才能导入
+
+SAMPLE_RATE = 16000
+ACCESS_TOKEN = "neural_link_secret_2026"
+FILLER_TEXT = "嗯……"   # 与 config.FILLER_TEXT 一致
+
+AUTH = "client.auth_handshake"
+AUDIO_CHUNK = "client.audio_chunk"
+TEXT_REQUEST = "client.text_request"
+INTERRUPT = "client.interrupt"
+AUTH_RESULT = "server.auth_result"
+ASR_RESULT = "server.asr_result"
+TTS_AUDIO = "server.tts_audio"
+ERROR = "server.error"
+
+
+def configure_env(args, tts_url: str):
+    env = {
+        "NEURALLINK_ASR_BACKEND": "fake",
+        "NEURALLINK_ASR_FAKE_BASE_MS": args.asr_base_ms,
+        "NEURALLINK_ASR_FAKE_PER_SEC_MS": args.asr_per_sec_ms,
+        "NEURALLINK_LLM_BACKEND": "fake",
+        "NEURALLINK_LLM_FAKE_TTFT_MS": args.llm_ttft_ms,
+        "NEURALLINK_LLM_FAKE_CHUNK_MS": args.llm_chunk_ms,
+        "NEURALLINK_LLM_SPECULATIVE": int(args.speculative),
+        "NEURALLINK_TTS_URL": tts_url,
+        "NEURALLINK_TTS_HTTP2": 0,
+        "NEURALLINK_TTS_STREAMING": int(args.tts_stream),
+        "NEURALLINK_TTS_PREWARM_PHRASES": FILLER_TEXT,
+        "NEURALLINK_TRACE_LOG": 0,
+    }
+    if not args.tts_cache:
+        # 假大模型每轮回复都一样，短句全进缓存就测不到 TTS 了；只留填充音 (按缓存键的 NFKC 归一化长度算)
+        env["NEURALLINK_TTS_CACHE_MAX_TEXT_LEN"] = len(unicodedata.normalize("NFKC", FILLER_TEXT))
+    for key, value in env.items():
+        os.environ[key] = str(value)
+
+
+def synthetic_utterance(seconds: float, seed: int) -> bytes:
+    """前后各留一段静音，中间是调幅噪声 "说话"，产出 16kHz PCM16 字节 (能通过服务端 VAD)"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    envelope = 0.5 + 0.5 * np.sin(np.linspace(0, 6 * np.pi, n))
+    speech = rng.normal(0, 0.2, n) * envelope
+    pcm = np.concatenate([np.zeros(SAMPLE_RATE // 5), speech, np.zeros(SAMPLE_RATE * 3 // 10)])
+    return (np.clip(pcm, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+# ==========================================
+# WebSocket 驱动
+# ==========================================
+class ConnectionClosed(Exception):
+    pass
+
+
+class AsgiWebSocket:
+    """进程内 ASGI WebSocket 连接：直接调用 app(scope, receive, send)，不经过网络与 websockets 库"""
+
+    def __init__(self, app, path: str = "/ws"):
+        self.app = app
+        self.path = path
+        self._inbox: asyncio.Queue = asyncio.Queue()    # 客户端 -> 服务端
+        self._outbox: asyncio.Queue = asyncio.Queue()   # 服务端 -> 客户端
+        self._task = None
+
+    async def connect(self):
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+            "path": self.path, "raw_path": self.path.encode(), "root_path": "", "query_string": b"",
+            "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+            "subprotocols": [], "state": {},
+        }
+        await self._inbox.put({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(scope, self._inbox.get, self._outbox.put))
+        message = await self._outbox.get()
+        if message["type"] != "websocket.accept":
+            raise ConnectionClosed(f"握手被拒绝: {message}")
+
+    async def send(self, data):
+        key = "bytes" if isinstance(data, bytes) else "text"
+        await self._inbox.put({"type": "websocket.receive", key: data})
+
+    async def recv(self):
+        message = await self._outbox.get()
+        if message["type"] == "websocket.close":
+            raise ConnectionClosed(f"服务端关闭连接 [{message.get('code')}]")
+        return message["bytes"] if message.get("bytes") is not None else message["text"]
+
+    async def close(self):
+        await self._inbox.put({"type": "websocket.disconnect", "code": 1000})
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class NetWebSocket:
+    """--url 模式：通过网络压测一个已经启动的大脑进程"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._ws = None
+
+    async def connect(self):
+        import websockets
+        self._ws = await websockets.connect(self.url, max_size=None)
+
+    async def send(self, data):
+        await self._ws.send(data)
+
+    async def recv(self):
+        import websockets
+        try:
+            return await self._ws.recv()
+        except websockets.ConnectionClosed as e:
+            raise ConnectionClosed(str(e)) from None
+
+    async def close(self):
+        await self._ws.close()
+
+
+# ==========================================
+# 模拟客户端
+# ==========================================
+class LoadStats:
+    def __init__(self):
+        self.turns = 0
+        self.interrupted = 0
+        self.fillers = 0
+        self.errors = []
+        self.ttfa_ms = []           # is_last -> 第一段回复音频
+        self.ttfa_request_ms = []   # 文本请求 -> 第一段回复音频
+        self.asr_final_ms = []      # is_last -> 最终识别结果
+        self.interrupt_ms = []      # 打断 -> 最后一条残留下行消息
+        self.stale_messages = 0
+
+
+class SimulatedClient:
+    def __init__(self, ws, index: int, args, stats: LoadStats):
+        self.ws = ws
+        self.args = args
+        self.stats = stats
+        self.rng = random.Random(args.seed + index)
+        self.session_id = f"bench-{args.seed}-{index}"
+        self.history = []   # 与前端 MemoryManager 一样的本地记忆
+        self.synced = 0     # 服务端已同步的条数
+        self.audio = synthetic_utterance(args.utterance_s, args.seed + index)
+
+    async def send_json(self, msg_type: str, payload: dict, msg_id: str = None) -> str:
+        msg_id = msg_id or str(uuid.uuid4())
+        await self.ws.send(json.dumps({"msg_id": msg_id, "type": msg_type,
+                                       "timestamp": int(time.time() * 1000), "payload": payload}))
+        return msg_id
+
+    async def next_message(self, timeout: float):
+        """返回 (消息类型, payload)；V2 二进制音频帧也还原成 tts_audio"""
+        data = await asyncio.wait_for(self.ws.recv(), timeout)
+        if isinstance(data, bytes):
+            frame = binary_protocol.unpack_frame(data)
+            return TTS_AUDIO, {"sentence_id": frame.sentence_id, "fragment_id": frame.fragment_id,
+                               "sync_text": frame.sync_text, "is_reply_end": False}
+        msg = json.loads(data)
+        return msg["type"], msg["payload"]
+
+    async def handshake(self):
+        await self.send_json(AUTH, {
+            "access_token": ACCESS_TOKEN,
+            "protocol_version": binary_protocol.PROTOCOL_VERSION if self.args.binary else 1,
+            "binary_audio": self.args.binary,
+            "audio_format": "pcm_s16le",
+            "sample_rate": SAMPLE_RATE,
+            "speculative_llm": self.args.speculative,
+            "session_id": self.session_id,
+        })
+        msg_type, payload = await self.next_message(self.args.timeout)
+        if msg_type != AUTH_RESULT:
+            raise ConnectionClosed(f"握手失败: {msg_type} {payload}")
+        self.synced = payload.get("history_synced", 0)
+
+    async def speak(self) -> float:
+        """按实时节奏上传一句话，返回发出 is_last 的时刻"""
+        msg_id = str(uuid.uuid4())
+        step = SAMPLE_RATE * 2 * self.args.chunk_ms // 1000
+        chunks = [self.audio[i:i + step] for i in range(0, len(self.audio), step)]
+        for i, chunk in enumerate(chunks):
+            last = i == len(chunks) - 1
+            if self.args.binary:
+                await self.ws.send(binary_protocol.pack_frame(
+                    binary_protocol.KIND_CLIENT_AUDIO, msg_id, chunk,
+                    flags=binary_protocol.FLAG_LAST if last else 0))
+            else:
+                await self.send_json(AUDIO_CHUNK, {"audio_b64": base64.b64encode(chunk).decode(),
+                                                   "is_last": last}, msg_id)
+            if not last and not self.args.fast:
+                await asyncio.sleep(self.args.chunk_ms / 1000)
+        return time.perf_counter()
+
+    async def turn(self):
+        timeout = self.args.timeout
+        speech_end = await self.speak()
+
+        # 中间识别结果跳过，等最终结果
+        while True:
+            msg_type, payload = await self.next_message(timeout)
+            if msg_type == ASR_RESULT and payload.get("is_final"):
+                break
+        self.stats.asr_final_ms.append((time.perf_counter() - speech_end) * 1000)
+        text = payload.get("text", "")
+        if not text:
+            self.stats.errors.append("no_speech")
+            return
+
+        self.history.append({"role": "user", "content": text})
+        base = self.synced
+        request_sent = time.perf_counter()
+        await self.send_json(TEXT_REQUEST, {"text": text, "history_base": base,
+                                            "history_delta": self.history[base:]})
+        self.synced = len(self.history)
+
+        barge_in = self.rng.random() < self.args.interrupt_rate
+        spoken, first_audio, filler = [], None, False
+        while True:
+            msg_type, payload = await self.next_message(timeout)
+            if msg_type == ERROR:
+                self.stats.errors.append(payload.get("message", "server.error"))
+                return
+            if msg_type != TTS_AUDIO:
+                continue
+            if payload.get("is_reply_end"):
+                break
+            if payload["sentence_id"] <= 0:
+                filler = True
+                continue
+            spoken.append(payload.get("sync_text", ""))
+            if first_audio is None:
+                first_audio = time.perf_counter()
+                self.stats.ttfa_ms.append((first_audio - speech_end) * 1000)
+                self.stats.ttfa_request_ms.append((first_audio - request_sent) * 1000)
+                if barge_in:
+                    await self.interrupt()
+                    break
+
+        reply = "".join(spoken)
+        if barge_in:
+            reply += "-(被打断)"
+            self.stats.interrupted += 1
+        self.history.append({"role": "assistant", "content": reply})
+        self.stats.fillers += filler
+        self.stats.turns += 1
+
+    async def interrupt(self):
+        """发打断，然后一直收到下行安静 quiet_ms 为止，统计残留消息"""
+        sent = time.perf_counter()
+        await self.send_json(INTERRUPT, {"reason": "bench_barge_in"})
+        last = sent
+        while True:
+            try:
+                await self.next_message(self.args.quiet_ms / 1000)
+            except asyncio.TimeoutError:
+                break
+            last = time.perf_counter()
+            self.stats.stale_messages += 1
+        self.stats.interrupt_ms.append((last - sent) * 1000)
+
+
+async def run_client(connect, index: int, args, stats: LoadStats, turns: int):
+    await asyncio.sleep(random.Random(index).uniform(0, args.ramp))  # 错开起步，避免所有客户端同步说话
+    ws = connect()
+    try:
+        await ws.connect()
+        client = SimulatedClient(ws, index, args, stats)
+        await client.handshake()
+        for _ in range(turns):
+            await client.turn()
+            await asyncio.sleep(args.think)
+    except (asyncio.TimeoutError, ConnectionClosed) as e:
+        stats.errors.append(f"{type(e).__name__}: {e}")
+    finally:
+        await ws.close()
+
+
+async def run_load(connect, clients: int, args) -> dict:
+    from metrics import percentiles
+
+    stats = LoadStats()
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(connect, i, args, stats, args.turns) for i in range(clients)))
+    wall = time.perf_counter() - started
+    return {
+        "clients": clients,
+        "turns": stats.turns,
+        "turns_per_s": round(stats.turns / wall, 2),
+        "interrupted": stats.interrupted,
+        "fillers": stats.fillers,
+        "errors": len(stats.errors),
+        "error_samples": sorted(set(stats.errors))[:3],
+        "asr_final": percentiles(stats.asr_final_ms),
+        "ttfa": percentiles(stats.ttfa_ms),
+        "ttfa_from_request": percentiles(stats.ttfa_request_ms),
+        "interrupt_quiet": percentiles(stats.interrupt_ms),
+        "stale_per_interrupt": round(stats.stale_messages / max(1, stats.interrupted), 2),
+    }
+
+
+async def measure_memory(app, sessions: int, args) -> dict:
+    """tracemalloc 下开 M 条连接各完成一轮：在线时的增量 / 断开后仍保留的增量 (会话记忆)"""
+    quiet = argparse.Namespace(**{**vars(args), "interrupt_rate": 0.0, "ramp": 0.0, "fast": True})
+    stats = LoadStats()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        sockets = [AsgiWebSocket(app) for _ in range(sessions)]
+
+        async def one_turn(index: int):
+            await sockets[index].connect()
+            client = SimulatedClient(sockets[index], 10_000 + index, quiet, stats)
+            await client.handshake()
+            await client.turn()
+
+        await asyncio.gather(*(one_turn(i) for i in range(sessions)))
+        gc.collect()
+        live = tracemalloc.get_traced_memory()[0] - baseline
+        await asyncio.gather(*(ws.close() for ws in sockets))
+        sockets.clear()   # one_turn 闭包还引用着这个列表，清空而不是 del
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return {"sessions": sessions, "errors": len(stats.errors),
+            "live_kb_per_session": round(live / sessions / 1024, 1),
+            "retained_kb_per_session": round(retained / sessions / 1024, 1)}
+
+
+def print_result(result: dict):
+    ttfa, ttfa_req, quiet = result["ttfa"], result["ttfa_from_request"], result["interrupt_quiet"]
+    print(f"{result['clients']:>7} | {result['turns']:>5} | {result['turns_per_s']:>7} | "
+          f"{result['asr_final']['p50']:>7} | {ttfa['p50']:>7} | {ttfa['p95']:>7} | {ttfa['p99']:>7} | "
+          f"{ttfa_req['p50']:>7} | {quiet['p50']:>6} | {quiet['p95']:>6} | {result['stale_per_interrupt']:>5} | "
+          f"{result['fillers']:>4} | {result['errors']:>3}")
+    if result["error_samples"]:
+        print(f"        错误示例: {result['error_samples']}")
+
+
+def print_header(args, target: str):
+    print(f"目标: {target} | 每客户端 {args.turns} 轮 | 话音 {args.utterance_s}s / 块 {args.chunk_ms}ms"
+          f"{' (不按实时节奏)' if args.fast else ''} | 打断率 {args.interrupt_rate} | "
+          f"{'二进制帧' if args.binary else 'JSON+Base64'} | 推测执行 {args.speculative}")
+    print("clients | turns | turns/s | asr p50 | ttfa50 | ttfa95 | ttfa99 | req→a50 | int50 | int95 | stale | fill | err")
+
+
+async def run_local(args):
+    async with serve(make_tts_app(delay=args.tts_delay, per_char_delay=args.tts_per_char,
+                                  gpu_slots=args.tts_slots, fragments=args.tts_fragments), args.tts_port) as tts_url:
+        configure_env(args, tts_url)
+        import logging
+
+        import main
+        import metrics
+        from tts_cache import tts_cache
+
+        for name in ("NeuralLink_Brain", "httpx"):
+            logging.getLogger(name).setLevel(logging.INFO if args.verbose else logging.ERROR)
+        async with main.app.router.lifespan_context(main.app):
+            # 模型在后台分阶段加载，就绪之前的连接会被 1013 拒绝
+            if not await main.readiness.wait():
+                raise SystemExit(f"大脑进程未能就绪: {main.readiness.report()}")
+            # 再等填充音预热完成，否则前几轮的看门狗拿不到填充音
+            for _ in range(100):
+                if await tts_cache.get(FILLER_TEXT) is not None:
+                    break
+                await asyncio.sleep(0.05)
+
+            print(f"ASR 假后端 {args.asr_base_ms}ms + {args.asr_per_sec_ms}ms/s | 大模型首 token {args.llm_ttft_ms}ms "
+                  f"分块 {args.llm_chunk_ms}ms | TTS 每句 {args.tts_delay}s × {args.tts_slots} 路"
+                  f"{' (流式)' if args.tts_stream else ''}")
+            print_header(args, "进程内 ASGI")
+            for clients in args.clients:
+                print_result(await run_load(lambda: AsgiWebSocket(main.app), clients, args))
+
+            silence = metrics.latency("interrupt_to_silence").snapshot()
+            print(f"\n服务端 interrupt_to_silence (全部轮次): p50 {silence['p50_ms']}ms / p95 {silence['p95_ms']}ms "
+                  f"(n={silence['count']})")
+            if args.memory_sessions:
+                memory = await measure_memory(main.app, args.memory_sessions, args)
+                print(f"每会话内存 ({memory['sessions']} 个会话各一轮): 在线 {memory['live_kb_per_session']} KB，"
+                      f"断开后保留 {memory['retained_kb_per_session']} KB (会话记忆，TTL 内不释放)"
+                      f"{'，出错 ' + str(memory['errors']) + ' 个' if memory['errors'] else ''}")
+
+
+async def run_remote(args):
+    if importlib.util.find_spec("websockets") is None:
+        raise SystemExit("--url 模式需要安装 websockets (pip install websockets)")
+    print_header(args, args.url)
+    for clients in args.clients:
+        print_result(await run_load(lambda: NetWebSocket(args.url), clients, args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=3, help="每个客户端的对话轮数")
+    parser.add_argument("--utterance-s", type=float, default=1.5, help="每句话的语音时长")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="上行音频块时长")
+    parser.add_argument("--fast", action="store_true", help="不按实时节奏，一口气发完音频")
+    parser.add_argument("--think", type=float, default=0.2, help="两轮之间的停顿 (秒)")
+    parser.add_argument("--ramp", type=float, default=1.0, help="客户端起步的随机错开范围 (秒)")
+    parser.add_argument("--interrupt-rate", type=float, default=0.3, help="收到第一段回复音频后打断的概率")
+    parser.add_argument("--quiet-ms", type=int, default=300, help="打断后下行安静多久算彻底停下")
+    parser.add_argument("--timeout", type=float, default=30.0, help="单条消息的最长等待 (秒)")
+    parser.add_argument("--binary", action="store_true", help="协商协议 V2 二进制音频帧")
+    parser.add_argument("--speculative", action="store_true", help="开启推测执行大模型")
+    parser.add_argument("--seed", type=int, default=0)
+    # 桩后端
+    parser.add_argument("--asr-base-ms", type=float, default=30.0)
+    parser.add_argument("--asr-per-sec-ms", type=float, default=10.0)
+    parser.add_argument("--llm-ttft-ms", type=float, default=300.0)
+    parser.add_argument("--llm-chunk-ms", type=float, default=30.0)
+    parser.add_argument("--tts-delay", type=float, default=0.2, help="每句合成耗时 (秒)")
+    parser.add_argument("--tts-per-char", type=float, default=0.0)
+    parser.add_argument("--tts-slots", type=int, default=4, help="TTS 桩同时能合成的句子数")
+    parser.add_argument("--tts-fragments", type=int, default=4)
+    parser.add_argument("--tts-stream", action="store_true", help="走 /tts/stream 片段下发")
+    parser.add_argument("--tts-cache", action="store_true", help="保留合成缓存的默认配置 (假回复会被缓存命中)")
+    parser.add_argument("--tts-port", type=int, default=19880)
+    parser.add_argument("--memory-sessions", type=int, default=50, help="内存测量的会话数，0 跳过")
+    parser.add_argument("--url", default="", help="压测已启动的大脑进程，例如 ws://127.0.0.1:8000/ws")
+    parser.add_argument("--verbose", action="store_true", help="输出大脑进程的日志")
+    args = parser.parse_args()
+
+    asyncio.run(run_remote(args) if args.url else run_local(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+基准测试用的本地桩服务 (不依赖 GPU / 模型权重)
+
+- make_tts_app：模拟 tts_server.py 的 /tts、/tts/stream 与 /health/ready 接口，延迟可配，返回一段静音 WAV
+- make_llm_app：模拟 OpenAI 兼容的 /v1/chat/completions 流式接口 (SSE)，首 token 延迟与分块节奏可配
+- serve：在当前事件循环里后台启动一个 uvicorn 服务，退出时自动关闭
+"""
+import asyncio
+import io
+import json
+import time
+import wave
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import Response, StreamingResponse
+
+
+def silent_wav(duration: float = 0.2, sample_rate: int = 32000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00\x00" * int(duration * sample_rate))
+    return buffer.getvalue()
+
+
+def make_tts_app(delay: float = 0.2, per_char_delay: float = 0.0, gpu_slots: int = 4,
+                 fragments: int = 4) -> FastAPI:
+    """delay: 每句固定合成耗时；per_char_delay: 每字额外耗时；gpu_slots: 同时能合成的句子数；
+    fragments: /tts/stream 每句拆成的片段数 (合成耗时均摊到每个片段)"""
+    app = FastAPI()
+    slots = asyncio.Semaphore(gpu_slots)
+    audio = silent_wav()
+    header, pcm = audio[:44], audio[44:]
+
+    @app.get("/health/ready")
+    async def health_ready():
+        return {"ready": True}
+
+    @app.get("/tts")
+    async def tts(text: str = Query(...)):
+        enqueued = time.perf_counter()
+        async with slots:
+            started = time.perf_counter()
+            await asyncio.sleep(delay + per_char_delay * len(text))
+        # 与 tts_server.py 一样在 Server-Timing 里回报排队与合成耗时
+        timing = f"queue;dur={(started - enqueued) * 1000:.1f}, synth;dur={(time.perf_counter() - started) * 1000:.1f}"
+        return Response(content=audio, media_type="audio/wav", headers={"Server-Timing": timing})
+
+    @app.get("/tts/stream")
+    async def tts_stream(text: str = Query(...)):
+        async def fragment_stream():
+            async with slots:
+                yield header[:40] + b"\xff\xff\xff\xff"
+                for _ in range(fragments):
+                    await asyncio.sleep((delay + per_char_delay * len(text)) / fragments)
+                    yield pcm
+        return StreamingResponse(fragment_stream(), media_type="audio/wav")
+
+    return app
+
+
+def make_llm_app(ttft: float = 0.3, chunk_delay: float = 0.03, chunk_chars: int = 8) -> FastAPI:
+    """回复内容与 llm_backends.FakeBackend 一致；app.state.aborted 统计客户端中途断开 (即服务端停止生成) 的次数"""
+    from llm_backends import FakeBackend
+
+    app = FastAPI()
+    app.state.aborted = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        user_text = next((m["content"] for m in reversed(body["messages"]) if m["role"] == "user"), "")
+        reply = FakeBackend.reply_for(user_text)
+
+        async def events():
+            try:
+                await asyncio.sleep(ttft)
+                for start in range(0, len(reply), chunk_chars):
+                    if start:
+                        await asyncio.sleep(chunk_delay)
+                    delta = {"choices": [{"index": 0, "delta": {"content": reply[start:start + chunk_chars]}}]}
+                    yield f"data: {json.dumps(delta, ensure_ascii=False)}\n\n"
+                yield "data: [DONE]\n\n"
+            except asyncio.CancelledError:
+                app.state.aborted += 1
+                raise
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+@asynccontextmanager
+async def serve(app: FastAPI, port: int, host: str = "127.0.0.1"):
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}"
+    finally:
+        server.should_exit = True
+        await task
@@ -0,0 +1,80 @@
+"""
+NeuralLink 协议 V2：音频走二进制 WebSocket 帧
+
+V1 把音频 Base64 后塞进 JSON 信封，体积膨胀 33%，收发两端都多了编解码与拷贝。
+V2 在 CLIENT_AUTH_HANDSHAKE 中协商 (binary_audio: true)，之后：
+
+- 控制消息照旧走 JSON 文本帧
+- CLIENT_AUDIO_CHUNK / SERVER_TTS_AUDIO 的音频改走二进制帧
+
+二进制帧布局 (小端)：
+    0   u8      kind         帧类型 (1 = 上行音频块, 2 = 下行 TTS 音频)
+    1   u8      flags        bit0 = is_last (上行) / is_reply_end (下行)
+    2   u16     fragment_id  同一句话的片段序号
+    4   i32     sentence_id  句子序号 (0 = 填充音, 上行帧恒为 0)
+    8   16B     msg_id       UUID 的 16 字节原始形式
+    24  u16     text_len     sync_text 的 UTF-8 字节数
+    26  ...     sync_text    字幕 (仅下行帧可能非空)
+    ..  ...     audio        音频数据 (WebM/PCM 或 WAV)
+"""
+import struct
+import uuid
+from typing import NamedTuple
+
+PROTOCOL_VERSION = 2
+
+KIND_CLIENT_AUDIO = 1
+KIND_SERVER_TTS_AUDIO = 2
+
+FLAG_LAST = 0x01
+
+_HEADER = struct.Struct("<BBHi16sH")
+HEADER_SIZE = _HEADER.size
+
+
+class BinaryFrame(NamedTuple):
+    kind: int
+    flags: int
+    fragment_id: int
+    sentence_id: int
+    msg_id: str
+    sync_text: str
+    audio: memoryview
+
+    @property
+    def is_last(self) -> bool:
+        return bool(self.flags & FLAG_LAST)
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def _msg_id_bytes(msg_id: str) -> bytes:
+    try:
+        return uuid.UUID(msg_id).bytes
+    except (ValueError, TypeError, AttributeError):
+        return bytes(16)
+
+
+def pack_frame(kind: int, msg_id: str, audio: bytes, sentence_id: int = 0, fragment_id: int = 0,
+               sync_text: str = "", flags: int = 0) -> bytes:
+    text = sync_text.encode("utf-8")
+    header = _HEADER.pack(kind, flags, fragment_id & 0xFFFF, sentence_id, _msg_id_bytes(msg_id), len(text))
+    return b"".join((header, text, audio))
+
+
+def unpack_frame(data: bytes) -> BinaryFrame:
+    if len(data) < HEADER_SIZE:
+        raise ProtocolError(f"二进制帧过短: {len(data)} 字节")
+    kind, flags, fragment_id, sentence_id, raw_id, text_len = _HEADER.unpack_from(data)
+    text_end = HEADER_SIZE + text_len
+    if text_end > len(data):
+        raise ProtocolError("二进制帧字幕长度越界")
+    view = memoryview(data)
+    try:
+        sync_text = bytes(view[HEADER_SIZE:text_end]).decode("utf-8") if text_len else ""
+    except UnicodeDecodeError as e:
+        raise ProtocolError(f"二进制帧字幕不是合法的 UTF-8: {e}") from None
+    return BinaryFrame(kind, flags, fragment_id, sentence_id, str(uuid.UUID(bytes=raw_id)),
+                       sync_text, view[text_end:])
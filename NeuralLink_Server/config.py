@@ -0,0 +1,138 @@
+"""
+NeuralLink 大脑节点配置
+
+所有参数都可以通过环境变量覆盖，方便大脑与 TTS 节点部署在不同机器上，无需改代码。
+"""
+import os
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.getenv(name, default)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_list(name: str, default: list, sep: str = "|") -> list:
+    value = os.getenv(name)
+    if not value:
+        return list(default)
+    return [item.strip() for item in value.split(sep) if item.strip()]
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ==========================================
+# TTS 节点 (GPT-SoVITS, tts_server.py)
+# ==========================================
+TTS_BASE_URL = _env_str("NEURALLINK_TTS_URL", "http://127.0.0.1:9880").rstrip("/")
+TTS_URLS = _env_list("NEURALLINK_TTS_URLS", [TTS_BASE_URL], sep=",")          # 多个 TTS 节点 (逗号分隔)，按负载路由
+TTS_MAX_ATTEMPTS = _env_int("NEURALLINK_TTS_MAX_ATTEMPTS", 2)               # 单句最多尝试几个节点 (故障转移)
+TTS_HTTP2 = _env_bool("NEURALLINK_TTS_HTTP2", True)            # 需要安装 h2；缺失时自动回退 HTTP/1.1
+TTS_MAX_CONNECTIONS = _env_int("NEURALLINK_TTS_MAX_CONNECTIONS", 16)
+TTS_MAX_KEEPALIVE = _env_int("NEURALLINK_TTS_MAX_KEEPALIVE", 8)
+TTS_KEEPALIVE_EXPIRY = _env_float("NEURALLINK_TTS_KEEPALIVE_EXPIRY", 30.0)   # 秒
+TTS_CONNECT_TIMEOUT = _env_float("NEURALLINK_TTS_CONNECT_TIMEOUT", 2.0)     # 秒
+TTS_READ_TIMEOUT = _env_float("NEURALLINK_TTS_READ_TIMEOUT", 15.0)          # 单句合成超时 (秒)
+TTS_STREAMING = _env_bool("NEURALLINK_TTS_STREAMING", True)       # 走 /tts/stream，边合成边下发片段
+TTS_MIN_FRAGMENT_MS = _env_int("NEURALLINK_TTS_MIN_FRAGMENT_MS", 300)       # 流式片段最短时长，避免前端碎片化播放
+TTS_MAX_IN_FLIGHT = _env_int("NEURALLINK_TTS_MAX_IN_FLIGHT", 3)             # 单回合同时在合成的句子数
+
+# ==========================================
+# 合成音频缓存 (tts_cache.py)
+# ==========================================
+TTS_VOICE = _env_str("NEURALLINK_TTS_VOICE", "default")                     # 音色标识，参与缓存键
+TTS_CACHE_MAX_BYTES = _env_int("NEURALLINK_TTS_CACHE_MAX_BYTES", 64 * 1024 * 1024)  # 内存层上限，0 关闭缓存
+TTS_CACHE_MAX_TEXT_LEN = _env_int("NEURALLINK_TTS_CACHE_MAX_TEXT_LEN", 32)  # 只缓存短句，长句几乎不会重复
+TTS_CACHE_DIR = _env_str("NEURALLINK_TTS_CACHE_DIR", "")                    # 磁盘层目录，留空则只用内存
+FILLER_TEXT = "嗯……"
+# 启动预热的填充音与常用语 (用 | 分隔)
+TTS_PREWARM_PHRASES = _env_list("NEURALLINK_TTS_PREWARM_PHRASES",
+                                [FILLER_TEXT, "好的。", "你好！", "没问题。", "抱歉，我没听清。"])
+
+# ==========================================
+# 语音识别 (SenseVoice, asr_stream.py)
+# ==========================================
+ASR_BACKEND = _env_str("NEURALLINK_ASR_BACKEND", "sensevoice")             # sensevoice | fake | remote (asr_backends.py)
+ASR_URLS = _env_list("NEURALLINK_ASR_URLS", ["http://127.0.0.1:9890"], sep=",")   # remote 后端的 ASR 节点 (asr_server.py)
+ASR_REMOTE_TIMEOUT = _env_float("NEURALLINK_ASR_REMOTE_TIMEOUT", 10.0)      # 远程识别单次请求超时 (秒)
+ASR_FAKE_BASE_MS = _env_float("NEURALLINK_ASR_FAKE_BASE_MS", 30.0)          # 假后端每次识别的固定开销
+ASR_FAKE_PER_SEC_MS = _env_float("NEURALLINK_ASR_FAKE_PER_SEC_MS", 10.0)    # 假后端每秒音频的识别耗时
+ASR_FAKE_TEXT = _env_str("NEURALLINK_ASR_FAKE_TEXT", "你好，今天天气怎么样？")
+ASR_STREAMING = _env_bool("NEURALLINK_ASR_STREAMING", True)       # 边收音频块边识别，推送中间结果
+ASR_STREAM_STEP_MS = _env_int("NEURALLINK_ASR_STREAM_STEP_MS", 500)         # 每攒够这么多新音频做一次中间识别
+ASR_SEGMENT_MS = _env_int("NEURALLINK_ASR_SEGMENT_MS", 3000)                # 未定稿尾巴的上限，决定 is_last 之后的最终延迟
+ASR_DEVICE = _env_str("NEURALLINK_ASR_DEVICE", "cuda:0")                    # 无显卡的机器设为 cpu
+ASR_MAX_QUEUE = _env_int("NEURALLINK_ASR_MAX_QUEUE", 32)                    # 识别请求排队上限
+ASR_MAX_BATCH_SIZE = _env_int("NEURALLINK_ASR_MAX_BATCH_SIZE", 8)           # 跨会话合批的最大条数
+ASR_BATCH_WINDOW_MS = _env_float("NEURALLINK_ASR_BATCH_WINDOW_MS", 10.0)    # 凑批最多等待的时间
+
+# ==========================================
+# 工作节点池 (workers.py)：多 TTS / ASR 节点的健康检查与路由
+# ==========================================
+WORKER_HEALTH_INTERVAL_S = _env_float("NEURALLINK_WORKER_HEALTH_INTERVAL_S", 2.0)   # 探测 /health/ready 的间隔
+WORKER_HEALTH_TIMEOUT_S = _env_float("NEURALLINK_WORKER_HEALTH_TIMEOUT_S", 1.0)
+WORKER_STICKY_SLACK = _env_int("NEURALLINK_WORKER_STICKY_SLACK", 2)   # 粘住的节点比最空闲节点多出几个在途请求才迁走
+
+# ==========================================
+# WebSocket 连接与会话资源上限 (main.py, outbound.py)
+# ==========================================
+WS_MAX_CONNECTIONS = _env_int("NEURALLINK_WS_MAX_CONNECTIONS", 200)         # 单进程同时在线的连接数，超出以 1013 拒绝
+WS_SEND_QUEUE = _env_int("NEURALLINK_WS_SEND_QUEUE", 64)                    # 每连接下行队列的消息条数上限
+WS_SEND_TIMEOUT_S = _env_float("NEURALLINK_WS_SEND_TIMEOUT_S", 10.0)        # 下行队列满后最多等多久，超时视为客户端卡死并断开
+AUDIO_MAX_BYTES = _env_int("NEURALLINK_AUDIO_MAX_BYTES", 4 * 1024 * 1024)   # 单句语音缓冲的字节上限
+AUDIO_MAX_MS = _env_int("NEURALLINK_AUDIO_MAX_MS", 60000)                   # 单句语音的时长上限，超出即提前结束本句
+
+# ==========================================
+# 服务端 VAD / 端点检测 (vad.py)，握手时可按会话覆盖
+# ==========================================
+VAD_ENABLED = _env_bool("NEURALLINK_VAD_ENABLED", True)
+VAD_THRESHOLD_DB = _env_float("NEURALLINK_VAD_THRESHOLD_DB", -45.0)        # 语音帧能量阈值 (dBFS)
+VAD_MIN_SPEECH_MS = _env_int("NEURALLINK_VAD_MIN_SPEECH_MS", 60)            # 连续多久的语音才算开口
+VAD_ENDPOINT_SILENCE_MS = _env_int("NEURALLINK_VAD_ENDPOINT_SILENCE_MS", 600)  # 开口后静音多久算说完
+VAD_PAD_MS = _env_int("NEURALLINK_VAD_PAD_MS", 200)                         # 首尾裁剪保留的余量
+VAD_AUTO_ENDPOINT = _env_bool("NEURALLINK_VAD_AUTO_ENDPOINT", False)        # 检测到端点就出最终结果 (免按键模式)
+
+# ==========================================
+# 大模型 (llm_backends.py)
+# ==========================================
+LLM_BACKEND = _env_str("NEURALLINK_LLM_BACKEND", "gemini")                 # gemini | openai | fake
+LLM_MODEL = _env_str("NEURALLINK_LLM_MODEL", "")                            # 留空则用各后端的默认模型
+LLM_MAX_TOKENS = _env_int("NEURALLINK_LLM_MAX_TOKENS", 512)
+GEMINI_API_KEY = _env_str("NEURALLINK_GEMINI_API_KEY", "")
+LLM_BASE_URL = _env_str("NEURALLINK_LLM_URL", "http://127.0.0.1:11434/v1")  # OpenAI 兼容接口 (Ollama 默认端口)
+LLM_API_KEY = _env_str("NEURALLINK_LLM_API_KEY", "")
+LLM_MAX_CONNECTIONS = _env_int("NEURALLINK_LLM_MAX_CONNECTIONS", 16)
+LLM_CONNECT_TIMEOUT = _env_float("NEURALLINK_LLM_CONNECT_TIMEOUT", 2.0)     # 秒
+LLM_READ_TIMEOUT = _env_float("NEURALLINK_LLM_READ_TIMEOUT", 30.0)          # 两个 token 之间的最长等待 (秒)
+LLM_FAKE_TTFT_MS = _env_float("NEURALLINK_LLM_FAKE_TTFT_MS", 300.0)         # 假后端的首 token 延迟
+LLM_FAKE_CHUNK_MS = _env_float("NEURALLINK_LLM_FAKE_CHUNK_MS", 30.0)        # 假后端的分块间隔
+LLM_SPECULATIVE = _env_bool("NEURALLINK_LLM_SPECULATIVE", False)   # ASR 稳定后推测执行大模型 (未命中会多花一次调用)
+
+# ==========================================
+# 会话记忆 (conversation.py)
+# ==========================================
+MEMORY_TOKEN_BUDGET = _env_int("NEURALLINK_MEMORY_TOKEN_BUDGET", 1500)   # 历史超过该估算 token 数后，空闲时压缩成摘要
+MEMORY_KEEP_RECENT = _env_int("NEURALLINK_MEMORY_KEEP_RECENT", 6)        # 压缩时原样保留的最近消息条数
+MEMORY_IDLE_S = _env_float("NEURALLINK_MEMORY_IDLE_S", 5.0)              # 一轮对话结束后空闲多久才开始压缩 (秒)
+MEMORY_SUMMARY_TOKENS = _env_int("NEURALLINK_MEMORY_SUMMARY_TOKENS", 256)
+MEMORY_SESSION_TTL_S = _env_float("NEURALLINK_MEMORY_SESSION_TTL_S", 3600.0)  # 会话多久无人使用即丢弃
+MEMORY_MAX_SESSIONS = _env_int("NEURALLINK_MEMORY_MAX_SESSIONS", 1000)
+
+# ==========================================
+# 可观测性 (tracing.py, /metrics, /traces)
+# ==========================================
+TRACE_RECENT = _env_int("NEURALLINK_TRACE_RECENT", 200)   # /traces 保留最近多少个回合
+TRACE_LOG = _env_bool("NEURALLINK_TRACE_LOG", True)       # 每个回合结束时输出一行结构化 JSON 日志
@@ -0,0 +1,234 @@
+"""
+服务端会话记忆：按会话保存对话历史，前端只上传增量，提示词以稳定前缀的形式构建
+
+旧做法每一轮都由前端把最近 10 条 chat_history 整包发过来，服务端再拼成字符串 (而且拼好的 history_prompt
+根本没放进提示词)。滑动窗口每轮都往前挪一条，提示词开头每轮都不一样，后端的前缀缓存 / KV 缓存一次也命中不了。
+
+- SessionStore：会话令牌 -> ConversationMemory，断线重连带同一个 session_id 即可续上，过期/超量按 LRU 淘汰
+- 前端每轮只发 history_base (服务端已同步条数) + history_delta (新增消息)，服务端按位置去重/补齐
+- 提示词 = system + [摘要] + 历史消息 + 本轮输入：历史只在尾部追加，前面的 token 跨轮逐字节不变
+- 历史超过 token 预算时，只在会话空闲时把较早的消息压缩成摘要 (前缀只在压缩那一刻变一次)，
+  新一轮对话开始就取消正在进行的压缩，绝不拖慢对话
+"""
+import asyncio
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import Dict, Optional
+
+import config
+import metrics
+from llm_backends import LlmBackend, Messages
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+ROLES = ("user", "assistant")
+INTERRUPTED_SUFFIX = "-(被打断)"   # 与前端 MemoryManager 记录被打断回复的方式一致
+
+SUMMARY_PROMPT = (
+    "你是对话记录员。把下面的对话压缩成一段简洁的摘要，保留称呼、事实、用户的偏好和没聊完的话题，"
+    "不要编造，只输出摘要正文。"
+)
+
+_CJK = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符约 1 字 1 token，其余约 4 字符 1 token"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _messages_tokens(messages: Messages) -> int:
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages)
+
+
+def _clean(messages) -> Messages:
+    """只接受 user/assistant 的纯文本消息，其余丢弃"""
+    out = []
+    for msg in messages or ():
+        if isinstance(msg, dict) and msg.get("role") in ROLES and isinstance(msg.get("content"), str):
+            out.append({"role": msg["role"], "content": msg["content"]})
+    return out
+
+
+async def summarize(backend: LlmBackend, previous: str, messages: Messages, max_tokens: int) -> str:
+    transcript = "\n".join(f"{'主人' if m['role'] == 'user' else '小智'}：{m['content']}" for m in messages)
+    user = (f"【已有摘要】\n{previous}\n\n" if previous else "") + f"【新的对话】\n{transcript}"
+    parts = []
+    async with aclosing(backend.stream([{"role": "system", "content": SUMMARY_PROMPT},
+                                        {"role": "user", "content": user}], max_tokens)) as stream:
+        async for text in stream:
+            parts.append(text)
+    return "".join(parts).strip()
+
+
+class ConversationMemory:
+    """一个会话的对话历史 (同一会话的多条连接共享)"""
+
+    def __init__(self, session_id: str, backend: LlmBackend,
+                 token_budget: int = config.MEMORY_TOKEN_BUDGET,
+                 keep_recent: int = config.MEMORY_KEEP_RECENT,
+                 idle_s: float = config.MEMORY_IDLE_S,
+                 summary_tokens: int = config.MEMORY_SUMMARY_TOKENS):
+        self.session_id = session_id
+        self.backend = backend
+        self.token_budget = token_budget
+        self.keep_recent = max(1, keep_recent)
+        self.idle_s = idle_s
+        self.summary_tokens = summary_tokens
+
+        self.summary = ""
+        self.messages: Messages = []   # 尚未压缩进摘要的历史
+        self.synced = 0                # 前端已同步过来的消息总数 (含已压缩进摘要的)
+        self.pending_reply: Optional[str] = None  # 服务端刚说完、前端还没同步回来的回复
+        self.last_used = time.monotonic()
+
+        self._epoch = 0                # 历史被整体重置时递增，作废进行中的压缩
+        self._compaction: Optional[asyncio.Task] = None
+
+    # ---------- 同步 ----------
+    def apply_delta(self, base: int, delta, reset: bool = False):
+        """前端上传的增量：base 是这批消息在前端记忆里的起始下标"""
+        self.touch()
+        delta = _clean(delta)
+        self.pending_reply = None
+        if reset:
+            self.replace(delta)
+            self.synced = base + len(delta)  # 条数按前端记忆的下标计，下一轮的 history_base 才对得上
+            return
+        if base < self.synced:
+            delta = delta[self.synced - base:]   # 重发了服务端已有的部分 (例如多标签页共用会话)
+        elif base > self.synced:
+            logger.warning(f"⚠️ 会话 {self.session_id[:8]} 历史缺了 {base - self.synced} 条，按现有内容续上")
+            self.synced = base
+        self.messages.extend(delta)
+        self.synced += len(delta)
+
+    def replace(self, messages):
+        """整体替换 (旧协议每轮都发完整的 chat_history，或前端要求重置)"""
+        messages = _clean(messages)
+        if messages == self.messages and not self.summary:
+            return  # 旧协议客户端没有新内容时保持前缀不变
+        self._cancel_compaction()
+        self._epoch += 1
+        self.summary = ""
+        self.messages = messages
+        self.synced = len(messages)
+        self.pending_reply = None
+
+    def note_reply(self, text: str, interrupted: bool):
+        """记下服务端这一轮实际下发的回复：前端要到下一轮请求才会把它同步回来，推测回合先用这份"""
+        if text.strip():
+            self.pending_reply = text + (INTERRUPTED_SUFFIX if interrupted else "")
+
+    # ---------- 提示词 ----------
+    def prompt(self, system: str, user_text: str) -> Messages:
+        """system + [摘要] + 历史 + 本轮输入。历史只在尾部增长，前缀跨轮不变"""
+        history = list(self.messages)
+        if self.pending_reply is not None:
+            history.append({"role": "assistant", "content": self.pending_reply})
+        current = {"role": "user", "content": user_text}
+        if history and history[-1] == current:
+            history.pop()  # 前端的增量里已经带上了本轮输入
+
+        # 兜底：迟迟没有空闲时间压缩，历史超出预算两倍时从最早的消息丢起
+        while len(history) > 1 and _messages_tokens(history) > self.token_budget * 2:
+            history.pop(0)
+
+        messages = [{"role": "system", "content": system}]
+        if self.summary:
+            messages.append({"role": "system", "content": f"【此前对话摘要】\n{self.summary}"})
+        return messages + history + [current]
+
+    # ---------- 空闲压缩 ----------
+    def touch(self):
+        """会话有动静 (说话、发请求)：不再算空闲，取消还没做完的压缩"""
+        self.last_used = time.monotonic()
+        self._cancel_compaction()
+
+    def schedule_compaction(self):
+        """一轮对话结束 / 连接断开时调用：空闲 idle_s 之后，若历史超出预算就压缩成摘要"""
+        self._cancel_compaction()
+        if _messages_tokens(self.messages) <= self.token_budget or len(self.messages) <= self.keep_recent:
+            return
+        self._compaction = asyncio.create_task(self._compact_when_idle())
+
+    def _cancel_compaction(self):
+        if self._compaction is not None and not self._compaction.done():
+            self._compaction.cancel()
+        self._compaction = None
+
+    async def _compact_when_idle(self):
+        await asyncio.sleep(self.idle_s)
+        epoch = self._epoch
+        count = len(self.messages) - self.keep_recent
+        folded = self.messages[:count]
+        started = time.perf_counter()
+        try:
+            summary = await summarize(self.backend, self.summary, folded, self.summary_tokens)
+        except Exception as e:
+            logger.warning(f"⚠️ 会话 {self.session_id[:8]} 历史压缩失败: {e}")
+            return
+        if epoch != self._epoch or not summary:
+            return
+        # 压缩期间只可能在尾部追加，前 count 条不会变
+        self.summary = summary
+        del self.messages[:count]
+        metrics.counter("memory_compactions").inc()
+        metrics.latency("memory_summarize").observe((time.perf_counter() - started) * 1000)
+        logger.info(f"🗜️ 会话 {self.session_id[:8]} 已把 {count} 条历史压缩为摘要 ({len(summary)} 字)")
+
+    async def close(self):
+        task, self._compaction = self._compaction, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+class SessionStore:
+    def __init__(self, backend: LlmBackend,
+                 max_sessions: int = config.MEMORY_MAX_SESSIONS,
+                 ttl_s: float = config.MEMORY_SESSION_TTL_S):
+        self.backend = backend
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._sessions: "OrderedDict[str, ConversationMemory]" = OrderedDict()
+
+    def get(self, session_id: Optional[str] = None) -> ConversationMemory:
+        """按会话令牌取记忆；没带令牌 (或令牌非法) 就新建一个，只在这条连接上有效"""
+        if not isinstance(session_id, str) or not 0 < len(session_id) <= 128:
+            session_id = str(uuid.uuid4())
+        self._evict()
+        memory = self._sessions.get(session_id)
+        if memory is None:
+            memory = self._sessions[session_id] = ConversationMemory(session_id, self.backend)
+        self._sessions.move_to_end(session_id)
+        memory.last_used = time.monotonic()
+        return memory
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) < self.max_sessions and now - oldest.last_used < self.ttl_s:
+                break
+            self._sessions.popitem(last=False)
+            oldest.touch()  # 取消它的压缩任务
+
+    async def close(self):
+        await asyncio.gather(*(memory.close() for memory in self._sessions.values()))
+        self._sessions.clear()
+
+    def stats(self) -> Dict[str, object]:
+        sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "messages": sum(len(m.messages) for m in sessions),
+            "summarized_sessions": sum(1 for m in sessions if m.summary),
+            "compactions": metrics.counters().get("memory_compactions", 0),
+            "summarize_ms": metrics.latency("memory_summarize").snapshot(),
+        }
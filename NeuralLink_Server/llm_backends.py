@@ -0,0 +1,274 @@
+"""
+可插拔的大模型后端 (流式生成)
+
+旧实现每个回合都 new 一个 genai.GenerativeModel("gemini-3-pro-preview")，只能用云端 Gemini，
+API Key 和模型名写死在代码里。这里抽象出统一的流式接口：
+
+    async for text in llm_backend.stream(messages):
+        ...
+
+messages 为 OpenAI 风格的 [{"role": "system" | "user" | "assistant", "content": "..."}]。
+
+- GeminiBackend：google-generativeai，模型实例按 system 提示缓存复用，底层 gRPC 通道全进程共享
+- OpenAICompatBackend：任何 OpenAI 兼容的 /chat/completions 流式接口 (vLLM / Ollama / llama.cpp server)，
+  共享 httpx 连接池；回合被打断时关闭响应流，服务端随之中止生成 (vLLM/Ollama 均在断连时 abort)
+- FakeBackend：确定性的离线后端，按固定节奏吐出合法的 {"thought", "speak"} JSON，用于整条链路的离线压测
+- 每个后端都记录首 token 延迟 (TTFT) 与整段生成耗时；回合正常拿到 speak 后提前收尾不算取消
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+
+import config
+import metrics
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+Messages = List[Dict[str, str]]
+
+
+class LlmError(Exception):
+    """后端返回了错误 (HTTP 错误、鉴权失败、被安全策略拦截等)"""
+
+
+def _task_cancelling() -> bool:
+    """当前任务是否正在被取消 (Task.cancelling 需要 Python 3.11+，更早的版本无法区分，按提前收尾处理)"""
+    task = asyncio.current_task()
+    return task is not None and hasattr(task, "cancelling") and task.cancelling() > 0
+
+
+class LlmBackend:
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+        self.in_flight = 0
+        self.requests_total = 0
+        self.failures_total = 0
+        self.completed_total = 0
+        self.early_closed_total = 0   # 调用方已拿到所需内容 (speak 字段结束) 后主动关闭
+        self.cancelled_total = 0
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def stream(self, messages: Messages, max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """流式产出文本增量。调用方中途 break / 被取消时，底层请求随之关闭"""
+        started = time.perf_counter()
+        first = True
+        self.in_flight += 1
+        self.requests_total += 1
+        try:
+            async for text in self._stream(messages, max_tokens or config.LLM_MAX_TOKENS):
+                if not text:
+                    continue
+                if first:
+                    first = False
+                    metrics.latency(f"llm_ttft.{self.name}").observe((time.perf_counter() - started) * 1000)
+                yield text
+            self.completed_total += 1
+            metrics.latency(f"llm_total.{self.name}").observe((time.perf_counter() - started) * 1000)
+        except asyncio.CancelledError:
+            self.cancelled_total += 1
+            raise
+        except GeneratorExit:
+            # 停在 yield 上时被关闭：可能是回合被打断 (任务正在取消)，也可能只是 speak 已经说完
+            if _task_cancelling():
+                self.cancelled_total += 1
+            else:
+                self.early_closed_total += 1
+                metrics.latency(f"llm_total.{self.name}").observe((time.perf_counter() - started) * 1000)
+            raise
+        except Exception:
+            self.failures_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def _stream(self, messages: Messages, max_tokens: int) -> AsyncIterator[str]:
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "model": self.model,
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "failures_total": self.failures_total,
+            "completed_total": self.completed_total,
+            "early_closed_total": self.early_closed_total,
+            "cancelled_total": self.cancelled_total,
+        }
+
+
+# ==========================================
+# Gemini (云端)
+# ==========================================
+class GeminiBackend(LlmBackend):
+    name = "gemini"
+
+    def __init__(self, model: str = config.LLM_MODEL or "gemini-3-pro-preview",
+                 api_key: str = config.GEMINI_API_KEY):
+        super().__init__(model)
+        self.api_key = api_key
+        self._genai = None
+        self._models: Dict[str, object] = {}   # system 提示 -> GenerativeModel，通常只有一两个
+
+    async def start(self):
+        import google.generativeai as genai
+        if self.api_key:
+            genai.configure(api_key=self.api_key)
+        else:
+            logger.warning("⚠️ 未设置 NEURALLINK_GEMINI_API_KEY，交给 google-generativeai 读取 GOOGLE_API_KEY")
+        self._genai = genai
+        logger.info(f"🔗 LLM 后端就绪: Gemini ({self.model})")
+
+    def _model_for(self, system: str):
+        model = self._models.get(system)
+        if model is None:
+            model = self._genai.GenerativeModel(self.model, system_instruction=system or None)
+            self._models[system] = model
+        return model
+
+    async def _stream(self, messages: Messages, max_tokens: int) -> AsyncIterator[str]:
+        if self._genai is None:
+            raise RuntimeError("GeminiBackend 尚未启动 (应在 FastAPI lifespan 中调用 start)")
+        # 只有开头的 system 提示作为 system_instruction (模型实例按它缓存)；
+        # 之后的 system 消息 (如会话摘要) 因会话而异，作为普通内容放进对话
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        contents = [{"role": "model" if m["role"] == "assistant" else "user", "parts": [m["content"]]}
+                    for m in messages[1 if system else 0:]]
+        response = await self._model_for(system).generate_content_async(
+            contents, stream=True, generation_config={"max_output_tokens": max_tokens})
+        # 取消发生在 await 上时，gRPC aio 调用随任务一起被取消，服务端停止生成；
+        # 调用方在 yield 处提前关闭 (break / aclose) 时要自己取消底层流，否则生成会一直跑到结束
+        try:
+            async for chunk in response:
+                try:
+                    yield chunk.text
+                except Exception:
+                    continue  # 规避 Gemini 安全拦截导致的 chunk 无文本报错
+        finally:
+            call = getattr(response, "_iterator", None)   # google-api-core 包装的 gRPC aio 流式调用
+            if call is not None and hasattr(call, "cancel"):
+                call.cancel()
+
+
+# ==========================================
+# OpenAI 兼容接口 (vLLM / Ollama / llama.cpp server，本地部署)
+# ==========================================
+class OpenAICompatBackend(LlmBackend):
+    name = "openai"
+
+    def __init__(self, model: str = config.LLM_MODEL or "qwen2.5:7b-instruct",
+                 base_url: str = config.LLM_BASE_URL,
+                 api_key: str = config.LLM_API_KEY,
+                 max_connections: int = config.LLM_MAX_CONNECTIONS,
+                 connect_timeout: float = config.LLM_CONNECT_TIMEOUT,
+                 read_timeout: float = config.LLM_READ_TIMEOUT):
+        super().__init__(model)
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, headers=self.headers,
+                                             limits=self.limits, timeout=self.timeout)
+            logger.info(f"🔗 LLM 后端就绪: OpenAI 兼容 {self.base_url} ({self.model})")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _stream(self, messages: Messages, max_tokens: int) -> AsyncIterator[str]:
+        if self._client is None:
+            raise RuntimeError("OpenAICompatBackend 尚未启动 (应在 FastAPI lifespan 中调用 start)")
+        body = {"model": self.model, "messages": messages, "stream": True, "max_tokens": max_tokens}
+        # 退出 async with (正常结束、break 或被取消) 都会关闭响应；提前关闭的连接不会回到池里，
+        # 服务端检测到断连后中止这次生成，不再白白占用 GPU
+        async with self._client.stream("POST", "/chat/completions", json=body) as res:
+            if res.status_code != 200:
+                await res.aread()
+                raise LlmError(f"LLM 后端返回异常 [{res.status_code}]: {res.text[:200]}")
+            async for line in res.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    continue
+                if "error" in event:
+                    raise LlmError(f"LLM 后端返回异常: {event['error']}")
+                for choice in event.get("choices") or ():
+                    text = (choice.get("delta") or {}).get("content")
+                    if text:
+                        yield text
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["base_url"] = self.base_url
+        return stats
+
+
+# ==========================================
+# 离线假后端 (压测 / 演示)
+# ==========================================
+class FakeBackend(LlmBackend):
+    """输出只由用户输入决定：同样的输入永远得到同样的回复、同样的分块与节奏"""
+    name = "fake"
+
+    def __init__(self, model: str = "fake",
+                 ttft_ms: float = config.LLM_FAKE_TTFT_MS,
+                 chunk_ms: float = config.LLM_FAKE_CHUNK_MS,
+                 chunk_chars: int = 8):
+        super().__init__(model)
+        self.ttft = ttft_ms / 1000
+        self.chunk_interval = chunk_ms / 1000
+        self.chunk_chars = max(1, chunk_chars)
+
+    @staticmethod
+    def reply_for(user_text: str) -> str:
+        speak = f"你刚才说的是：{user_text}。我听到了，这是一条离线测试回复，用来压测语音链路。"
+        return json.dumps({"thought": "离线假后端，按固定节奏回复", "speak": speak}, ensure_ascii=False)
+
+    async def _stream(self, messages: Messages, max_tokens: int) -> AsyncIterator[str]:
+        user_text = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        reply = self.reply_for(user_text)
+        await asyncio.sleep(self.ttft)
+        for start in range(0, len(reply), self.chunk_chars):
+            if start:
+                await asyncio.sleep(self.chunk_interval)
+            yield reply[start:start + self.chunk_chars]
+
+
+BACKENDS = {
+    GeminiBackend.name: GeminiBackend,
+    OpenAICompatBackend.name: OpenAICompatBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def create_backend(name: str = config.LLM_BACKEND) -> LlmBackend:
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"未知的 LLM 后端: {name} (可选: {', '.join(BACKENDS)})") from None
+
+
+# 全局单例：由 FastAPI lifespan 启动/关闭
+llm_backend = create_backend()
@@ -0,0 +1,155 @@
+"""
+NeuralLink 运行时指标 (轻量级，无第三方依赖)
+
+- LatencyRecorder：滚动窗口延迟采样，给出 p50/p95/p99
+- Counter：单调递增计数 (跳过的 ASR 调用、命中次数之类)
+- 模块级注册表：同名指标全局复用，供日志与 /stats 调试接口读取
+- render_prometheus：导出为 Prometheus 文本格式，供 /metrics 抓取 (大脑与 TTS 节点共用)
+"""
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+
+def _pick(ordered: list, q: float) -> float:
+    """已排序样本的第 q 百分位 (最近秩)"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+def percentiles(samples) -> dict:
+    """一组样本的分位数 (基准脚本、批大小分布)，与 LatencyRecorder 同一套取法"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0, "last": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {"count": len(ordered), "last": round(samples[-1], 2),
+            "p50": round(_pick(ordered, 50), 2), "p95": round(_pick(ordered, 95), 2),
+            "p99": round(_pick(ordered, 99), 2)}
+
+
+class LatencyRecorder:
+    """固定窗口的延迟采样器 (单位: 毫秒)，只保留最近 window 个样本"""
+
+    def __init__(self, name: str, window: int = 512):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float):
+        with self._lock:
+            self.count += 1
+            self.total_ms += ms
+            self.last_ms = ms
+            self._samples.append(ms)
+
+    def percentile(self, q: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        return _pick(samples, q)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "last_ms": round(self.last_ms, 2),
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+        }
+
+
+class Counter:
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+
+_recorders: Dict[str, LatencyRecorder] = {}
+_counters: Dict[str, Counter] = {}
+_registry_lock = threading.Lock()
+
+
+def latency(name: str) -> LatencyRecorder:
+    """按名字取 (或新建) 一个全局延迟采样器"""
+    with _registry_lock:
+        recorder = _recorders.get(name)
+        if recorder is None:
+            recorder = _recorders[name] = LatencyRecorder(name)
+        return recorder
+
+
+def snapshot() -> dict:
+    with _registry_lock:
+        recorders = list(_recorders.values())
+    return {r.name: r.snapshot() for r in recorders}
+
+
+def counter(name: str) -> Counter:
+    """按名字取 (或新建) 一个全局计数器"""
+    with _registry_lock:
+        found = _counters.get(name)
+        if found is None:
+            found = _counters[name] = Counter(name)
+        return found
+
+
+def counters() -> dict:
+    with _registry_lock:
+        return {c.name: c.value for c in _counters.values()}
+
+
+# ==========================================
+# Prometheus 文本格式导出
+# ==========================================
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+QUANTILES = (50, 95, 99)
+
+
+def _metric_name(namespace: str, name: str, suffix: str = "") -> str:
+    return _INVALID_NAME_CHARS.sub("_", f"{namespace}_{name}{suffix}")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def render_prometheus(namespace: str,
+                      recorders: Iterable[LatencyRecorder] = (),
+                      counters: Optional[Dict[str, int]] = None,
+                      gauges: Optional[Dict[str, float]] = None) -> str:
+    """注册表里的全部指标 + 调用方额外传入的指标 (各组件自带的延迟采样器、计数、瞬时值)
+
+    延迟导出为 summary：滚动窗口内的 p50/p95/p99，外加累计的 _sum/_count (毫秒)
+    """
+    with _registry_lock:
+        all_recorders = list(_recorders.values())
+        all_counters = {c.name: c.value for c in _counters.values()}
+    all_recorders.extend(recorders)
+    all_counters.update(counters or {})
+
+    lines = []
+    for recorder in all_recorders:
+        name = _metric_name(namespace, recorder.name, "_ms")
+        lines.append(f"# TYPE {name} summary")
+        for q in QUANTILES:
+            lines.append(f'{name}{{quantile="{q / 100}"}} {_format_value(recorder.percentile(q))}')
+        lines.append(f"{name}_sum {_format_value(recorder.total_ms)}")
+        lines.append(f"{name}_count {recorder.count}")
+    for counter_name, value in all_counters.items():
+        name = _metric_name(namespace, counter_name, "_total")
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {_format_value(value)}")
+    for gauge_name, value in (gauges or {}).items():
+        name = _metric_name(namespace, gauge_name)
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
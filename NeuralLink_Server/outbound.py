@@ -0,0 +1,169 @@
+"""
+每条 WebSocket 连接的有界下行队列 + 写协程
+
+旧实现里 send_message 直接 await ws.send_text：客户端网络一慢，发送就卡在 TCP 缓冲区上，
+这个会话的推理循环 (大模型流解析、TTS 按序交付) 也跟着停住，而服务端对积压没有任何上限。这里改为：
+
+- 所有下行消息按产生顺序进入有界队列，由每连接一个的写协程发出，生产者入队即返回
+- 音频帧入队时带上 "是否已作废" 的判定 (所属回合被打断 / 被新回合取代)：
+  队列满时先丢掉这些帧腾位置，写协程出队时也直接跳过，打断后不会再把旧回复的积压音频推给前端
+- 丢完仍然满：生产者在队列上等待 (只拖慢这一个会话，不影响其他连接)；
+  等待超过 send_timeout_s 视为客户端卡死，关闭连接，之后的入队一律丢弃
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Union
+
+from starlette.websockets import WebSocket
+
+import config
+import metrics
+import tracing
+from tracing import TurnTrace
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+# 返回 True 表示这条消息已经没有发送的意义 (通常是被打断回合的音频)
+StaleFn = Callable[[], bool]
+
+
+class SlowConsumer(RuntimeError):
+    pass
+
+
+class _Outgoing:
+    __slots__ = ("data", "stale", "trace", "queued_at")
+
+    def __init__(self, data: Union[str, bytes], stale: Optional[StaleFn], trace: Optional[TurnTrace]):
+        self.data = data
+        self.stale = stale
+        self.trace = trace          # 入队时的当前回合，发送耗时记在它名下
+        self.queued_at = time.perf_counter()
+
+    def is_stale(self) -> bool:
+        return self.stale is not None and self.stale()
+
+
+def _record(trace: Optional[TurnTrace], name: str, ms: float):
+    if trace is not None:
+        trace.add(name, ms)
+    else:
+        metrics.latency(f"span.{name}").observe(ms)
+
+
+class OutboundQueue:
+    def __init__(self, websocket: WebSocket, max_size: int = config.WS_SEND_QUEUE,
+                 send_timeout_s: float = config.WS_SEND_TIMEOUT_S):
+        self._ws = websocket
+        self.max_size = max(1, max_size)
+        self.send_timeout_s = send_timeout_s
+        self._items: Deque[_Outgoing] = deque()
+        self._cond = asyncio.Condition()
+        self._closed = False
+        self._writer: asyncio.Task = asyncio.create_task(self._run())
+
+        self.sent = 0
+        self.dropped = 0
+        self.blocked = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def put(self, data: Union[str, bytes], stale: Optional[StaleFn] = None):
+        """入队一条文本 (JSON) 或二进制消息；队列满时先丢作废帧，再等位置，等太久抛 SlowConsumer"""
+        if self._closed:
+            return
+        item = _Outgoing(data, stale, tracing.current())
+        async with self._cond:
+            if len(self._items) >= self.max_size:
+                self._drop_stale()
+            if len(self._items) >= self.max_size:
+                self.blocked += 1
+                metrics.counter("ws_send_blocked").inc()
+                try:
+                    await asyncio.wait_for(
+                        self._cond.wait_for(lambda: self._closed or len(self._items) < self.max_size),
+                        self.send_timeout_s)
+                except asyncio.TimeoutError:
+                    self._stall()
+                    raise SlowConsumer(f"下行队列 {self.send_timeout_s:g}s 内没有腾出位置") from None
+            if self._closed:
+                return
+            self._items.append(item)
+            self._cond.notify_all()
+
+    async def close(self):
+        """连接断开：丢弃积压，停掉写协程"""
+        self._closed = True
+        self._items.clear()
+        if not self._writer.done():
+            self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        async with self._cond:
+            self._cond.notify_all()   # 还在等位置的生产者立刻返回，不必等到超时
+
+    def _drop_stale(self):
+        kept = deque(item for item in self._items if not item.is_stale())
+        dropped = len(self._items) - len(kept)
+        if dropped:
+            self._items = kept
+            self._count_dropped(dropped)
+
+    def _count_dropped(self, amount: int):
+        self.dropped += amount
+        metrics.counter("ws_send_dropped").inc(amount)
+
+    def _stall(self):
+        """客户端卡死：停止发送并主动断开，接收循环随之收到断开事件。调用方持有 _cond 的锁"""
+        logger.warning(f"🐢 客户端接收过慢，下行积压 {len(self._items)} 条，断开连接")
+        metrics.counter("ws_slow_consumer").inc()
+        self._closed = True
+        self._items.clear()
+        self._cond.notify_all()   # 其他等位置的生产者看到 _closed 后直接返回
+        self._writer.cancel()
+        asyncio.create_task(self._close_socket())
+
+    async def _close_socket(self):
+        try:
+            await asyncio.wait_for(self._ws.close(code=1008, reason="send queue overflow"), self.send_timeout_s)
+        except Exception:
+            pass
+
+    async def _run(self):
+        try:
+            while True:
+                async with self._cond:
+                    await self._cond.wait_for(lambda: self._closed or self._items)
+                    if self._closed:
+                        return
+                    item = self._items.popleft()
+                    self._cond.notify_all()
+                if item.is_stale():
+                    self._count_dropped(1)
+                    continue
+                started = time.perf_counter()
+                if isinstance(item.data, bytes):
+                    await self._ws.send_bytes(item.data)
+                else:
+                    await self._ws.send_text(item.data)
+                self.sent += 1
+                _record(item.trace, "ws_queue", (started - item.queued_at) * 1000)
+                _record(item.trace, "ws_send", (time.perf_counter() - started) * 1000)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 连接已经断开：后面的消息都发不出去了，接收循环会处理断开
+            logger.debug(f"下行写协程退出: {e}")
+            async with self._cond:
+                self._closed = True
+                self._items.clear()
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {"queued": len(self._items), "sent": self.sent, "dropped": self.dropped, "blocked": self.blocked}
@@ -0,0 +1,115 @@
+"""
+推测执行：ASR 结果一稳定就在服务端先跑大模型 (可选功能)
+
+原链路是严格串行的：ASR 最终结果 -> 前端 MemoryManager -> CLIENT_TEXT_REQUEST -> run_llm_inference，
+大模型要等一个完整的客户端往返之后才开始。推测执行在 ASR 假设稳定时 (VAD 端点定稿 / 最终结果) 就提前开跑：
+
+- 推测回合的所有下行消息先扣在闸门里，前端什么也收不到
+- 前端的 CLIENT_TEXT_REQUEST 文本与推测一致 (忽略标点/空白/全半角)：接管推测回合，扣下的消息按序放行
+- 不一致：取消推测回合，按正常流程重新开始
+- 推测回合可能在接管之前就跑完了：收尾动作 (回复记进会话记忆、结束回合追踪) 也先扣下，接管时再执行
+- 统计命中率，以及命中时节省下来的首音频时间
+"""
+import asyncio
+import re
+import time
+import unicodedata
+from typing import Awaitable, Callable, List, Optional
+
+import metrics
+
+_NOISE = re.compile(r"[\W_]+", re.UNICODE)
+
+SendFn = Callable[[], Awaitable[None]]
+SettleFn = Callable[[], None]
+
+
+def normalize_utterance(text: str) -> str:
+    """只比对文字本身：最终结果相比端点时的中间结果，常常只是多了个句号"""
+    return _NOISE.sub("", unicodedata.normalize("NFKC", text)).lower()
+
+
+class SpeculativeTurn:
+    def __init__(self, text: str, task_id: str):
+        self.text = text
+        self.key = normalize_utterance(text)
+        self.task_id = task_id
+        self.task: Optional[asyncio.Task] = None
+        self.trace = None   # 推测回合自己的一份回合追踪 (TurnTrace.fork)
+
+        self.adopted = False
+        self.started_at = time.perf_counter()
+        self.adopted_at: Optional[float] = None
+        self.first_audio_at: Optional[float] = None
+        self._reported = False
+
+        self._held: List[SendFn] = []
+        self._settle: Optional[SettleFn] = None
+        self._lock = asyncio.Lock()
+
+    def matches(self, text: str) -> bool:
+        return bool(self.key) and normalize_utterance(text) == self.key
+
+    async def emit(self, send: SendFn):
+        """接管之前扣下，接管之后直接发送 (与 adopt 互斥，保证消息顺序)"""
+        async with self._lock:
+            if self.adopted:
+                await send()
+            else:
+                self._held.append(send)
+
+    def settle(self, fn: SettleFn):
+        """回合结束时的收尾：已接管就立即执行，否则留到 adopt；未命中则随回合一起丢弃"""
+        if self.adopted:
+            fn()
+        else:
+            self._settle = fn
+
+    async def adopt(self):
+        async with self._lock:
+            self.adopted = True
+            self.adopted_at = time.perf_counter()
+            held, self._held = self._held, []
+            for send in held:
+                await send()
+        settle, self._settle = self._settle, None
+        if settle is not None:
+            settle()
+        metrics.counter("speculation_hit").inc()
+        self._report()
+
+    def cancel(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self._held = []
+        self._settle = None
+        if not self.adopted:
+            metrics.counter("speculation_miss").inc()
+
+    def note_audio(self):
+        """推测回合产出第一段正文音频"""
+        if self.first_audio_at is None:
+            self.first_audio_at = time.perf_counter()
+            self._report()
+
+    def _report(self):
+        # 没有推测时，首音频要从接管 (即收到 CLIENT_TEXT_REQUEST) 那一刻才开始算；
+        # 推测回合提前跑掉的那一段 (最多到首音频产出为止) 就是省下来的时间
+        if self._reported or self.adopted_at is None or self.first_audio_at is None:
+            return
+        self._reported = True
+        saved = min(self.adopted_at, self.first_audio_at) - self.started_at
+        metrics.latency("speculation_ttfa_saved").observe(saved * 1000)
+
+
+def stats() -> dict:
+    counts = metrics.counters()
+    hits = counts.get("speculation_hit", 0)
+    misses = counts.get("speculation_miss", 0)
+    return {
+        "started": counts.get("speculation_started", 0),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        "ttfa_saved_ms": metrics.latency("speculation_ttfa_saved").snapshot(),
+    }
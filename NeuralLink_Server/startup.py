@@ -0,0 +1,140 @@
+"""
+启动阶段与健康探针 (大脑节点与 TTS 节点共用)
+
+模型加载与预热不再放在模块导入时：导入只定义函数和单例，测试与工具可以直接 import。
+lifespan 里把启动拆成有名字的阶段放到后台跑 (互不依赖的阶段并行，阻塞的加载放进线程)，
+进程先起来响应 /health/live；所有必需阶段 (含一次预热推理) 完成后 /health/ready 才返回 200，
+负载均衡 / 编排器据此放流量，第一个真实请求不再替 CUDA 预热买单。
+
+- live：进程在跑且没有必需阶段失败 (加载失败时返回 503，让编排器重启进程)
+- ready：所有声明为必需的阶段都已完成
+"""
+import asyncio
+import inspect
+import time
+import traceback
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+import metrics
+
+PENDING = "pending"
+RUNNING = "running"
+OK = "ok"
+FAILED = "failed"
+
+
+class Stage:
+    def __init__(self, name: str, required: bool):
+        self.name = name
+        self.required = required
+        self.state = PENDING
+        self.elapsed_ms = 0.0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        out = {"state": self.state, "required": self.required, "elapsed_ms": round(self.elapsed_ms, 1)}
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class Readiness:
+    def __init__(self, log: Callable[[str], None] = print):
+        self.log = log
+        self.stages: Dict[str, Stage] = {}
+        self.started_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def declare(self, *names: str, required: bool = True):
+        """预先登记全部阶段，启动刚开始时 /health/ready 就能看到完整计划 (也避免空计划被当成就绪)"""
+        for name in names:
+            self.stages.setdefault(name, Stage(name, required))
+
+    async def run(self, name: str, fn: Callable, required: bool = True) -> bool:
+        """执行一个阶段：同步函数放进线程 (模型加载会阻塞很久)，协程函数直接 await。失败只记录，返回 False"""
+        stage = self.stages.setdefault(name, Stage(name, required))
+        stage.state = RUNNING
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(fn):
+                await fn()
+            else:
+                await asyncio.to_thread(fn)
+        except Exception as e:
+            stage.state = FAILED
+            stage.error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+            self.log(f"❌ 启动阶段 {name} 失败: {stage.error}")
+            return False
+        finally:
+            stage.elapsed_ms = (time.perf_counter() - started) * 1000
+            metrics.latency(f"startup.{name}").observe(stage.elapsed_ms)
+        stage.state = OK
+        self.log(f"✅ 启动阶段 {name} 完成 ({stage.elapsed_ms:.0f}ms)")
+        return True
+
+    async def parallel(self, **stages: Callable) -> bool:
+        """互不依赖的阶段一起跑，全部成功才返回 True"""
+        results = await asyncio.gather(*(self.run(name, fn) for name, fn in stages.items()))
+        return all(results)
+
+    # ---------- 生命周期 ----------
+    def start(self, plan: Callable[[], Awaitable]):
+        """在后台执行启动计划，lifespan 立刻 yield，探针在加载期间就能响应"""
+        self.started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run(plan))
+
+    async def _run(self, plan: Callable[[], Awaitable]):
+        await plan()
+        total = (time.monotonic() - self.started_at) * 1000
+        if self.ready:
+            self.log(f"🟢 所有启动阶段就绪，耗时 {total:.0f}ms，开始接收流量")
+        else:
+            self.log(f"🔴 启动未完成: {', '.join(s.name for s in self.stages.values() if s.required and s.state != OK)}")
+
+    async def wait(self) -> bool:
+        """等启动计划跑完，返回是否就绪"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+        return self.ready
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    # ---------- 状态 ----------
+    def ok(self, name: str) -> bool:
+        stage = self.stages.get(name)
+        return stage is not None and stage.state == OK
+
+    @property
+    def ready(self) -> bool:
+        required = [s for s in self.stages.values() if s.required]
+        return bool(required) and all(s.state == OK for s in required)
+
+    @property
+    def failed(self) -> bool:
+        return any(s.required and s.state == FAILED for s in self.stages.values())
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+        }
+
+
+def add_health_routes(app: FastAPI, readiness: Readiness):
+    @app.get("/health/live")
+    async def health_live():
+        status = 503 if readiness.failed else 200
+        return JSONResponse({"live": status == 200, "uptime_s": readiness.report()["uptime_s"]}, status_code=status)
+
+    @app.get("/health/ready")
+    async def health_ready():
+        return JSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
@@ -0,0 +1,258 @@
+"""
+流式 JSON 回复解析器 (增量状态机)
+
+大模型流式吐出的是不完整的 {"thought": "...", "speak": "..."}。
+旧实现每来一个 chunk 就对整段 full_text 跑正则，回复越长越慢 (O(n²))。
+这里每个字符只被扫描一次：
+
+- 跟踪当前处于最外层对象的哪个字段 (thought / speak)，其余字段的值直接丢弃
+- 完整处理 JSON 转义：\\" \\\\ \\/ \\b \\f \\n \\r \\t 以及 \\uXXXX (含代理对)，转义序列可以跨 chunk
+- thought 以增量碎片形式吐出，speak 按标点切句
+
+用法：
+    parser = StreamingReplyParser()
+    for chunk in stream:
+        thought_delta, sentences = parser.feed(chunk)
+    tail = parser.finish()
+"""
+import re
+from typing import List, Optional, Tuple
+
+# 安全切分点 (与旧实现保持一致)
+SENTENCE_PUNCTUATION = frozenset("。！？，,.!?")
+
+_SIMPLE_ESCAPES = {
+    '"': '"', '\\': '\\', '/': '/',
+    'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t',
+}
+
+# 字符串内部的 "特殊字符"：只有它们会打断整段拷贝
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+# 状态
+_EXPECT_KEY = 0      # 对象内，等待键名
+_IN_KEY = 1          # 正在读键名字符串
+_EXPECT_COLON = 2    # 键名已读完，等待冒号
+_EXPECT_VALUE = 3    # 等待值
+_IN_STRING = 4       # 正在读字符串值
+_IN_SCALAR = 5       # 正在跳过数字 / true / false / null
+_AFTER_VALUE = 6     # 值已结束，等待 , } ]
+
+
+class StreamingReplyParser:
+    """可续传的 thought/speak 提取器，feed() 的开销只和 chunk 长度成正比"""
+
+    def __init__(self, fields=("thought", "speak")):
+        self._fields = set(fields)
+        self._state = _EXPECT_VALUE
+        self._stack: List[str] = []   # 容器栈: '{' 或 '['
+        self._started = False         # 是否已经遇到第一个 '{' (之前的 ```json 之类的噪音全部忽略)
+
+        self._key_parts: List[str] = []
+        self._current_key = ""
+        self._field: Optional[str] = None  # 当前字符串值属于哪个被跟踪的字段
+
+        # 转义续传状态
+        self._escape = False
+        self._unicode_digits = ""
+        self._high_surrogate: Optional[int] = None
+
+        # 输出缓冲
+        self._thought_parts: List[str] = []
+        self._sentence_parts: List[str] = []
+        self._cut_pending = False     # 本次 feed 中 speak 是否出现了标点
+
+        self.thought = ""             # 已输出的完整 thought (调试/日志用)
+        self.speak_closed = False
+
+    # ------------------------------------------------------------------
+    # 公开接口
+    # ------------------------------------------------------------------
+    def feed(self, chunk: str) -> Tuple[str, List[str]]:
+        """吃进一个 chunk，返回 (新增的 thought 碎片, 本次切好的句子列表)"""
+        pos, n = 0, len(chunk)
+        while pos < n:
+            if not self._started:
+                brace = chunk.find('{', pos)
+                if brace < 0:
+                    break
+                self._started = True
+                self._stack.append('{')
+                self._state = _EXPECT_KEY
+                pos = brace + 1
+                continue
+
+            state = self._state
+            if state == _IN_STRING or state == _IN_KEY:
+                pos = self._scan_string(chunk, pos)
+                continue
+
+            ch = chunk[pos]
+            pos += 1
+            if ch in ' \t\r\n':
+                continue
+
+            if state == _EXPECT_KEY:
+                if ch == '"':
+                    self._key_parts = []
+                    self._state = _IN_KEY
+                elif ch == '}':
+                    self._close_container()
+            elif state == _EXPECT_COLON:
+                if ch == ':':
+                    self._state = _EXPECT_VALUE
+            elif state == _EXPECT_VALUE:
+                if ch == '"':
+                    # 只认最外层对象上的字段，嵌套结构里的同名键一律忽略
+                    tracked = len(self._stack) == 1 and self._current_key in self._fields
+                    self._field = self._current_key if tracked else None
+                    self._state = _IN_STRING
+                elif ch == '{':
+                    self._stack.append('{')
+                    self._state = _EXPECT_KEY
+                elif ch == '[':
+                    self._stack.append('[')
+                    self._state = _EXPECT_VALUE
+                elif ch == ']':
+                    self._close_container()
+                else:
+                    self._state = _IN_SCALAR
+            elif state == _IN_SCALAR or state == _AFTER_VALUE:
+                if ch == ',':
+                    self._after_comma()
+                elif ch in '}]':
+                    self._close_container()
+
+        return self._drain_thought(), self._drain_sentences()
+
+    def finish(self) -> List[str]:
+        """流结束：把缓冲区里没有标点结尾的最后几个字也交出去"""
+        sentences = self._drain_sentences()
+        tail = "".join(self._sentence_parts).strip()
+        self._sentence_parts = []
+        if tail:
+            sentences.append(tail)
+        return sentences
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+    def _scan_string(self, chunk: str, pos: int) -> int:
+        """在字符串内部推进；普通字符按整段拷贝，只在引号/反斜杠处停下"""
+        n = len(chunk)
+        while pos < n:
+            if self._escape or self._unicode_digits or (self._high_surrogate is not None and chunk[pos] != '\\'):
+                pos = self._scan_escape(chunk, pos)
+                continue
+
+            m = _STRING_SPECIAL.search(chunk, pos)
+            end = m.start() if m else n
+            if end > pos:
+                self._emit_text(chunk[pos:end])
+            if m is None:
+                return n
+
+            pos = end + 1
+            if m.group() == '\\':
+                self._escape = True
+            else:
+                self._end_string()
+                return pos
+        return pos
+
+    def _scan_escape(self, chunk: str, pos: int) -> int:
+        """处理转义续传状态 (反斜杠之后的字符 / \\u 的四位十六进制 / 悬空的高位代理)"""
+        if self._escape:
+            ch = chunk[pos]
+            self._escape = False
+            if ch == 'u':
+                self._unicode_digits = "u"
+            else:
+                self._flush_surrogate()
+                self._emit_text(_SIMPLE_ESCAPES.get(ch, ch))
+            return pos + 1
+
+        if self._unicode_digits:
+            need = 5 - len(self._unicode_digits)
+            piece = chunk[pos:pos + need]
+            self._unicode_digits += piece
+            pos += len(piece)
+            if len(self._unicode_digits) == 5:
+                try:
+                    code = int(self._unicode_digits[1:], 16)
+                except ValueError:
+                    code = 0xFFFD
+                self._unicode_digits = ""
+                self._emit_codepoint(code)
+            return pos
+
+        # 孤立的高位代理后面没有跟上 \\u 低位代理
+        self._flush_surrogate()
+        return pos
+
+    def _emit_codepoint(self, code: int):
+        if 0xD800 <= code <= 0xDBFF:
+            self._flush_surrogate()
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+        else:
+            self._flush_surrogate()
+        self._emit_text(chr(code) if not 0xD800 <= code <= 0xDFFF else '\ufffd')
+
+    def _flush_surrogate(self):
+        if self._high_surrogate is not None:
+            self._high_surrogate = None
+            self._emit_text('\ufffd')
+
+    def _emit_text(self, text: str):
+        if self._state == _IN_KEY:
+            self._key_parts.append(text)
+        elif self._field == "thought":
+            self._thought_parts.append(text)
+        elif self._field == "speak":
+            self._sentence_parts.append(text)
+            if not self._cut_pending and any(c in SENTENCE_PUNCTUATION for c in text):
+                self._cut_pending = True
+
+    def _end_string(self):
+        self._flush_surrogate()
+        if self._state == _IN_KEY:
+            self._current_key = "".join(self._key_parts)
+            self._key_parts = []
+            self._state = _EXPECT_COLON
+            return
+        if self._field == "speak":
+            self.speak_closed = True
+        self._field = None
+        self._state = _AFTER_VALUE
+
+    def _after_comma(self):
+        top = self._stack[-1] if self._stack else '{'
+        self._state = _EXPECT_KEY if top == '{' else _EXPECT_VALUE
+
+    def _close_container(self):
+        if self._stack:
+            self._stack.pop()
+        self._state = _AFTER_VALUE
+
+    def _drain_thought(self) -> str:
+        if not self._thought_parts:
+            return ""
+        delta = "".join(self._thought_parts)
+        self._thought_parts = []
+        self.thought += delta
+        return delta
+
+    def _drain_sentences(self) -> List[str]:
+        """在最后一个标点处切一刀：前半段送去合成，没念完的半句话留在缓冲区"""
+        if not self._cut_pending:
+            return []
+        self._cut_pending = False
+        buffer = "".join(self._sentence_parts)
+        cut = max(buffer.rfind(p) for p in SENTENCE_PUNCTUATION)
+        ready, rest = buffer[:cut + 1].strip(), buffer[cut + 1:]
+        self._sentence_parts = [rest] if rest else []
+        return [ready] if ready else []
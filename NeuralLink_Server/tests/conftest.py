@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 服务端模块是平铺的 (import config / import stream_parser)，与 benchmarks 一样把上级目录加进搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,122 @@
+"""AsrWorker：跨会话合批的结果必须与逐条识别一致；队列满时挂起等待而不是丢请求"""
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from asr_inference import AsrBusy, AsrWorker
+
+
+class StubModel:
+    """确定性的桩模型：每条结果只取决于这条语音本身，记录每次调用的批大小"""
+
+    def __init__(self, delay_s: float = 0.02):
+        self.delay_s = delay_s
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def transcribe(samples: np.ndarray, is_final: bool) -> str:
+        return f"{len(samples)}:{float(samples.sum()):.4f}:{is_final}"
+
+    def recognize_batch(self, items):
+        with self._lock:
+            self.batch_sizes.append(len(items))
+        time.sleep(self.delay_s)
+        return [self.transcribe(samples, is_final) for samples, _, is_final in items]
+
+
+def utterances(count: int):
+    rng = np.random.default_rng(0)
+    return [rng.normal(0, 0.1, 1600 * (i % 5 + 1)).astype(np.float32) for i in range(count)]
+
+
+def run_worker(worker: AsrWorker, coro_factory):
+    async def main():
+        worker.start()
+        try:
+            return await coro_factory()
+        finally:
+            worker.stop()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_jobs_are_batched_and_match_unbatched_results():
+    samples = utterances(16)
+    finals = [i % 2 == 0 for i in range(16)]
+
+    model = StubModel()
+    worker = AsrWorker(model.recognize_batch, max_queue=32, max_batch_size=8, batch_window_ms=30)
+    batched = run_worker(worker, lambda: asyncio.gather(
+        *(worker.recognize(s, None, f) for s, f in zip(samples, finals))))
+
+    single_model = StubModel(delay_s=0)
+    single = AsrWorker(single_model.recognize_batch, max_batch_size=1)
+    unbatched = run_worker(single, lambda: _sequential(single, samples, finals))
+
+    assert batched == unbatched
+    assert batched == [StubModel.transcribe(s, f) for s, f in zip(samples, finals)]
+    assert max(model.batch_sizes) > 1
+    assert len(model.batch_sizes) < len(samples)
+    assert sum(model.batch_sizes) == len(samples)
+    assert set(single_model.batch_sizes) == {1}
+    assert worker.metrics()["completed"] == len(samples)
+
+
+async def _sequential(worker, samples, finals):
+    return [await worker.recognize(s, None, f) for s, f in zip(samples, finals)]
+
+
+def test_stateful_cache_jobs_run_alone():
+    samples = utterances(6)
+    model = StubModel()
+    worker = AsrWorker(model.recognize_batch, max_batch_size=8, batch_window_ms=30)
+    caches = [{"state": i} if i % 2 else None for i in range(6)]
+    results = run_worker(worker, lambda: asyncio.gather(
+        *(worker.recognize(s, c, True) for s, c in zip(samples, caches))))
+
+    assert results == [StubModel.transcribe(s, True) for s in samples]
+    # 3 条带状态的请求各自单独一批，其余可以合批
+    assert model.batch_sizes.count(1) >= 3
+    assert sum(model.batch_sizes) == len(samples)
+
+
+def test_full_queue_waits_for_space_instead_of_dropping():
+    samples = utterances(12)
+    model = StubModel(delay_s=0.01)
+    worker = AsrWorker(model.recognize_batch, max_queue=2, max_batch_size=2, batch_window_ms=0)
+    results = run_worker(worker, lambda: asyncio.gather(*(worker.recognize(s, None, True) for s in samples)))
+
+    assert results == [StubModel.transcribe(s, True) for s in samples]
+    assert worker.metrics()["dropped"] == 0
+
+
+def test_best_effort_request_dropped_when_queue_full():
+    samples = utterances(8)
+    model = StubModel(delay_s=0.05)
+    worker = AsrWorker(model.recognize_batch, max_queue=1, max_batch_size=1, batch_window_ms=0)
+
+    async def flood():
+        return await asyncio.gather(*(worker.recognize(s, None, False, best_effort=True) for s in samples),
+                                    return_exceptions=True)
+
+    results = run_worker(worker, flood)
+    busy = [r for r in results if isinstance(r, AsrBusy)]
+    assert busy
+    assert worker.metrics()["dropped"] == len(busy)
+    for s, r in zip(samples, results):
+        if not isinstance(r, Exception):
+            assert r == StubModel.transcribe(s, False)
+
+
+@pytest.mark.parametrize("threads", [1, 3])
+def test_multiple_inference_threads_preserve_per_job_results(threads):
+    samples = utterances(24)
+    model = StubModel()
+    worker = AsrWorker(model.recognize_batch, max_queue=4, max_batch_size=4, batch_window_ms=5,
+                       threads=threads)
+    results = run_worker(worker, lambda: asyncio.gather(*(worker.recognize(s, None, True) for s in samples)))
+    assert results == [StubModel.transcribe(s, True) for s in samples]
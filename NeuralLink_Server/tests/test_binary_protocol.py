@@ -0,0 +1,38 @@
+"""协议 V2 二进制帧：打包/解包往返一致；客户端发来的畸形帧一律报 ProtocolError，不能把连接带崩"""
+import uuid
+
+import pytest
+
+import binary_protocol
+from binary_protocol import HEADER_SIZE, ProtocolError, pack_frame, unpack_frame
+
+
+def test_round_trip():
+    msg_id = str(uuid.uuid4())
+    data = pack_frame(binary_protocol.KIND_SERVER_TTS_AUDIO, msg_id, b"\x01\x02\x03", sentence_id=7,
+                      fragment_id=2, sync_text="你好。", flags=binary_protocol.FLAG_LAST)
+    frame = unpack_frame(data)
+    assert (frame.kind, frame.sentence_id, frame.fragment_id, frame.msg_id) == \
+        (binary_protocol.KIND_SERVER_TTS_AUDIO, 7, 2, msg_id)
+    assert frame.sync_text == "你好。"
+    assert frame.is_last
+    assert bytes(frame.audio) == b"\x01\x02\x03"
+
+
+def test_short_frame_rejected():
+    with pytest.raises(ProtocolError):
+        unpack_frame(b"\x01" * (HEADER_SIZE - 1))
+
+
+def test_text_length_out_of_bounds_rejected():
+    data = bytearray(pack_frame(binary_protocol.KIND_CLIENT_AUDIO, str(uuid.uuid4()), b"", sync_text="ab"))
+    data[HEADER_SIZE - 2:HEADER_SIZE] = (100).to_bytes(2, "little")
+    with pytest.raises(ProtocolError):
+        unpack_frame(bytes(data))
+
+
+def test_invalid_utf8_sync_text_rejected():
+    data = bytearray(pack_frame(binary_protocol.KIND_CLIENT_AUDIO, str(uuid.uuid4()), b"audio", sync_text="ab"))
+    data[HEADER_SIZE:HEADER_SIZE + 2] = b"\xff\xfe"
+    with pytest.raises(ProtocolError):
+        unpack_frame(bytes(data))
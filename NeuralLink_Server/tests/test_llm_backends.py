@@ -0,0 +1,60 @@
+"""LlmBackend.stream：读完、拿到 speak 后提前关闭、被取消三种结局分开统计"""
+import asyncio
+from contextlib import aclosing
+
+import metrics
+from llm_backends import FakeBackend
+from stream_parser import StreamingReplyParser
+
+MESSAGES = [{"role": "user", "content": "你好"}]
+
+
+def fake_backend() -> FakeBackend:
+    return FakeBackend(ttft_ms=0, chunk_ms=0)
+
+
+def test_full_read_counts_as_completed():
+    backend = fake_backend()
+
+    async def consume():
+        return "".join([text async for text in backend.stream(MESSAGES)])
+
+    assert asyncio.run(consume()) == FakeBackend.reply_for("你好")
+    assert (backend.completed_total, backend.early_closed_total, backend.cancelled_total) == (1, 0, 0)
+
+
+def test_break_after_speak_closed_is_not_a_cancellation():
+    backend = fake_backend()
+    before = metrics.latency("llm_total.fake").snapshot()["count"]
+
+    async def consume():
+        parser = StreamingReplyParser()
+        async with aclosing(backend.stream(MESSAGES)) as stream:
+            async for text in stream:
+                parser.feed(text)
+                if parser.speak_closed:
+                    break
+
+    asyncio.run(consume())
+    assert (backend.completed_total, backend.early_closed_total, backend.cancelled_total) == (0, 1, 0)
+    assert backend.in_flight == 0
+    assert metrics.latency("llm_total.fake").snapshot()["count"] == before + 1
+
+
+def test_cancelled_turn_counts_as_cancelled():
+    backend = FakeBackend(ttft_ms=0, chunk_ms=50)
+
+    async def consume():
+        async with aclosing(backend.stream(MESSAGES)) as stream:
+            async for _ in stream:
+                await asyncio.sleep(1)   # 停在 yield 之后，被取消时生成器由 aclosing 关闭
+
+    async def main():
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    assert (backend.completed_total, backend.early_closed_total, backend.cancelled_total) == (0, 0, 1)
+    assert backend.in_flight == 0
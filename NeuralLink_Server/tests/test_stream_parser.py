@@ -0,0 +1,94 @@
+"""StreamingReplyParser：任意切分 chunk 的结果都应与一次性喂入相同"""
+import json
+
+import pytest
+
+from stream_parser import StreamingReplyParser
+
+
+def run(chunks):
+    parser = StreamingReplyParser()
+    thought, sentences = "", []
+    for chunk in chunks:
+        delta, ready = parser.feed(chunk)
+        thought += delta
+        sentences += ready
+    return parser, thought, sentences + parser.finish()
+
+
+def split_every(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+REPLY = json.dumps({"thought": "用户在问候，回个招呼", "speak": "你好！今天过得怎么样？我在这里"},
+                   ensure_ascii=False)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, len(REPLY)])
+def test_chunking_does_not_change_result(size):
+    _, thought, sentences = run(split_every(REPLY, size))
+    assert thought == "用户在问候，回个招呼"
+    assert "".join(sentences) == "你好！今天过得怎么样？我在这里"
+
+
+def test_sentences_cut_at_punctuation_and_finish_returns_tail():
+    parser = StreamingReplyParser()
+    assert parser.feed('{"speak": "好的，马上') == ("", ["好的，"])
+    assert parser.feed('就来') == ("", [])
+    assert parser.finish() == ["马上就来"]
+    assert parser.finish() == []
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5])
+def test_escapes_split_across_chunks(size):
+    raw = r'{"thought": "引号\"反斜杠\\换行\n制表\t斜杠\/", "speak": "第一行\n第二行。"}'
+    _, thought, sentences = run(split_every(raw, size))
+    assert thought == '引号"反斜杠\\换行\n制表\t斜杠/'
+    assert sentences == ["第一行\n第二行。"]
+
+
+@pytest.mark.parametrize("size", [1, 2, 4, 6, 13])
+def test_unicode_escapes_and_surrogate_pairs_split_across_chunks(size):
+    # 😀 = 😀 (代理对)，中 = 中
+    raw = '{"speak": "\\u4e2d\\u6587\\ud83d\\ude00好。"}'
+    _, _, sentences = run(split_every(raw, size))
+    assert sentences == ["中文😀好。"]
+
+
+def test_lone_surrogate_becomes_replacement_char():
+    _, _, sentences = run(['{"speak": "a\\ud83db。"}'])
+    assert sentences == ["a�b。"]
+
+
+def test_nested_objects_reusing_tracked_keys_are_ignored():
+    raw = ('{"meta": {"speak": "不该念", "thought": "不该出现", "list": [{"speak": "也不该"}]}, '
+           '"thought": "真正的想法", "count": 3, "ok": true, "speak": "真正要说的话。"}')
+    for size in (1, 4, len(raw)):
+        _, thought, sentences = run(split_every(raw, size))
+        assert thought == "真正的想法"
+        assert sentences == ["真正要说的话。"]
+
+
+def test_markdown_fence_noise_before_object_is_skipped():
+    chunks = ["```", "json\n", '{"thought": "嗯"', ', "speak": "好的。"}', "\n```"]
+    _, thought, sentences = run(chunks)
+    assert thought == "嗯"
+    assert sentences == ["好的。"]
+
+
+def test_speak_closed_only_after_speak_string_ends():
+    parser = StreamingReplyParser()
+    parser.feed('{"thought": "想一想", "speak": "马上')
+    assert not parser.speak_closed
+    parser.feed('就好')
+    assert not parser.speak_closed
+    assert parser.feed('。"') == ("", ["马上就好。"])
+    assert parser.speak_closed
+    assert parser.finish() == []
+
+
+def test_thought_closing_does_not_close_speak():
+    parser = StreamingReplyParser()
+    parser.feed('{"thought": "完了"')
+    assert parser.thought == "完了"
+    assert not parser.speak_closed
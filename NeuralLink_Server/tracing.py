@@ -0,0 +1,172 @@
+"""
+单回合链路追踪：把一轮对话拆成 解码 / ASR / 大模型首 token / 首句切出 / 逐句 TTS / WebSocket 下发
+
+一个回合从 "用户说完" (is_last 或 VAD 端点；纯文本请求则从收到请求) 开始，到回复结束 (或被打断) 为止：
+
+- span：某个阶段的耗时，同名累加并计次 (例如每句 TTS 各记一次)
+- mark：某个事件距回合开始的时间，只记第一次 (首 token、首句、首音频……)
+- 结束时输出一行结构化 JSON 日志，阶段耗时同时进入全局延迟直方图 (span.* / turn.*)，
+  最近的回合可按 msg_id / task_id / trace_id 在 /traces 查到
+
+trace_id 经 W3C traceparent 请求头带到 TTS 节点；当前回合通过 contextvar 传递，
+TTS 客户端、下发函数不必层层传参。
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import config
+import metrics
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+_current: ContextVar[Optional["TurnTrace"]] = ContextVar("neurallink_turn_trace", default=None)
+_recent: deque = deque(maxlen=config.TRACE_RECENT)
+
+
+def current() -> Optional["TurnTrace"]:
+    return _current.get()
+
+
+def activate(trace: Optional["TurnTrace"]):
+    """在当前任务 (及其之后创建的子任务) 里把 trace 设为当前回合"""
+    _current.set(trace)
+
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[str]:
+    """取出 traceparent 里的 trace_id，格式不对返回 None"""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    return match.group(1) if match else None
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Server-Timing: queue;dur=12.3, synth;dur=456 -> {"queue": 12.3, "synth": 456.0}"""
+    out = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    out[name] = float(value)
+                except ValueError:
+                    pass
+    return out
+
+
+class TurnTrace:
+    def __init__(self, msg_id: str, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or new_trace_id()
+        self.msg_id = msg_id
+        self.task_id: Optional[str] = None
+        self.started_at = time.perf_counter()
+        self.wall_start = time.time()
+
+        self.spans: Dict[str, float] = {}    # 阶段 -> 累计耗时 (ms)
+        self.counts: Dict[str, int] = {}     # 阶段 -> 次数
+        self.marks: Dict[str, float] = {}    # 事件 -> 距回合开始 (ms)
+        self.attrs: Dict[str, object] = {}   # 其他上下文：音频时长、中间结果次数……
+        self.outcome: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.outcome is not None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def mark(self, name: str):
+        if name not in self.marks:
+            self.marks[name] = self.elapsed_ms()
+
+    def add(self, name: str, ms: float):
+        self.spans[name] = self.spans.get(name, 0.0) + ms
+        self.counts[name] = self.counts.get(name, 0) + 1
+        metrics.latency(f"span.{name}").observe(ms)
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def fork(self) -> "TurnTrace":
+        """推测回合：同一个 trace_id，各记各的；命中后由推测回合这份接着记下去"""
+        clone = TurnTrace(self.msg_id, self.trace_id)
+        clone.started_at = self.started_at
+        clone.wall_start = self.wall_start
+        clone.spans = dict(self.spans)
+        clone.counts = dict(self.counts)
+        clone.marks = dict(self.marks)
+        clone.attrs = dict(self.attrs)
+        return clone
+
+    def merge(self, other: "TurnTrace"):
+        """推测命中：fork 之后原回合上才记下的阶段 (如 is_last 之后的 ASR 收尾) 补进来"""
+        for name, ms in other.spans.items():
+            if name not in self.spans:
+                self.spans[name] = ms
+                self.counts[name] = other.counts.get(name, 1)
+        for name, at in other.marks.items():
+            self.marks.setdefault(name, at)
+        for key, value in other.attrs.items():
+            self.attrs.setdefault(key, value)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{os.urandom(8).hex()}-01"
+
+    def finish(self, outcome: str):
+        """只有第一次调用生效：completed / interrupted / failed / no_speech ..."""
+        if self.finished:
+            return
+        self.outcome = outcome
+        total = self.elapsed_ms()
+        self.marks["end"] = total
+        metrics.counter(f"turns_{outcome}").inc()
+        metrics.latency("turn.total").observe(total)
+        for name, at in self.marks.items():
+            if name != "end":
+                metrics.latency(f"turn.{name}").observe(at)
+        record = self.to_dict()
+        _recent.append(record)
+        if config.TRACE_LOG:
+            logger.info(f"📊 回合追踪 {json.dumps(record, ensure_ascii=False)}")
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "msg_id": self.msg_id,
+            "task_id": self.task_id,
+            "start": round(self.wall_start, 3),
+            "outcome": self.outcome,
+            "marks_ms": {k: round(v, 1) for k, v in self.marks.items()},
+            "spans_ms": {k: round(v, 1) for k, v in self.spans.items()},
+            "span_counts": dict(self.counts),
+            "attrs": dict(self.attrs),
+        }
+
+
+def recent(limit: int = 20) -> List[dict]:
+    return list(_recent)[-limit:][::-1]
+
+
+def find(key: str) -> List[dict]:
+    """按 msg_id / task_id / trace_id 查最近的回合"""
+    return [r for r in reversed(_recent) if key in (r["msg_id"], r["task_id"], r["trace_id"])]
@@ -0,0 +1,215 @@
+"""
+内容寻址的合成音频缓存 (全进程共享，跨 WebSocket 会话复用)
+
+助手经常重复说一些短句 (问候、确认、道歉、"嗯……")，每次都走一遍 GPU 合成很浪费。
+
+- 键：规范化文本 + 音色 + 合成参数 的 SHA-256
+- 值：可以直接下发的音频片段列表 (原始字节供二进制帧使用，Base64 供 V1 JSON 协议使用，只编码一次)
+- 内存层：按总字节数限额的 LRU；磁盘层 (可选)：每个键一个 JSON 文件，重启后依然命中
+- 启动时可预热一批填充音/常用语，替代原先看门狗触发时才临时去合成填充音的做法；
+  预热结果常驻 (不占 LRU 字节额度，缓存关闭时也保留)，延迟掩盖不会因为缓存配置而失效
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+import config
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+FragmentSource = Callable[[str], AsyncIterator[bytes]]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class AudioFragment:
+    """一个可独立播放的音频片段：原始字节 + 惰性缓存的 Base64"""
+    __slots__ = ("raw", "_b64")
+
+    def __init__(self, raw: bytes, b64: Optional[str] = None):
+        self.raw = raw
+        self._b64 = b64
+
+    @property
+    def b64(self) -> str:
+        if self._b64 is None:
+            self._b64 = base64.b64encode(self.raw).decode('utf-8')
+        return self._b64
+
+
+def normalize_text(text: str) -> str:
+    """全角/半角、空白差异不应导致缓存未命中"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class TtsCache:
+    def __init__(self,
+                 voice: str = config.TTS_VOICE,
+                 max_bytes: int = config.TTS_CACHE_MAX_BYTES,
+                 max_text_len: int = config.TTS_CACHE_MAX_TEXT_LEN,
+                 disk_dir: str = config.TTS_CACHE_DIR,
+                 params: Optional[dict] = None):
+        self.voice = voice
+        self.max_bytes = max_bytes
+        self.max_text_len = max_text_len
+        self.disk_dir = disk_dir or None
+        # 影响音频内容/切片方式的参数都要进键，参数一变旧缓存自然失效
+        self.params = params if params is not None else {
+            "streaming": config.TTS_STREAMING,
+            "min_fragment_ms": config.TTS_MIN_FRAGMENT_MS,
+        }
+        self._entries: "OrderedDict[str, List[AudioFragment]]" = OrderedDict()
+        self._size = 0
+        self._pinned: Dict[str, List[AudioFragment]] = {}   # 预热的填充音/常用语，不参与淘汰
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # 键与读写
+    # ------------------------------------------------------------------
+    def key(self, text: str) -> str:
+        material = json.dumps({"text": normalize_text(text), "voice": self.voice, "params": self.params},
+                              ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def cacheable(self, text: str) -> bool:
+        return self.max_bytes > 0 and 0 < len(normalize_text(text)) <= self.max_text_len
+
+    async def get(self, text: str) -> Optional[List[AudioFragment]]:
+        """命中返回音频片段列表，未命中返回 None"""
+        if self._pinned:
+            fragments = self._pinned.get(self.key(text))
+            if fragments is not None:
+                self.hits += 1
+                return fragments
+        if not self.cacheable(text):
+            return None
+        key = self.key(text)
+        fragments = self._entries.get(key)
+        if fragments is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return fragments
+
+        if self.disk_dir:
+            fragments = await asyncio.to_thread(self._read_disk, key)
+            if fragments is not None:
+                self.disk_hits += 1
+                self._remember(key, fragments)
+                return fragments
+
+        self.misses += 1
+        return None
+
+    async def put(self, text: str, fragments: List[AudioFragment]):
+        if not fragments or not self.cacheable(text):
+            return
+        key = self.key(text)
+        self._remember(key, fragments)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, fragments)
+
+    def _remember(self, key: str, fragments: List[AudioFragment]):
+        size = sum(len(f.raw) for f in fragments)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= sum(len(f.raw) for f in old)
+        self._entries[key] = fragments
+        self._size += size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= sum(len(f.raw) for f in evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[List[AudioFragment]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return [AudioFragment(base64.b64decode(b64), b64) for b64 in json.load(f)]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ 磁盘缓存损坏，忽略: {e}")
+            return None
+
+    def _write_disk(self, key: str, fragments: List[AudioFragment]):
+        tmp_path = self._path(key) + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([fragment.b64 for fragment in fragments], f)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"⚠️ 磁盘缓存写入失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 与 TtsDispatcher 对接
+    # ------------------------------------------------------------------
+    def wrap(self, source: FragmentSource) -> Callable[[str], AsyncIterator[AudioFragment]]:
+        """把 "文本 -> 原始音频字节" 包装成 "文本 -> AudioFragment (先查缓存)" """
+        async def fragments(text: str) -> AsyncIterator[AudioFragment]:
+            cached = await self.get(text)
+            if cached is not None:
+                for fragment in cached:
+                    yield fragment
+                return
+
+            collected = []
+            async for audio in source(text):
+                fragment = AudioFragment(audio)
+                collected.append(fragment)
+                yield fragment
+            # 只有完整合成的句子才入缓存，被打断的半句话不算
+            await self.put(text, collected)
+
+        return fragments
+
+    async def prewarm(self, source: FragmentSource, phrases: Iterable[str]):
+        """启动时预先合成填充音与常用语，结果常驻 (已经常驻的跳过)"""
+        warmed = 0
+        for phrase in phrases:
+            key = self.key(phrase)
+            if key in self._pinned:
+                warmed += 1
+                continue
+            try:
+                fragments = await self.get(phrase)   # 磁盘层 / LRU 里已有就不再合成
+                if fragments is None:
+                    fragments = [AudioFragment(audio) async for audio in source(phrase)]
+                    await self.put(phrase, fragments)
+                if fragments:
+                    self._pinned[key] = fragments
+                    warmed += 1
+            except Exception as e:
+                logger.warning(f"⚠️ 预热失败 [{phrase}]: {e}")
+        logger.info(f"🔥 TTS 缓存预热完成: {warmed} 条")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "pinned": len(self._pinned),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_dir": self.disk_dir,
+        }
+
+
+# 全局单例：所有会话共享
+tts_cache = TtsCache()
@@ -0,0 +1,276 @@
+"""
+TTS 节点的共享 HTTP 客户端
+
+整个大脑进程只持有一个 httpx.AsyncClient (由 FastAPI lifespan 创建/关闭)，
+所有会话、所有句子复用同一个连接池，省掉每句话的 TCP 建连与连接池创建开销。
+每个请求都带上当前回合的 traceparent，耗时记进回合追踪 (tracing.py)。
+可以配置多个 TTS 节点 (NEURALLINK_TTS_URLS)：每句话由 workers.WorkerPool 按在途请求数 + 会话粘滞挑节点，
+节点连不上 / 返回 502、503、504 / 繁忙时换一个节点重试 (流式合成只在还没下发任何片段时才能换)。
+"""
+import importlib.util
+import logging
+import struct
+import time
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+import config
+import metrics
+import tracing
+import workers
+from workers import NODE_DOWN_STATUSES, NoHealthyWorker, WorkerNode, WorkerPool
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+
+class TtsError(Exception):
+    """TTS 节点返回了非音频结果 (HTTP 错误或 {"error": ...})"""
+
+
+WAV_HEADER_SIZE = 44
+
+
+def wav_header(sample_rate: int, channels: int, sample_width: int, data_len: int) -> bytes:
+    """标准 44 字节 PCM WAV 头"""
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack("<4sI4s4sIHHIIHH4sI",
+                       b"RIFF", 36 + data_len, b"WAVE", b"fmt ", 16, 1, channels,
+                       sample_rate, byte_rate, channels * sample_width, sample_width * 8,
+                       b"data", data_len)
+
+
+def parse_wav_header(header: bytes):
+    """解析 /tts/stream 下发的 44 字节 WAV 头，返回 (sample_rate, channels, sample_width)"""
+    if len(header) < WAV_HEADER_SIZE or header[0:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise TtsError("流式 TTS 返回的不是合法的 WAV 头")
+    channels, sample_rate = struct.unpack_from("<HI", header, 22)
+    bits_per_sample, = struct.unpack_from("<H", header, 34)
+    return sample_rate, channels, bits_per_sample // 8
+
+
+def _h2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _trace_headers(trace: Optional[tracing.TurnTrace]) -> dict:
+    return {"traceparent": trace.traceparent()} if trace is not None else {}
+
+
+class TtsClient:
+    def __init__(self,
+                 base_url: Optional[str] = None,
+                 urls: Optional[List[str]] = None,
+                 max_connections: int = config.TTS_MAX_CONNECTIONS,
+                 max_keepalive: int = config.TTS_MAX_KEEPALIVE,
+                 keepalive_expiry: float = config.TTS_KEEPALIVE_EXPIRY,
+                 connect_timeout: float = config.TTS_CONNECT_TIMEOUT,
+                 read_timeout: float = config.TTS_READ_TIMEOUT,
+                 http2: bool = config.TTS_HTTP2,
+                 streaming: bool = config.TTS_STREAMING,
+                 min_fragment_ms: int = config.TTS_MIN_FRAGMENT_MS,
+                 max_attempts: int = config.TTS_MAX_ATTEMPTS):
+        self.pool = WorkerPool("tts", urls or ([base_url] if base_url else config.TTS_URLS))
+        self.attempts = max(1, min(max_attempts, len(self.pool.nodes)))
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.http2 = http2
+        self.streaming = streaming
+        self.min_fragment_ms = min_fragment_ms
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # 客户端侧统计 (连接池之外)
+        self.in_flight = 0
+        self.requests_total = 0
+        self.failures_total = 0
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    async def start(self):
+        if self._client is not None:
+            return
+        if self.http2 and not _h2_available():
+            logger.warning("⚠️ 未安装 h2，TTS 客户端回退为 HTTP/1.1 keep-alive")
+            self.http2 = False
+        # 注意：对明文 http:// 地址 httpx 仍会走 HTTP/1.1，HTTP/2 只在 https 上通过 ALPN 协商生效
+        self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+        await self.pool.start()
+        logger.info(f"🔗 TTS 连接池已就绪: {len(self.pool.nodes)} 个节点 (http2={self.http2})")
+
+    async def close(self):
+        await self.pool.close()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("TtsClient 尚未启动 (应在 FastAPI lifespan 中调用 start)")
+        return self._client
+
+    # ------------------------------------------------------------------
+    # 节点选择与故障转移
+    # ------------------------------------------------------------------
+    def _pick(self, tried: List[WorkerNode]) -> WorkerNode:
+        try:
+            node = self.pool.pick(workers.current_affinity(), exclude=tried)
+        except NoHealthyWorker as e:
+            raise TtsError(str(e)) from None
+        tried.append(node)
+        return node
+
+    def _retry_on_status(self, node: WorkerNode, res: httpx.Response, tried: List[WorkerNode]) -> bool:
+        """502/503/504 (含未就绪) 摘掉节点，429 只是繁忙；还有别的节点可试就换一个。
+        其他错误 (单句合成失败等) 是这句话的问题，换节点也一样，直接报错"""
+        if res.status_code in NODE_DOWN_STATUSES:
+            self.pool.mark_down(node, f"HTTP {res.status_code}")
+        elif res.status_code != 429:
+            return False
+        return len(tried) < self.attempts
+
+    # ------------------------------------------------------------------
+    # 合成
+    # ------------------------------------------------------------------
+    async def synthesize(self, text: str, timeout: Optional[float] = None) -> bytes:
+        """请求整句合成，返回 WAV 字节；失败抛出 TtsError / httpx 异常"""
+        trace = tracing.current()
+        started = time.perf_counter()
+        tried: List[WorkerNode] = []
+        self.in_flight += 1
+        self.requests_total += 1
+        try:
+            while True:
+                node = self._pick(tried)
+                try:
+                    res = await self.client.get(f"{node.url}/tts", params={"text": text},
+                                                headers=_trace_headers(trace),
+                                                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT)
+                except httpx.TransportError as e:
+                    self.pool.mark_down(node, e)
+                    if len(tried) < self.attempts:
+                        continue
+                    raise
+                finally:
+                    self.pool.release(node)
+                if res.status_code != 200 and self._retry_on_status(node, res, tried):
+                    continue
+                if res.status_code != 200 or not res.headers.get("content-type", "").startswith("audio/"):
+                    raise TtsError(f"TTS 节点返回异常 [{res.status_code}]: {res.text[:200]}")
+                if trace is not None:
+                    trace.add("tts_sentence", (time.perf_counter() - started) * 1000)
+                    # TTS 节点在 Server-Timing 里回报排队与推理耗时，剩下的就是网络与编解码
+                    for stage, ms in tracing.parse_server_timing(res.headers.get("server-timing")).items():
+                        trace.add(f"tts_{stage}", ms)
+                return res.content
+        except Exception:
+            self.failures_total += 1
+            metrics.counter("tts_failures").inc()
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def synthesize_stream(self, text: str) -> AsyncIterator[bytes]:
+        """请求 /tts/stream，边合成边产出片段；每个片段都包装成可独立播放的 WAV"""
+        trace = tracing.current()
+        started = time.perf_counter()
+        tried: List[WorkerNode] = []
+        yielded = False
+        self.in_flight += 1
+        self.requests_total += 1
+        try:
+            while True:
+                node = self._pick(tried)
+                try:
+                    async with self.client.stream("GET", f"{node.url}/tts/stream", params={"text": text},
+                                                  headers=_trace_headers(trace)) as res:
+                        if res.status_code != 200 or not res.headers.get("content-type", "").startswith("audio/"):
+                            await res.aread()
+                            if res.status_code != 200 and self._retry_on_status(node, res, tried):
+                                continue
+                            raise TtsError(f"TTS 节点返回异常 [{res.status_code}]: {res.text[:200]}")
+
+                        header = None
+                        buffer = bytearray()
+                        min_bytes = 0
+                        frame_bytes = 2
+                        async for data in res.aiter_bytes():
+                            buffer += data
+                            if header is None:
+                                if len(buffer) < WAV_HEADER_SIZE:
+                                    continue
+                                header = parse_wav_header(bytes(buffer[:WAV_HEADER_SIZE]))
+                                del buffer[:WAV_HEADER_SIZE]
+                                sample_rate, channels, sample_width = header
+                                frame_bytes = channels * sample_width
+                                min_bytes = sample_rate * frame_bytes * self.min_fragment_ms // 1000
+
+                            # 攒够最小时长再下发，且只在整帧边界切开
+                            if len(buffer) >= max(min_bytes, frame_bytes):
+                                cut = len(buffer) - len(buffer) % frame_bytes
+                                if not yielded and trace is not None:
+                                    trace.add("tts_first_fragment", (time.perf_counter() - started) * 1000)
+                                yielded = True
+                                yield wav_header(*header, cut) + bytes(buffer[:cut])
+                                del buffer[:cut]
+
+                        if header is None:
+                            raise TtsError("模型未生成任何声音信号")
+                        if buffer:
+                            if not yielded and trace is not None:
+                                trace.add("tts_first_fragment", (time.perf_counter() - started) * 1000)
+                            yielded = True
+                            yield wav_header(*header, len(buffer)) + bytes(buffer)
+                    break
+                except httpx.TransportError as e:
+                    self.pool.mark_down(node, e)
+                    # 已经下发过片段就不能换节点重来，否则前端会听到重复的半句
+                    if not yielded and len(tried) < self.attempts:
+                        continue
+                    raise
+                finally:
+                    self.pool.release(node)
+            if trace is not None:
+                trace.add("tts_sentence", (time.perf_counter() - started) * 1000)
+        except Exception:
+            self.failures_total += 1
+            metrics.counter("tts_failures").inc()
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def fragments(self, text: str) -> AsyncIterator[bytes]:
+        """按配置选择流式或整句合成，统一以片段迭代器的形式交给 TtsDispatcher"""
+        if self.streaming:
+            async for audio in self.synthesize_stream(text):
+                yield audio
+        else:
+            yield await self.synthesize(text)
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        stats = {
+            "nodes": self.pool.stats(),
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "failures_total": self.failures_total,
+        }
+        # httpx 没有公开连接池统计，这里尽力读取 httpcore 连接池的状态
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        return stats
+
+
+# 全局单例：由 main.py 的 lifespan 启动与关闭
+tts_client = TtsClient()
@@ -0,0 +1,86 @@
+"""
+流水线化的 TTS 调度器 (单回合)
+
+旧的 tts_worker 是单消费者：第 N 句的音频推给前端之后，第 N+1 句才发往 TTS 节点，
+一条回复的总延迟 = 每句合成时间之和。这里改为：
+
+- 句子一切好就立刻提交，最多 max_in_flight 句同时在 TTS 节点上合成
+- 交付端按 sentence_id 严格排队，前端收到的音频顺序与原文一致
+- 支持流式合成：队首句子的音频片段一到就交付，后面的句子先在各自的缓冲区里攒着
+- cancel() 会同时丢弃排队中与在途的合成请求
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import config
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+# 合成函数：给一句话，按顺序产出一个或多个可独立播放的音频片段 (原始字节或已编码的 Base64，调度器不关心)
+SynthesizeFn = Callable[[str], AsyncIterator[Any]]
+# 交付回调：(sentence_id, 原文, 音频片段, 片段序号)
+DeliverFn = Callable[[int, str, Any, int], Awaitable[None]]
+
+_END = object()
+
+
+class TtsDispatcher:
+    def __init__(self, synthesize: SynthesizeFn, deliver: DeliverFn,
+                 max_in_flight: int = config.TTS_MAX_IN_FLIGHT):
+        self._synthesize = synthesize
+        self._deliver = deliver
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+        # 交付队列：按提交顺序 (即 sentence_id 顺序) 存放 (sentence_id, text, 片段缓冲区)
+        self._ordered: asyncio.Queue = asyncio.Queue()
+        self._jobs = set()
+        self._deliver_task: Optional[asyncio.Task] = asyncio.create_task(self._deliver_loop())
+
+    def submit(self, sentence_id: int, text: str):
+        """提交一句话；合成立即在后台开始 (受 max_in_flight 限制)"""
+        fragments: asyncio.Queue = asyncio.Queue()
+        job = asyncio.create_task(self._run_job(sentence_id, text, fragments))
+        self._jobs.add(job)
+        job.add_done_callback(self._jobs.discard)
+        self._ordered.put_nowait((sentence_id, text, fragments))
+
+    async def close(self):
+        """不再提交新句子，等待所有已提交的句子按序交付完毕"""
+        self._ordered.put_nowait(None)
+        if self._deliver_task is not None:
+            await self._deliver_task
+
+    def cancel(self):
+        """丢弃全部排队中与在途的合成，交付端立即停止"""
+        for job in list(self._jobs):
+            job.cancel()
+        if self._deliver_task is not None and not self._deliver_task.done():
+            self._deliver_task.cancel()
+
+    async def _run_job(self, sentence_id: int, text: str, fragments: asyncio.Queue):
+        try:
+            async with self._slots:
+                logger.info(f"🎙️ 正在向 3060 节点请求语音合成 [{sentence_id}]: {text}")
+                async for audio in self._synthesize(text):
+                    fragments.put_nowait(audio)
+        except asyncio.CancelledError:
+            fragments.put_nowait(_END)
+            raise
+        except Exception as e:
+            logger.error(f"❌ TTS 服务故障 [{sentence_id}]: {e}")
+        fragments.put_nowait(_END)
+
+    async def _deliver_loop(self):
+        while True:
+            item = await self._ordered.get()
+            if item is None:  # 收到毒药（结束信号），安全退出
+                return
+
+            sentence_id, text, fragments = item
+            index = 0
+            while True:
+                audio = await fragments.get()
+                if audio is _END:
+                    break
+                await self._deliver(sentence_id, text, audio, index)
+                index += 1
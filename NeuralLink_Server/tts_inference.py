@@ -0,0 +1,257 @@
+"""
+TTS 节点的推理执行器 (与具体模型解耦，不依赖 GPT-SoVITS / GPU)
+
+- 有界请求队列 + 单个推理线程独占 GPU，事件循环永不阻塞
+- 动态微批：推理线程空闲时，在 batch_window_ms 内到达的整句请求 (最多 max_batch_size 个)
+  合并成一次 synthesize_batch 调用，结果按顺序路由回各自的调用方
+- 流式请求单独执行，逐片段回传；调用方断开后不再合成剩下的片段
+
+tts_server.py 负责注入真正的模型调用；基准测试可以注入 CPU 桩函数。
+"""
+import asyncio
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable, Iterator, List, Tuple, Union
+
+from metrics import LatencyRecorder, percentiles
+
+# texts -> 每个请求对应的 WAV 字节 (或该请求单独的异常)
+BatchSynthesizeFn = Callable[[List[str]], List[Union[bytes, Exception]]]
+# text -> (sample_rate, pcm16 字节) 片段迭代器
+FragmentIterFn = Callable[[str], Iterator[Tuple[int, bytes]]]
+
+
+class SynthesisJob:
+    """一次合成请求。结果通过 call_soon_threadsafe 从推理线程送回事件循环"""
+
+    def __init__(self, text: str, streaming: bool, trace_id: str = ""):
+        self.text = text
+        self.streaming = streaming
+        self.trace_id = trace_id                  # 上游回合的 trace_id (traceparent)，只用于日志
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()   # 整句模式：WAV 字节
+        self.fragments = asyncio.Queue()          # 流式模式：(sr, pcm) ...，None 表示结束
+        self.cancelled = threading.Event()
+        self.enqueued_at = time.perf_counter()
+        self.queue_ms = 0.0                       # 排队耗时 (推理线程开始处理时写入)
+        self.synth_ms = 0.0                       # 推理耗时 (整句模式：所在批次的耗时)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def resolve(self, result=None, error: Exception = None):
+        def _set():
+            if self.future.done():
+                return
+            if error is not None:
+                self.future.set_exception(error)
+            else:
+                self.future.set_result(result)
+        self.loop.call_soon_threadsafe(_set)
+
+    def abandon(self):
+        """调用方已离开：丢弃结果，结束片段流"""
+        self.loop.call_soon_threadsafe(self.future.cancel)
+        self.push(None)
+
+    def push(self, item):
+        self.loop.call_soon_threadsafe(self.fragments.put_nowait, item)
+
+
+class InferenceWorker:
+    """有界队列 + 单个推理线程。队列满时 submit 返回 False，由路由层返回 429"""
+
+    def __init__(self, synthesize_batch: BatchSynthesizeFn, iter_fragments: FragmentIterFn,
+                 max_queue: int = 16, max_batch_size: int = 4, batch_window_ms: float = 10.0):
+        self._synthesize_batch = synthesize_batch
+        self._iter_fragments = iter_fragments
+        self.max_queue = max_queue
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = max(0.0, batch_window_ms) / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._deferred = deque()   # 凑批时顺手取出的流式请求，批次跑完后优先执行
+        self._stopping = False
+        self._thread = None
+
+        self.synth = LatencyRecorder("tts_synth")
+        self.queue_wait = LatencyRecorder("tts_queue_wait")
+        self._batch_sizes = deque(maxlen=512)
+        self.in_progress = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.batches = 0
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._loop, name="tts-inference", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        # 放弃所有排队中的请求，再投毒让线程退出
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._reject_on_shutdown(job)
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._thread = None
+
+    def submit(self, job: SynthesisJob) -> bool:
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except queue.Full:
+            self.rejected += 1
+            return False
+
+    # ------------------------------------------------------------------
+    # 推理线程
+    # ------------------------------------------------------------------
+    def _loop(self):
+        while not self._stopping:
+            job = self._deferred.popleft() if self._deferred else self._queue.get()
+            if job is None:
+                break
+            if self._skip_if_cancelled(job):
+                continue
+            if job.streaming:
+                self._run_stream(job)
+            else:
+                self._run_batch(self._collect_batch(job))
+
+        while self._deferred:
+            self._reject_on_shutdown(self._deferred.popleft())
+
+    def _collect_batch(self, first: SynthesisJob) -> List[SynthesisJob]:
+        """以 first 为首凑一批整句请求：最多等 batch_window，最多 max_batch_size 个"""
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._stopping = True
+                break
+            if self._skip_if_cancelled(job):
+                continue
+            if job.streaming:
+                self._deferred.append(job)
+                continue
+            batch.append(job)
+        return batch
+
+    def _skip_if_cancelled(self, job: SynthesisJob) -> bool:
+        if not job.cancelled.is_set():
+            return False
+        # 客户端在排队期间已经断开，直接跳过，不浪费 GPU
+        self.cancelled += 1
+        job.abandon()
+        return True
+
+    def _run_batch(self, batch: List[SynthesisJob]):
+        started = time.perf_counter()
+        for job in batch:
+            job.queue_ms = (started - job.enqueued_at) * 1000
+            self.queue_wait.observe(job.queue_ms)
+        self.in_progress += len(batch)
+        self.batches += 1
+        self._batch_sizes.append(len(batch))
+        try:
+            results = self._synthesize_batch([job.text for job in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"批量合成结果数 {len(results)} 与请求数 {len(batch)} 不一致")
+        except Exception as e:
+            traceback.print_exc()
+            print(f"❌ 推理崩溃 [trace {' '.join(job.trace_id[:8] for job in batch)}]: {e}")
+            results = [e] * len(batch)
+        finally:
+            self.in_progress -= len(batch)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            for job in batch:
+                job.synth_ms = elapsed_ms
+                self.synth.observe(elapsed_ms)
+
+        for job, result in zip(batch, results):
+            if isinstance(result, Exception):
+                self.failed += 1
+                job.resolve(error=result)
+            else:
+                self.completed += 1
+                job.resolve(result)
+
+    def _run_stream(self, job: SynthesisJob):
+        started = time.perf_counter()
+        job.queue_ms = (started - job.enqueued_at) * 1000
+        self.queue_wait.observe(job.queue_ms)
+        self.in_progress += 1
+        cancelled = False
+        try:
+            fragments = self._iter_fragments(job.text)
+            try:
+                for sr, pcm in fragments:
+                    if job.cancelled.is_set():
+                        cancelled = True
+                        break  # 客户端断开，剩下的片段不再合成
+                    job.push((sr, pcm))
+            finally:
+                close = getattr(fragments, "close", None)
+                if close is not None:
+                    close()
+            # 半途取消的流单独计数：不算完成，耗时也不进合成延迟，否则完成数和延迟分布都会虚高
+            if cancelled:
+                self.cancelled += 1
+            else:
+                self.completed += 1
+        except Exception as e:
+            traceback.print_exc()
+            print(f"❌ 流式推理崩溃 [trace {job.trace_id[:8]}]: {e}")
+            self.failed += 1
+        finally:
+            job.push(None)
+            self.in_progress -= 1
+            job.synth_ms = (time.perf_counter() - started) * 1000
+            if not cancelled:
+                self.synth.observe(job.synth_ms)
+
+    @staticmethod
+    def _reject_on_shutdown(job: SynthesisJob):
+        job.cancel()
+        job.resolve(error=RuntimeError("语音引擎正在关闭"))
+        job.push(None)
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() + len(self._deferred),
+            "max_queue": self.max_queue,
+            "in_progress": self.in_progress,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+            "batch_window_ms": round(self.batch_window * 1000, 2),
+            "batch_size": percentiles(list(self._batch_sizes)),
+            "synth_ms": self.synth.snapshot(),
+            "queue_wait_ms": self.queue_wait.snapshot(),
+        }
@@ -1,67 +1,76 @@
 import os
 import sys
 import io
+import struct
+import asyncio
+from typing import List
 import numpy as np
 import soundfile as sf
-import torch
-from fastapi import FastAPI, Query
-from fastapi.responses import Response
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import Response, StreamingResponse, JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
+import time
 import traceback
+import metrics
+import tracing
+from tts_inference import InferenceWorker, SynthesisJob
+from startup import Readiness, add_health_routes
 
 
 # ==========================================
 # 1. 环境自举器 (Zerolan 风格的预检与自愈)
 # ==========================================
 class EnvironmentBootstrapper:
-    @staticmethod
-    def setup():
+    # 1. 路径定义
+    SERVER_ROOT = r"E:\TOOL\AI\neurolike\NeuralLink_Server"
+    GPT_SOVITS_ROOT = os.path.join(SERVER_ROOT, "GPT-SoVITS")
+    GPT_LOGIC_DIR = os.path.join(GPT_SOVITS_ROOT, "GPT_SoVITS")
+    PRETRAINED_DIR = os.path.join(GPT_LOGIC_DIR, "pretrained_models")
+
+    @classmethod
+    def setup(cls):
+        """有副作用 (改环境变量、sys.path、工作目录)，只在启动阶段调用，导入本模块不触发"""
         print("🛡️ [Zerolan 风格] 正在进行环境自举与预检...")
 
-        # 1. 路径定义
-        SERVER_ROOT = r"E:\TOOL\AI\neurolike\NeuralLink_Server"
-        GPT_SOVITS_ROOT = os.path.join(SERVER_ROOT, "GPT-SoVITS")
-        GPT_LOGIC_DIR = os.path.join(GPT_SOVITS_ROOT, "GPT_SoVITS")
-
         # 2. 环境变量接管 (强制设置模型缓存路径，防止底层库乱跑)
         os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
 
         # 3. 动态系统路径注入
-        if GPT_SOVITS_ROOT not in sys.path:
-            sys.path.insert(0, GPT_SOVITS_ROOT)
-        if GPT_LOGIC_DIR not in sys.path:
-            sys.path.insert(0, GPT_LOGIC_DIR)
+        if cls.GPT_SOVITS_ROOT not in sys.path:
+            sys.path.insert(0, cls.GPT_SOVITS_ROOT)
+        if cls.GPT_LOGIC_DIR not in sys.path:
+            sys.path.insert(0, cls.GPT_LOGIC_DIR)
 
-        os.chdir(GPT_SOVITS_ROOT)
+        os.chdir(cls.GPT_SOVITS_ROOT)
 
         # 4. 🔥 核心自愈逻辑：提前创建所有容易报错的缓存文件夹
-        pretrained_dir = os.path.join(GPT_LOGIC_DIR, "pretrained_models")
         # 针对 fast_langdetect 的致命报错，提前建好它的狗窝
-        fast_langdetect_dir = os.path.join(pretrained_dir, "fast_langdetect")
+        fast_langdetect_dir = os.path.join(cls.PRETRAINED_DIR, "fast_langdetect")
 
-        folders_to_ensure = [pretrained_dir, fast_langdetect_dir]
+        folders_to_ensure = [cls.PRETRAINED_DIR, fast_langdetect_dir]
         for folder in folders_to_ensure:
             if not os.path.exists(folder):
                 os.makedirs(folder, exist_ok=True)
                 print(f"🔧 [自愈] 自动创建缺失的底层依赖目录: {folder}")
 
         print("✅ 环境预检通过，底层装甲已就绪。")
-        return GPT_LOGIC_DIR, pretrained_dir
 
 
-# 触发自举
-GPT_LOGIC_DIR, PRETRAINED_DIR = EnvironmentBootstrapper.setup()
+GPT_LOGIC_DIR = EnvironmentBootstrapper.GPT_LOGIC_DIR
+PRETRAINED_DIR = EnvironmentBootstrapper.PRETRAINED_DIR
 
 # ==========================================
-# 2. 安全导入模型引擎
+# 2. 引擎导入 (torch / GPT-SoVITS 很重，推迟到启动阶段，导入本模块不加载任何模型)
 # ==========================================
-try:
-    from TTS_infer_pack.TTS import TTS, TTS_Config
+TTS = TTS_Config = None
+
 
+def import_engine():
+    global TTS, TTS_Config
+    EnvironmentBootstrapper.setup()
+    from TTS_infer_pack.TTS import TTS, TTS_Config
     print("📦 成功挂载 GPT-SoVITS 纯净引擎")
-except ImportError as e:
-    print(f"❌ 引擎导入失败: {e}")
-    sys.exit(1)
+
 
 # ==========================================
 # 3. 核心配置与全局单例
@@ -71,92 +80,335 @@ SOVITS_MODEL = os.path.join(PRETRAINED_DIR, "s2Gv3.pth")
 REF_WAV = os.path.join(PRETRAINED_DIR, "ref_audio.wav")
 REF_TEXT = "你好，小智，现在是2026年。"
 
+# 推理请求队列上限：排满后直接拒绝，让上游 (大脑节点) 感知背压
+MAX_QUEUE_SIZE = int(os.getenv("NEURALLINK_TTS_QUEUE_SIZE", "16"))
+# 动态微批：空闲时最多等待 BATCH_WINDOW_MS 凑批，单批最多 MAX_BATCH_SIZE 句 (设为 1 即关闭微批)
+MAX_BATCH_SIZE = int(os.getenv("NEURALLINK_TTS_MAX_BATCH_SIZE", "4"))
+BATCH_WINDOW_MS = float(os.getenv("NEURALLINK_TTS_BATCH_WINDOW_MS", "10"))
+# GPT-SoVITS 预处理会把过短的分段与下一段合并，短句无法单独路由，只能逐句合成
+MIN_BATCH_TEXT_LEN = 5
+BUSY_RETRY_AFTER = 1  # 秒
+WARMUP_TEXT = os.getenv("NEURALLINK_TTS_WARMUP_TEXT", "你好，语音引擎预热中。")
+
 tts_pipeline = None
+tts_device = ("cpu", False)  # (device, is_half)，由启动阶段探测
+
+
+def build_tts_request(text: str, return_fragment: bool = False) -> dict:
+    return {
+        "text": text,
+        "text_lang": "zh",
+        "ref_audio_path": REF_WAV,
+        "prompt_text": REF_TEXT,
+        "prompt_lang": "zh",
+        "top_k": 5,
+        "top_p": 1.0,
+        "temperature": 1.0,
+        "text_split_method": "cut5",
+        "batch_size": 1,
+        "speed_factor": 1.0,
+        "split_bucket": not return_fragment,  # 分桶会打乱片段顺序，流式模式下必须关闭
+        "return_fragment": return_fragment
+    }
+
+
+def to_pcm16(chunk: np.ndarray) -> bytes:
+    """模型输出统一转为 16bit 小端 PCM"""
+    if chunk.dtype != np.int16:
+        chunk = (np.clip(chunk, -1.0, 1.0) * 32767).astype(np.int16)
+    return chunk.astype('<i2', copy=False).tobytes()
+
+
+def streaming_wav_header(sample_rate: int, channels: int = 1) -> bytes:
+    """流式 WAV 头：总长度未知，RIFF/data 长度字段填 0xFFFFFFFF"""
+    return struct.pack("<4sI4s4sIHHIIHH4sI",
+                       b"RIFF", 0xFFFFFFFF, b"WAVE", b"fmt ", 16, 1, channels,
+                       sample_rate, sample_rate * channels * 2, channels * 2, 16,
+                       b"data", 0xFFFFFFFF)
+
+
+def synthesize_wav(text: str) -> bytes:
+    """整句合成 (同步，只在推理线程里调用)"""
+    audio_data_list = []
+    final_sr = 32000
+
+    for sr, chunk in tts_pipeline.run(build_tts_request(text)):
+        final_sr = sr
+        audio_data_list.append(chunk)
+
+    if not audio_data_list:
+        raise ValueError("模型未生成任何声音信号")
+
+    full_audio = np.concatenate(audio_data_list, axis=0)
+    return encode_wav(full_audio, final_sr)
+
+
+def encode_wav(audio: np.ndarray, sr: int) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sr, format='WAV')
+    return buffer.getvalue()
+
+
+def _fragment_to_pcm(fragment) -> np.ndarray:
+    """与 TTS.audio_postprocess 相同的归一化 + int16 量化"""
+    if hasattr(fragment, "detach"):
+        fragment = fragment.detach().float().cpu().numpy()
+    fragment = np.asarray(fragment, dtype=np.float32)
+    peak = np.abs(fragment).max() if fragment.size else 0.0
+    if peak > 1:
+        fragment = fragment / peak
+    return (fragment * 32768).astype(np.int16)
+
+
+def _synthesize_wav_batched(texts: List[str]) -> List[bytes]:
+    """一次 pipeline.run 合成多条请求：每条请求作为一个独立分段，一个 batch 跑完"""
+    req = build_tts_request("\n".join(t.replace("\n", " ") for t in texts))
+    # cut0 不再切句，"\n" 天然把各请求分开；关闭分桶以保持分段顺序
+    req.update(text_split_method="cut0", batch_size=len(texts), split_bucket=False)
+
+    # audio_postprocess 会把所有分段拼成一整条音频，这里在拼接前截获各分段
+    captured = []
+    original_postprocess = tts_pipeline.audio_postprocess
+
+    def capture(audio, sr, *args, **kwargs):
+        captured.append((audio, sr))
+        return original_postprocess(audio, sr, *args, **kwargs)
+
+    tts_pipeline.audio_postprocess = capture
+    try:
+        for _ in tts_pipeline.run(req):
+            pass
+    finally:
+        del tts_pipeline.audio_postprocess  # 恢复类上的原方法
+
+    if not captured:
+        raise ValueError("模型未生成任何声音信号")
+    audio, sr = captured[-1]
+    segments = [fragment for batch in audio for fragment in batch]
+    if len(segments) != len(texts):
+        raise ValueError(f"批量合成分段数 {len(segments)} 与请求数 {len(texts)} 不一致")
+    return [encode_wav(_fragment_to_pcm(segment), sr) for segment in segments]
+
+
+def synthesize_wav_batch(texts: List[str]) -> list:
+    """推理线程的批量入口：能合批就合批，否则 (或合批失败时) 逐句合成"""
+    if len(texts) > 1 and all(len(t.strip()) >= MIN_BATCH_TEXT_LEN for t in texts):
+        try:
+            print(f"📦 微批合成 {len(texts)} 句")
+            return _synthesize_wav_batched(texts)
+        except Exception as e:
+            traceback.print_exc()
+            print(f"⚠️ 微批合成失败，逐句回退: {e}")
+
+    results = []
+    for text in texts:
+        try:
+            results.append(synthesize_wav(text))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def iter_pcm_fragments(text: str):
+    """流式合成：逐片段产出 (sr, pcm16)；生成器被关闭时底层推理一并停止"""
+    fragments = tts_pipeline.run(build_tts_request(text, return_fragment=True))
+    try:
+        for sr, chunk in fragments:
+            yield sr, to_pcm16(chunk)
+    finally:
+        fragments.close()
 
 
 # ==========================================
-# 4. 生命周期管理
+# 4. 专用推理执行器 (单线程独占 GPU + 动态微批，事件循环永不阻塞)
 # ==========================================
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+inference_worker = InferenceWorker(synthesize_wav_batch, iter_pcm_fragments, max_queue=MAX_QUEUE_SIZE,
+                                   max_batch_size=MAX_BATCH_SIZE, batch_window_ms=BATCH_WINDOW_MS)
+
+
+def busy_response() -> JSONResponse:
+    return JSONResponse({"error": "语音引擎繁忙，请稍后重试"}, status_code=429,
+                        headers={"Retry-After": str(BUSY_RETRY_AFTER)})
+
+
+async def wait_unless_disconnected(request: Request, job: SynthesisJob):
+    """等待合成结果；如果调用方中途断开，取消排队中的请求并返回 None"""
+    async def watch_disconnect():
+        while not await request.is_disconnected():
+            await asyncio.sleep(0.1)
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await asyncio.wait({job.future, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if not job.future.done():
+        job.cancel()
+        return None
+    return job.future.result()
+
+
+# ==========================================
+# 5. 生命周期管理
+# ==========================================
+def detect_device():
+    """CUDA 上下文初始化要好几秒，与引擎导入并行"""
+    global tts_device
+    import torch
+    if torch.cuda.is_available():
+        torch.cuda.init()
+        tts_device = ("cuda", True)
+        print("🚀 [GPU 模式] CUDA 可用，准备光速推理！")
+    else:
+        tts_device = ("cpu", False)
+        print("🐢 [CPU 模式] 未检测到 CUDA，降级为慢速推理。")
+
+
+def load_weights():
     global tts_pipeline
+    config_path = os.path.join(GPT_LOGIC_DIR, "configs", "tts_infer.yaml")
+    tts_config = TTS_Config(config_path)
+
+    # 覆写配置路径
+    tts_config.t2s_weights_path = GPT_MODEL
+    tts_config.vits_weights_path = SOVITS_MODEL
+    tts_config.device, tts_config.is_half = tts_device
+
+    # 实例化
+    print("⏳ 正在加载 V3 权重...")
+    tts_pipeline = TTS(tts_config)
+    print("✅ 语音神经元彻底就绪，随时可合成音频！")
+
+
+async def warmup():
+    """走一遍推理线程的真实合成：CUDA 内核、参考音频特征提取的首次开销在这里付掉"""
+    job = SynthesisJob(WARMUP_TEXT, streaming=False, trace_id="warmup")
+    if not inference_worker.submit(job):
+        raise RuntimeError("推理队列已满")
+    await job.future
+
+
+readiness = Readiness()
+readiness.declare("engine_import", "device", "load_weights", "warmup")
+
+
+async def startup_plan():
     print("🎙️ 正在初始化硬件神经元...")
-    try:
-        config_path = os.path.join(GPT_LOGIC_DIR, "configs", "tts_infer.yaml")
-        tts_config = TTS_Config(config_path)
-
-        # 覆写配置路径
-        tts_config.t2s_weights_path = GPT_MODEL
-        tts_config.vits_weights_path = SOVITS_MODEL
-
-        # 智能设备分配
-        if torch.cuda.is_available():
-            tts_config.device = "cuda"
-            tts_config.is_half = True
-            print("🚀 [GPU 模式] CUDA 可用，准备光速推理！")
-        else:
-            tts_config.device = "cpu"
-            tts_config.is_half = False
-            print("🐢 [CPU 模式] 未检测到 CUDA，降级为慢速推理。")
-
-        # 实例化
-        print("⏳ 正在加载 V3 权重...")
-        tts_pipeline = TTS(tts_config)
-        print("✅ 语音神经元彻底就绪，随时可合成音频！")
+    if await readiness.parallel(engine_import=import_engine, device=detect_device):
+        if await readiness.run("load_weights", load_weights):
+            await readiness.run("warmup", warmup)
 
-    except Exception as e:
-        traceback.print_exc()
-        print(f"❌ 引擎初始化失败: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 加载失败不再 "带病上岗"：/health/live 返回 503，/health/ready 在预热完成前一直是 503
+    inference_worker.start()
+    readiness.start(startup_plan)
     yield
+    await readiness.stop()
+    inference_worker.stop()
 
 
 app = FastAPI(lifespan=lifespan)
+add_health_routes(app, readiness)
 
 
 # ==========================================
-# 5. API 路由层 (Facade 模式)
+# 6. API 路由层 (Facade 模式)
 # ==========================================
+def trace_id_of(request: Request) -> str:
+    """沿用大脑节点 traceparent 里的 trace_id，日志可以和大脑的回合追踪对上；没带就自己生成一个"""
+    return tracing.parse_traceparent(request.headers.get("traceparent")) or tracing.new_trace_id()
+
+
 @app.get("/tts")
-async def generate_tts(text: str = Query(..., description="要合成的文字")):
-    print(f"🔮 引擎接收合成任务: {text}")
-    try:
-        req = {
-            "text": text,
-            "text_lang": "zh",
-            "ref_audio_path": REF_WAV,
-            "prompt_text": REF_TEXT,
-            "prompt_lang": "zh",
-            "top_k": 5,
-            "top_p": 1.0,
-            "temperature": 1.0,
-            "text_split_method": "cut5",
-            "batch_size": 1,
-            "speed_factor": 1.0,
-            "split_bucket": True,
-            "return_fragment": False
-        }
-
-        audio_data_list = []
-        final_sr = 32000
-
-        for sr, chunk in tts_pipeline.run(req):
-            final_sr = sr
-            audio_data_list.append(chunk)
-
-        if not audio_data_list:
-            raise ValueError("模型未生成任何声音信号")
-
-        full_audio = np.concatenate(audio_data_list, axis=0)
-        buffer = io.BytesIO()
-        sf.write(buffer, full_audio, final_sr, format='WAV')
-
-        print("⚡ 语音合成成功，已下发！")
-        return Response(content=buffer.getvalue(), media_type="audio/wav")
+async def generate_tts(request: Request, text: str = Query(..., description="要合成的文字")):
+    trace_id = trace_id_of(request)
+    print(f"🔮 [trace {trace_id[:8]}] 引擎接收合成任务: {text}")
+    if tts_pipeline is None:
+        return JSONResponse({"error": "语音引擎尚未就绪"}, status_code=503)
+
+    started = time.perf_counter()
+    job = SynthesisJob(text, streaming=False, trace_id=trace_id)
+    if not inference_worker.submit(job):
+        print(f"🚦 [trace {trace_id[:8]}] 推理队列已满，拒绝合成任务")
+        return busy_response()
 
+    try:
+        audio = await wait_unless_disconnected(request, job)
     except Exception as e:
-        traceback.print_exc()
-        print(f"❌ 推理崩溃: {e}")
-        return {"error": str(e)}
+        # 这一句合成失败不代表节点坏了：用 422 而不是 5xx，大脑不会因此摘掉节点、也不会换节点重试
+        return JSONResponse({"error": str(e)}, status_code=422)
+
+    if audio is None:
+        print(f"🔌 [trace {trace_id[:8]}] 调用方已断开，取消排队中的合成任务")
+        return Response(status_code=499)
+
+    total_ms = (time.perf_counter() - started) * 1000
+    metrics.latency("request").observe(total_ms)
+    print(f"⚡ [trace {trace_id[:8]}] 语音合成成功，已下发！排队 {job.queue_ms:.0f}ms，推理 {job.synth_ms:.0f}ms")
+    return Response(content=audio, media_type="audio/wav", headers={
+        # 大脑节点把这两段耗时记进对应回合的追踪
+        "Server-Timing": f"queue;dur={job.queue_ms:.1f}, synth;dur={job.synth_ms:.1f}",
+        "X-Trace-Id": trace_id,
+    })
+
+
+@app.get("/tts/stream")
+async def generate_tts_stream(request: Request, text: str = Query(..., description="要合成的文字")):
+    """流式合成：先下发 WAV 头，随后每产出一个片段就立即下发其 PCM 数据"""
+    trace_id = trace_id_of(request)
+    print(f"🔮 [trace {trace_id[:8]}] 引擎接收流式合成任务: {text}")
+    if tts_pipeline is None:
+        return JSONResponse({"error": "语音引擎尚未就绪"}, status_code=503)
+
+    started = time.perf_counter()
+    job = SynthesisJob(text, streaming=True, trace_id=trace_id)
+    if not inference_worker.submit(job):
+        print(f"🚦 [trace {trace_id[:8]}] 推理队列已满，拒绝流式合成任务")
+        return busy_response()
+
+    async def fragment_stream():
+        header_sent = False
+        try:
+            while True:
+                item = await job.fragments.get()
+                if item is None:
+                    break
+                sr, pcm = item
+                if not header_sent:
+                    metrics.latency("stream_first_fragment").observe((time.perf_counter() - started) * 1000)
+                    yield streaming_wav_header(sr)
+                    header_sent = True
+                yield pcm
+            if job.cancelled.is_set():
+                return  # 引擎关闭时被拒绝的流，不算一次完成的请求
+            metrics.latency("request").observe((time.perf_counter() - started) * 1000)
+            print(f"⚡ [trace {trace_id[:8]}] 流式语音合成完毕！排队 {job.queue_ms:.0f}ms，推理 {job.synth_ms:.0f}ms")
+        finally:
+            # 客户端断开时 Starlette 会取消本生成器：通知推理线程不再合成剩下的片段
+            job.cancel()
+
+    return StreamingResponse(fragment_stream(), media_type="audio/wav", headers={"X-Trace-Id": trace_id})
+
+
+@app.get("/stats")
+async def stats():
+    return inference_worker.metrics()
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 抓取入口 (JSON 格式的调试统计见 /stats)"""
+    worker = inference_worker
+    text = metrics.render_prometheus(
+        "neurallink_tts",
+        recorders=[worker.synth, worker.queue_wait],
+        counters={"completed": worker.completed, "failed": worker.failed, "rejected": worker.rejected,
+                  "cancelled": worker.cancelled, "batches": worker.batches},
+        gauges={"queue_depth": worker.metrics()["queue_depth"], "in_progress": worker.in_progress,
+                "ready": readiness.ready})
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
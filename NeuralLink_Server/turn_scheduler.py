@@ -0,0 +1,77 @@
+"""
+回合调度器 (Turn Scheduler)
+
+每条 WebSocket 连接持有一个调度器。ASR / LLM / TTS 这些耗时工作都作为
+可取消的 asyncio.Task 在后台跑，接收循环只负责收包和派发，永远不被阻塞。
+
+- 同一时刻只有一个活跃回合，新回合启动时旧回合会被真正 cancel
+- 打断 (barge-in) 会取消整棵任务 (Gemini 流、TTS HTTP 请求)，并记录打断到静音的耗时
+- 推测执行的回合可以在确认命中后通过 adopt() 无缝接管为当前回合
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import metrics
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+TurnFactory = Callable[[str], Awaitable[None]]
+
+
+class TurnScheduler:
+    def __init__(self):
+        self.current_task_id: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def busy(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, factory: TurnFactory) -> str:
+        """取消旧回合，分配新的 task_id，并把 factory(task_id) 放到后台执行"""
+        await self.cancel()
+        task_id = str(uuid.uuid4())
+        self.current_task_id = task_id
+        self._task = asyncio.create_task(factory(task_id))
+        self._task.add_done_callback(self._on_done)
+        return task_id
+
+    async def adopt(self, task_id: str, task: asyncio.Task):
+        """把已经在后台跑着的任务 (推测执行的回合) 收编为当前回合，旧回合照常作废"""
+        if self._task is not task:
+            await self.cancel()
+        self.current_task_id = task_id
+        self._task = task
+        task.add_done_callback(self._on_done)
+
+    async def cancel(self):
+        """作废当前回合并等待其彻底退出 (任务内部的 finally 清理也已执行完毕)"""
+        self.current_task_id = None
+        task, self._task = self._task, None
+        if task is None or task.done() or task is asyncio.current_task():
+            return
+        task.cancel()
+        # 用 wait 而不是直接 await：既不吞掉外层的取消，也不把旧回合的异常抛给接收循环
+        await asyncio.wait({task})
+
+    async def interrupt(self, reason: str = "") -> float:
+        """处理打断：取消在途回合，返回 打断 -> 静音 的耗时 (毫秒)"""
+        started = time.perf_counter()
+        had_turn = self.busy
+        await self.cancel()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if had_turn:
+            metrics.latency("interrupt_to_silence").observe(elapsed_ms)
+            logger.info(f"🔇 打断生效 ({reason})，{elapsed_ms:.1f}ms 后已彻底静音")
+        return elapsed_ms
+
+    @staticmethod
+    def _on_done(task: asyncio.Task):
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            logger.error(f"💥 回合任务异常退出: {exc!r}")
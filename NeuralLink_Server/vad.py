@@ -0,0 +1,106 @@
+"""
+服务端语音活动检测 (VAD) 与端点检测，纯 NumPy，无模型依赖
+
+以前服务端只能靠前端的 is_last 知道一句话说完了，而且只拦截 "0 字节" 的上传，纯静音/底噪照样送进 ASR。
+这里按 20ms 帧计算能量 (dBFS)，带迟滞地判断语音起止：
+
+- 连续 min_speech_ms 的高能量帧才算开口，避免一声咳嗽、一下按键声触发识别
+- 开口后连续 endpoint_silence_ms 的低能量帧判定为说完 (端点)
+- 首尾静音按 pad_ms 留余量裁掉；整段都没有语音则直接跳过 ASR
+
+检测是增量的：每次只处理新解码出来的帧，状态跨调用保留。
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+import config
+
+SAMPLE_RATE = 16000
+FRAME = SAMPLE_RATE // 50   # 20ms
+
+
+class VadConfig(NamedTuple):
+    enabled: bool = config.VAD_ENABLED
+    threshold_db: float = config.VAD_THRESHOLD_DB              # 高于该能量 (dBFS) 的帧视为语音
+    min_speech_ms: int = config.VAD_MIN_SPEECH_MS              # 连续多久的语音帧才算开口
+    endpoint_silence_ms: int = config.VAD_ENDPOINT_SILENCE_MS  # 开口后静音多久算说完
+    pad_ms: int = config.VAD_PAD_MS                            # 裁剪首尾静音时保留的余量
+    auto_endpoint: bool = config.VAD_AUTO_ENDPOINT             # 检测到端点就直接出最终结果，不等 is_last
+
+    @classmethod
+    def from_payload(cls, payload: Optional[dict]) -> "VadConfig":
+        """握手里的 vad 字段按会话覆盖默认阈值，未知字段忽略"""
+        base = cls()
+        if not isinstance(payload, dict):
+            return base
+        overrides = {}
+        for field, value in payload.items():
+            if field not in cls._fields or value is None:
+                continue
+            kind = type(getattr(base, field))
+            overrides[field] = bool(value) if kind is bool else kind(value)
+        return base._replace(**overrides)
+
+
+class VoiceActivityDetector:
+    """一次语音输入的 VAD 状态 (采样下标均以 16kHz 计)"""
+
+    def __init__(self, cfg: VadConfig = VadConfig()):
+        self.cfg = cfg
+        self._min_speech_frames = max(1, cfg.min_speech_ms // 20)
+        self._endpoint_frames = max(1, cfg.endpoint_silence_ms // 20)
+        self.pad = SAMPLE_RATE * cfg.pad_ms // 1000
+
+        self._frames_done = 0
+        self._run = 0                  # 当前连续语音帧数
+        self._silence = 0              # 开口后当前连续静音帧数
+        self.speech_start: Optional[int] = None   # 第一次开口的位置
+        self._onset = 0                # 最近一次开口 (首次或端点之后重新开口) 的位置
+        self.speech_end = 0            # 最近一个语音帧的结束位置
+        self.endpoint = False          # 是否处于 "说完了" 状态 (再次开口会清除)
+
+    @property
+    def has_speech(self) -> bool:
+        return self.speech_start is not None
+
+    def update(self, samples: np.ndarray) -> bool:
+        """处理新增的完整帧；返回本次调用是否新检测到端点"""
+        total = len(samples) // FRAME
+        if total <= self._frames_done:
+            return False
+        start = self._frames_done * FRAME
+        frames = samples[start:total * FRAME].reshape(-1, FRAME)
+        energy_db = 10.0 * np.log10(np.square(frames).mean(axis=1) + 1e-10)
+        is_speech = energy_db > self.cfg.threshold_db
+
+        new_endpoint = False
+        for offset, speech in enumerate(is_speech):
+            index = self._frames_done + offset
+            if speech:
+                self._run += 1
+                self._silence = 0
+                if self._run >= self._min_speech_frames:
+                    if self.speech_start is None or self.endpoint:
+                        self._onset = (index + 1 - self._run) * FRAME
+                        if self.speech_start is None:
+                            self.speech_start = self._onset
+                    self.speech_end = (index + 1) * FRAME
+                    self.endpoint = False
+            else:
+                self._run = 0
+                if self.speech_start is not None and not self.endpoint:
+                    self._silence += 1
+                    if self._silence >= self._endpoint_frames:
+                        self.endpoint = True
+                        new_endpoint = True
+        self._frames_done = total
+        return new_endpoint
+
+    def trim_start(self) -> int:
+        """识别起点：最近一次开口前 pad_ms (端点之前的部分已经定稿，中间的停顿不必再识别)"""
+        return max(0, self._onset - self.pad)
+
+    def trim_end(self, length: int) -> int:
+        """识别终点：最后一次语音后 pad_ms"""
+        return min(length, self.speech_end + self.pad)
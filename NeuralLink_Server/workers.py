@@ -0,0 +1,202 @@
+"""
+工作节点注册表：大脑在多个 TTS / ASR 节点之间做负载感知的路由
+
+旧实现只认一个写死的 TTS 地址，ASR 也只能在本进程的 cuda:0 上跑，加一台 GPU 机器也接不了更多会话。
+
+- 健康检查：后台定期探测每个节点的 /health/ready，未就绪的节点不参与路由
+- 最少在途请求 (least outstanding requests)：挑在途请求最少的健康节点，平手时轮转
+- 会话粘滞：同一会话尽量留在同一个节点 (参考音频特征等缓存是热的)，
+  只有粘住的节点比最空闲的节点多出 sticky_slack 个以上在途请求、或者掉线时才迁走
+- 故障转移：连接失败 / 502 / 503 / 504 的节点立即标记为不可用，调用方换节点重试，下一轮健康检查通过后再放回来；
+  普通的 500 只说明这一条请求的内容出了问题 (某句话合成失败)，节点本身是好的，不摘也不换节点重试
+
+会话键通过 contextvar 传递 (与 tracing 的当前回合一样)：握手时 set_affinity，之后该连接派生的任务都能读到。
+pick / release 带锁，推理线程 (远程 ASR) 与事件循环可以同时使用同一个节点池。
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Iterable, List, Optional
+
+import httpx
+
+import config
+import metrics
+
+logger = logging.getLogger("NeuralLink_Brain")
+
+_affinity: ContextVar[Optional[str]] = ContextVar("neurallink_worker_affinity", default=None)
+
+
+def set_affinity(key: Optional[str]):
+    """把当前任务 (及其之后创建的子任务) 绑定到一个会话键"""
+    _affinity.set(key)
+
+
+def current_affinity() -> Optional[str]:
+    return _affinity.get()
+
+
+# 说明节点本身不可用 (网关错误 / 未就绪 / 网关超时) 的状态码
+NODE_DOWN_STATUSES = frozenset({502, 503, 504})
+
+
+class NoHealthyWorker(RuntimeError):
+    pass
+
+
+class WorkerNode:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = True        # 乐观：首轮健康检查之前先当作可用
+        self.outstanding = 0
+        self.requests_total = 0
+        self.failures_total = 0
+        self.last_error = ""
+        self.checked_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {"url": self.url, "healthy": self.healthy, "outstanding": self.outstanding,
+                "requests_total": self.requests_total, "failures_total": self.failures_total,
+                "last_error": self.last_error}
+
+
+class WorkerPool:
+    def __init__(self, name: str, urls: Iterable[str],
+                 health_path: str = "/health/ready",
+                 health_interval_s: float = config.WORKER_HEALTH_INTERVAL_S,
+                 health_timeout_s: float = config.WORKER_HEALTH_TIMEOUT_S,
+                 sticky_slack: int = config.WORKER_STICKY_SLACK,
+                 max_affinity: int = config.MEMORY_MAX_SESSIONS):
+        self.name = name
+        self.nodes: List[WorkerNode] = [WorkerNode(url) for url in dict.fromkeys(u.rstrip("/") for u in urls)]
+        if not self.nodes:
+            raise ValueError(f"{name} 节点池至少需要一个地址")
+        self.health_path = health_path
+        self.health_interval_s = health_interval_s
+        self.health_timeout_s = health_timeout_s
+        self.sticky_slack = sticky_slack
+        self.max_affinity = max_affinity
+        self._affinity: "OrderedDict[str, WorkerNode]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._rr = 0
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.sticky_hits = 0
+        self.sticky_moves = 0
+        self.failovers = 0
+
+    # ------------------------------------------------------------------
+    # 生命周期与健康检查
+    # ------------------------------------------------------------------
+    async def start(self):
+        """先同步做一轮健康检查 (路由一开始就反映真实状态)，再在后台定期检查"""
+        if self._task is not None:
+            return
+        self._client = httpx.AsyncClient(timeout=self.health_timeout_s)
+        await self.check_all()
+        self._task = asyncio.create_task(self._health_loop())
+        logger.info(f"🗂️ {self.name} 节点池: {', '.join(n.url for n in self.nodes)} "
+                    f"(健康 {sum(n.healthy for n in self.nodes)}/{len(self.nodes)})")
+
+    async def close(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def check_all(self):
+        await asyncio.gather(*(self._check(node) for node in self.nodes))
+
+    async def _check(self, node: WorkerNode):
+        try:
+            res = await self._client.get(node.url + self.health_path)
+            healthy, error = res.status_code == 200, f"health [{res.status_code}]"
+        except Exception as e:
+            healthy, error = False, f"{type(e).__name__}: {e}"
+        node.checked_at = time.monotonic()
+        if healthy != node.healthy:
+            if healthy:
+                logger.info(f"🟢 {self.name} 节点恢复: {node.url}")
+            else:
+                logger.warning(f"🔴 {self.name} 节点不可用: {node.url} ({error})")
+                node.last_error = error
+            node.healthy = healthy
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval_s)
+            await self.check_all()
+
+    # ------------------------------------------------------------------
+    # 路由
+    # ------------------------------------------------------------------
+    def pick(self, key: Optional[str] = None, exclude: Iterable[WorkerNode] = ()) -> WorkerNode:
+        """选一个节点并计入在途；调用方用完必须 release"""
+        exclude = set(exclude)
+        with self._lock:
+            candidates = [n for n in self.nodes if n.healthy and n not in exclude]
+            if not candidates:
+                # 健康检查可能滞后：全都标记为不可用时，宁可在没试过的节点里碰碰运气
+                candidates = [n for n in self.nodes if n not in exclude]
+            if not candidates:
+                raise NoHealthyWorker(f"没有可用的 {self.name} 节点")
+
+            least = min(n.outstanding for n in candidates)
+            sticky = self._affinity.get(key) if key is not None else None
+            if sticky in candidates and sticky.outstanding <= least + self.sticky_slack:
+                node = sticky
+                self.sticky_hits += 1
+            else:
+                idle = [n for n in candidates if n.outstanding == least]
+                node = idle[self._rr % len(idle)]
+                self._rr += 1
+                if sticky is not None:
+                    self.sticky_moves += 1
+            if key is not None:
+                self._affinity[key] = node
+                self._affinity.move_to_end(key)
+                while len(self._affinity) > self.max_affinity:
+                    self._affinity.popitem(last=False)
+            node.outstanding += 1
+            node.requests_total += 1
+            return node
+
+    def release(self, node: WorkerNode):
+        with self._lock:
+            node.outstanding -= 1
+
+    def mark_down(self, node: WorkerNode, error):
+        """请求层面发现节点故障：立即摘掉，等健康检查把它放回来"""
+        with self._lock:
+            node.failures_total += 1
+            node.last_error = str(error)[:200]
+            was_healthy, node.healthy = node.healthy, False
+            self.failovers += 1
+        metrics.counter(f"{self.name}_failovers").inc()
+        if was_healthy:
+            logger.warning(f"🔀 {self.name} 节点故障，转移到其他节点: {node.url} ({node.last_error})")
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    @property
+    def healthy_count(self) -> int:
+        return sum(1 for n in self.nodes if n.healthy)
+
+    def stats(self) -> dict:
+        return {
+            "nodes": [n.to_dict() for n in self.nodes],
+            "healthy": self.healthy_count,
+            "sessions": len(self._affinity),
+            "sticky_hits": self.sticky_hits,
+            "sticky_moves": self.sticky_moves,
+            "failovers": self.failovers,
+        }
@@ -9,7 +9,11 @@ export const memoryState = reactive({
 });
 
 const MEMORY_KEY = 'neural_link_memory_v1';
-const MAX_CONTEXT_ROUNDS = 5; // Task 2.2: 滑动窗口，每次只带最近 5 轮对话
+const MAX_CONTEXT_ROUNDS = 5; // 本地记忆与服务端对不上时，最多补传最近 5 轮
+
+// 对话历史存在服务端 (按会话令牌)，每轮只上传服务端还没有的消息
+let syncedCount = 0;
+let resetPending = false;
 
 // 初始化加载本地数据库 (伪装的 SQLite 落盘)
 export const initMemoryMatrix = () => {
@@ -19,22 +23,41 @@ export const initMemoryMatrix = () => {
     console.log(`🧠 [Memory] 成功从本地加载了 ${memoryState.chatHistory.length} 条记忆碎片。`);
   }
 
+  // 0. 握手结果里带着服务端已保存的历史条数，据此决定从哪里开始增量同步
+  bus.on(MessageType.SERVER_AUTH_RESULT, (payload) => {
+    const local = memoryState.chatHistory.length;
+    const remote = payload.history_synced ?? 0;
+    if (remote > local || local - remote > MAX_CONTEXT_ROUNDS * 2) {
+      // 本地记忆被清过，或服务端重启丢了历史：下一轮用最近几轮整体重置服务端
+      syncedCount = Math.max(0, local - MAX_CONTEXT_ROUNDS * 2);
+      resetPending = true;
+    } else {
+      syncedCount = remote;
+      resetPending = false;
+    }
+  });
+
   // 1. 监听用户的声音被识别出来
   bus.on(MessageType.SERVER_ASR_RESULT, (payload) => {
     if (!payload.is_valid_speech || !payload.text) return;
+    if (payload.is_final === false) return; // 流式 ASR 的中间结果只用于展示，不入记忆、不触发对话
 
     // 存入短期记忆
     memoryState.chatHistory.push({ role: 'user', content: payload.text });
     localStorage.setItem(MEMORY_KEY, JSON.stringify(memoryState.chatHistory));
 
-    // 🌟 核心突破：由前端发起主动权，携带上下文请求 3060
-    console.log('📤 [Memory] 正在打包上下文，请求皮层响应...');
+    // 🌟 核心突破：由前端发起主动权，只带上服务端还没有的增量记忆请求 3060
+    console.log('📤 [Memory] 正在同步增量记忆，请求皮层响应...');
     neuralLink.send(MessageType.CLIENT_TEXT_REQUEST, {
       text: payload.text,
       ai_current_state: { mood_score: 50, attitude: "neutral" },
-      chat_history: memoryState.chatHistory.slice(-MAX_CONTEXT_ROUNDS * 2), // 取最近 N 轮
+      history_base: syncedCount,
+      history_delta: memoryState.chatHistory.slice(syncedCount),
+      history_reset: resetPending,
       disturb_tolerance: 3
     });
+    syncedCount = memoryState.chatHistory.length;
+    resetPending = false;
   });
 
   // 2. 监听 AI 回复并收集
@@ -1,11 +1,39 @@
 // src/core/NeuralSocket.ts
 import { bus } from './eventBus';
-import { MessageType, type WsMessage } from '../protocol/types';
+import { MessageType, type WsMessage, type ServerTtsAudio } from '../protocol/types';
+import { PROTOCOL_VERSION, FrameKind, FLAG_LAST, packFrame, unpackFrame } from '../protocol/binaryFrame';
+
+const blobToBase64 = (blob: Blob): Promise<string> => {
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onloadend = () => {
+      const dataUrl = reader.result as string;
+      const base64 = dataUrl.split(',')[1] || ''; 
+      resolve(base64);
+    };
+    reader.onerror = reject;
+    reader.readAsDataURL(blob);
+  });
+};
+
+const SESSION_KEY = 'neural_link_session_v1';
+
+// 会话令牌：服务端凭它保存对话历史，断线重连后接着用同一份记忆
+const loadSessionId = (): string => {
+  let id = localStorage.getItem(SESSION_KEY);
+  if (!id) {
+    id = crypto.randomUUID();
+    localStorage.setItem(SESSION_KEY, id);
+  }
+  return id;
+};
 
 export class NeuralSocket {
   private ws: WebSocket | null = null;
   private url: string;
   private reconnectTimer: number | null = null;
+  // 协议 V2：握手成功且服务端确认后，音频改走二进制帧
+  private binaryAudio = false;
 
   constructor(url: string = 'ws://127.0.0.1:8000/ws') {
     this.url = url;
@@ -14,6 +42,8 @@ export class NeuralSocket {
   public connect() {
     console.log('[NeuralSocket] 正在连接 3060 算力节点...');
     this.ws = new WebSocket(this.url);
+    this.ws.binaryType = 'arraybuffer';
+    this.binaryAudio = false;
 
     this.ws.onopen = () => {
       console.log('✅ [NeuralSocket] 神经元直连通道已建立！');
@@ -22,13 +52,25 @@ export class NeuralSocket {
       // 发送握手鉴权 (根据你的文档)
       this.send(MessageType.CLIENT_AUTH_HANDSHAKE, {
         access_token: "neural_link_secret_2026",
-        client_version: "1.3"
+        client_version: "1.3",
+        protocol_version: PROTOCOL_VERSION,
+        binary_audio: true,
+        session_id: loadSessionId()
       });
     };
 
     this.ws.onmessage = (event) => {
+      if (event.data instanceof ArrayBuffer) {
+        this.handleBinary(event.data);
+        return;
+      }
       try {
         const envelope: WsMessage = JSON.parse(event.data);
+
+        if (envelope.type === MessageType.SERVER_AUTH_RESULT) {
+          this.binaryAudio = !!envelope.payload.binary_audio;
+          console.log(`🤝 [NeuralSocket] 协议协商完成: V${envelope.payload.protocol_version}`);
+        }
         
         // 🔥 核心解耦逻辑：网络层不做任何业务处理，直接把 payload 广播到总线上
         // 任何关心这个事件的 Vue 组件（如调试面板、Live2D）自己去订阅
@@ -63,6 +105,39 @@ export class NeuralSocket {
     }
   }
 
+  // 上行音频块：V2 直接发二进制帧，V1 回退为 Base64 JSON
+  public async sendAudio(chunk: Blob | null, isLast: boolean) {
+    if (this.binaryAudio && this.ws && this.ws.readyState === WebSocket.OPEN) {
+      const audio = chunk ? await chunk.arrayBuffer() : new ArrayBuffer(0);
+      this.ws.send(packFrame(FrameKind.CLIENT_AUDIO, crypto.randomUUID(), audio, isLast ? FLAG_LAST : 0));
+      return;
+    }
+    this.send(MessageType.CLIENT_AUDIO_CHUNK, {
+      audio_b64: chunk ? await blobToBase64(chunk) : "",
+      is_last: isLast
+    });
+  }
+
+  private handleBinary(buffer: ArrayBuffer) {
+    try {
+      const frame = unpackFrame(buffer);
+      if (frame.kind !== FrameKind.SERVER_TTS_AUDIO) return;
+      const payload: ServerTtsAudio = {
+        audio_b64: "",
+        audio_blob: new Blob([frame.audio], { type: 'audio/wav' }),
+        volume_db: 0,
+        sample_rate: 0,
+        sentence_id: frame.sentence_id,
+        fragment_id: frame.fragment_id,
+        sync_text: frame.sync_text,
+        is_reply_end: (frame.flags & FLAG_LAST) !== 0
+      };
+      bus.emit(MessageType.SERVER_TTS_AUDIO, payload);
+    } catch (err) {
+      console.error('❌ 二进制帧解析碎裂:', err);
+    }
+  }
+
   private scheduleReconnect() {
     if (!this.reconnectTimer) {
       this.reconnectTimer = window.setInterval(() => {
@@ -4,7 +4,8 @@ import { MessageType } from '../protocol/types';
 import type { 
   ServerThoughtStream, 
   ServerTtsAudio, 
-  ServerAsrResult 
+  ServerAsrResult,
+  ServerAuthResult
 } from '../protocol/types';
 
 // 1. 定义极其严格的事件映射表 (事件名 -> 载荷类型)
@@ -14,6 +15,7 @@ type Events = {
   [MessageType.SERVER_THOUGHT_STREAM]: ServerThoughtStream;
   [MessageType.SERVER_TTS_AUDIO]: ServerTtsAudio;
   [MessageType.SERVER_ASR_RESULT]: ServerAsrResult;
+  [MessageType.SERVER_AUTH_RESULT]: ServerAuthResult;
   'system:audio_queue_empty': void;
   // 系统内部事件 (按需添加，比如 UI 触发录音)
   'system:start_recording': void;
@@ -0,0 +1,71 @@
+/**
+ * NeuralLink 协议 V2：音频二进制帧编解码
+ * 布局与服务端 binary_protocol.py 保持绝对一致 (小端)：
+ *   0 u8 kind | 1 u8 flags | 2 u16 fragment_id | 4 i32 sentence_id
+ *   8 16B msg_id (UUID) | 24 u16 text_len | 26 sync_text (UTF-8) | ... audio
+ */
+export const PROTOCOL_VERSION = 2;
+
+export const FrameKind = {
+  CLIENT_AUDIO: 1,
+  SERVER_TTS_AUDIO: 2
+} as const;
+
+export const FLAG_LAST = 0x01;
+export const HEADER_SIZE = 26;
+
+export interface BinaryFrame {
+  kind: number;
+  flags: number;
+  fragment_id: number;
+  sentence_id: number;
+  msg_id: string;
+  sync_text: string;
+  audio: Uint8Array<ArrayBuffer>;
+}
+
+const uuidToBytes = (uuid: string): Uint8Array => {
+  const hex = uuid.replace(/-/g, '');
+  const bytes = new Uint8Array(16);
+  if (hex.length !== 32) return bytes;
+  for (let i = 0; i < 16; i++) bytes[i] = parseInt(hex.substr(i * 2, 2), 16);
+  return bytes;
+};
+
+const bytesToUuid = (bytes: Uint8Array): string => {
+  const hex = Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+};
+
+export const packFrame = (kind: number, msgId: string, audio: ArrayBuffer, flags = 0,
+                          sentenceId = 0, fragmentId = 0, syncText = ''): ArrayBuffer => {
+  const text = new TextEncoder().encode(syncText);
+  const buffer = new ArrayBuffer(HEADER_SIZE + text.length + audio.byteLength);
+  const view = new DataView(buffer);
+  view.setUint8(0, kind);
+  view.setUint8(1, flags);
+  view.setUint16(2, fragmentId, true);
+  view.setInt32(4, sentenceId, true);
+  new Uint8Array(buffer, 8, 16).set(uuidToBytes(msgId));
+  view.setUint16(24, text.length, true);
+  new Uint8Array(buffer, HEADER_SIZE, text.length).set(text);
+  new Uint8Array(buffer, HEADER_SIZE + text.length).set(new Uint8Array(audio));
+  return buffer;
+};
+
+export const unpackFrame = (buffer: ArrayBuffer): BinaryFrame => {
+  if (buffer.byteLength < HEADER_SIZE) throw new Error(`二进制帧过短: ${buffer.byteLength} 字节`);
+  const view = new DataView(buffer);
+  const textLen = view.getUint16(24, true);
+  const textEnd = HEADER_SIZE + textLen;
+  if (textEnd > buffer.byteLength) throw new Error('二进制帧字幕长度越界');
+  return {
+    kind: view.getUint8(0),
+    flags: view.getUint8(1),
+    fragment_id: view.getUint16(2, true),
+    sentence_id: view.getInt32(4, true),
+    msg_id: bytesToUuid(new Uint8Array(buffer, 8, 16)),
+    sync_text: new TextDecoder().decode(new Uint8Array(buffer, HEADER_SIZE, textLen)),
+    audio: new Uint8Array(buffer, textEnd)
+  };
+};
@@ -27,6 +27,7 @@ export const MessageType = {
   CLIENT_EMBED_REQUEST: "client.embed_request",
   CLIENT_ACTION_RESULT: "client.action_result",
 
+  SERVER_AUTH_RESULT: "server.auth_result",
   SERVER_ASR_RESULT: "server.asr_result",
   SERVER_THOUGHT_STREAM: "server.thought_stream",
   SERVER_EMOTION_SHIFT: "server.emotion_shift",
@@ -43,6 +44,13 @@ export const MessageType = {
 export interface ClientAuthHandshake {
   access_token: string;      // 预共享密钥，防局域网盗用
   client_version: string;
+  protocol_version?: number; // [V2] 协议版本，>= 2 才会协商二进制音频帧
+  binary_audio?: boolean;    // [V2] 声明支持二进制音频帧
+  audio_format?: 'webm' | 'pcm_s16le'; // 上行音频格式，缺省 webm；16kHz pcm_s16le 服务端零解码
+  sample_rate?: number;      // 仅 pcm_s16le 有效，缺省 16000
+  vad?: Partial<VadConfig>;  // 按会话覆盖服务端 VAD 阈值，缺省用服务端配置
+  speculative_llm?: boolean; // ASR 稳定后服务端提前推测执行大模型，缺省用服务端配置
+  session_id?: string;       // 会话令牌：服务端按它保存对话历史，重连后续用
 }
 
 export interface ClientWakeUp {
@@ -54,13 +62,21 @@ export interface ClientAudioChunk {
   is_last: boolean;          // VAD 截断标志
 }
 
+export interface ChatMessage {
+  role: "user" | "assistant";
+  content: string;
+}
+
 export interface ClientTextRequest {
   text: string;
   ai_current_state: {        // [V1.3 核心补丁] AI 当前心理状态，保持性格连贯
     mood_score: number;      
     attitude: string;        
   };
-  chat_history: Array<{ role: "user" | "assistant"; content: string }>;
+  history_base?: number;     // history_delta 第一条在本地记忆里的下标 (= 服务端已同步条数)
+  history_delta?: ChatMessage[]; // 服务端还没有的新消息 (通常是上一轮回复 + 本轮输入)
+  history_reset?: boolean;   // 以 history_delta 整体替换服务端历史 (本地记忆与服务端对不上时)
+  chat_history?: ChatMessage[]; // 旧协议：每轮整包上传最近几轮，服务端仍兼容
   rag_context?: string;      // 检索出的记忆事实
   visual_context?: { active_window: string; focus_text: string }; 
   disturb_tolerance: number; 
@@ -94,11 +110,32 @@ export interface ClientActionResult {
 // 3. 下行数据包定义 (Server -> Client)
 // ------------------------------------------
 
+export interface VadConfig {
+  enabled: boolean;
+  threshold_db: number;        // 语音帧能量阈值 (dBFS)
+  min_speech_ms: number;       // 连续多久的语音才算开口
+  endpoint_silence_ms: number; // 开口后静音多久算说完
+  pad_ms: number;              // 裁剪首尾静音保留的余量
+  auto_endpoint: boolean;      // 检测到端点就出最终结果，不等 is_last (免按键模式)
+}
+
+export interface ServerAuthResult {
+  protocol_version: number;  // 服务端最终采用的协议版本
+  binary_audio: boolean;     // 是否已切换为二进制音频帧
+  audio_format?: 'webm' | 'pcm_s16le'; // 服务端采用的上行音频格式
+  sample_rate?: number;
+  vad?: VadConfig;           // 本会话生效的 VAD 参数
+  speculative_llm?: boolean; // 本会话是否开启推测执行
+  session_id?: string;       // 服务端采用的会话令牌
+  history_synced?: number;   // 服务端已保存的历史条数
+}
+
 export interface ServerAsrResult {
   text: string;              
   emotion: string;           
   confidence: number;        
   is_valid_speech: boolean;  // 拦截纯噪音
+  is_final?: boolean;        // 流式 ASR：false 为录音期间的中间结果，true (或缺省) 为最终结果
 }
 
 export interface ServerThoughtStream {
@@ -120,10 +157,12 @@ export interface ServerIntentCall {
 }
 
 export interface ServerTtsAudio {
-  audio_b64: string;         
+  audio_b64: string;         // V1：Base64 WAV；V2 二进制帧下为空串
+  audio_blob?: Blob;         // [V2] 二进制帧直接还原的 WAV
   volume_db: number;         // 驱动 ParamMouthOpenY
   sample_rate: number;       
   sentence_id: number;       
+  fragment_id?: number;      // 流式合成时同一句话的片段序号 (从 0 开始)，字幕只挂在第 0 片上
   sync_text: string;         // 解决音画撕裂的强绑定字幕
   is_reply_end: boolean;     // [微观补齐] 标志这轮对话的音频是否已全部下发完毕，用于释放状态机
 }